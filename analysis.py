@@ -1,17 +1,20 @@
 import pandas as pd
 import numpy as np
+from scipy.special import ndtr
 from py_vollib.black_scholes.greeks import analytical
+from chain_context import ChainContext
+from metrics import compute_chain_metrics
 
-def calculate_put_call_ratio(options_data):
+def calculate_put_call_ratio(options_data, context=None, metrics=None):
     """Calculate the Put/Call ratio from options data."""
     if options_data is None:
         return None, None, None
         
-    calls_data = options_data[options_data["type"] == "call"]
-    puts_data = options_data[options_data["type"] == "put"]
+    if metrics is None:
+        metrics = compute_chain_metrics(options_data, context)
 
-    total_puts = puts_data['volume'].sum()
-    total_calls = calls_data['volume'].sum()
+    total_puts = metrics.total_puts
+    total_calls = metrics.total_calls
     
     if total_calls == 0:
         print("Warning: Total calls volume is zero. Cannot calculate put/call ratio.")
@@ -54,30 +57,389 @@ def calculate_greeks(option_type, S, K, T, r, sigma):
     return greeks
 
 
-def add_greeks_to_options_data(options_data, recent_price, risk_free_rate=0.01):
-    """Add Greeks calculations to options data."""
+def calculate_greeks_vectorized(is_call, S, K, T, r, sigma, higher_order=False):
+    """Calculate Black-Scholes Greeks for whole arrays of options in one pass.
+
+    Uses the same conventions as py_vollib's analytical Greeks (theta per calendar day, vega and rho
+    per 1% move). Options with non-positive or non-finite T, sigma, S or K get NaN.
+
+    With higher_order=True also returns rho, vanna (delta change per vol point), volga (vega change
+    per vol point), charm (delta change per calendar day) and speed (gamma change per unit of spot),
+    all derived from the same d1/d2/pdf/cdf arrays.
+    """
+    is_call = np.asarray(is_call, dtype=bool)
+    S, K, T, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (S, K, T, sigma)))
+    valid = (T > 0) & (sigma > 0) & (S > 0) & (K > 0) & np.isfinite(T + sigma + S + K)
+
+    # Invalid rows are evaluated on harmless placeholder inputs and masked out at the end
+    S = np.where(valid, S, 1.0)
+    K = np.where(valid, K, 1.0)
+    T = np.where(valid, T, 1.0)
+    sigma = np.where(valid, sigma, 1.0)
+
+    sqrt_t = np.sqrt(T)
+    sigma_sqrt_t = sigma * sqrt_t
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    pdf_d1 = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+    cdf_d1 = ndtr(d1)
+    discounted_strike = K * np.exp(-r * T)
+
+    greeks = {
+        'delta': np.where(is_call, cdf_d1, cdf_d1 - 1),
+        'gamma': pdf_d1 / (S * sigma_sqrt_t),
+        'theta': (-S * pdf_d1 * sigma / (2 * sqrt_t)
+                  + np.where(is_call, -r * discounted_strike * ndtr(d2), r * discounted_strike * ndtr(-d2))) / 365,
+        'vega': S * pdf_d1 * sqrt_t * 0.01,
+    }
+
+    if higher_order:
+        greeks['rho'] = np.where(is_call, discounted_strike * T * ndtr(d2),
+                                 -discounted_strike * T * ndtr(-d2)) * 0.01
+        greeks['vanna'] = -pdf_d1 * d2 / sigma * 0.01
+        greeks['volga'] = greeks['vega'] * d1 * d2 / sigma * 0.01
+        greeks['charm'] = -pdf_d1 * (2 * r * T - d2 * sigma_sqrt_t) / (2 * T * sigma_sqrt_t) / 365
+        greeks['speed'] = -greeks['gamma'] / S * (d1 / sigma_sqrt_t + 1)
+
+    return {greek: np.where(valid, values, np.nan) for greek, values in greeks.items()}
+
+
+def black_scholes_price(is_call, S, K, T, r, sigma):
+    """Vectorized Black-Scholes price for arrays of calls and puts."""
+    is_call = np.asarray(is_call, dtype=bool)
+    S, K, T, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (S, K, T, sigma)))
+    sigma_sqrt_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    discounted_strike = K * np.exp(-r * T)
+    return np.where(is_call, S * ndtr(d1) - discounted_strike * ndtr(d2),
+                    discounted_strike * ndtr(-d2) - S * ndtr(-d1))
+
+
+def implied_volatility_vectorized(is_call, price, S, K, T, r, tol=1e-8, max_iter=50, max_sigma=5.0):
+    """Solve Black-Scholes implied volatility for whole arrays of option prices at once.
+
+    Starts from the Corrado-Miller rational approximation, then runs batched Halley steps on the
+    still-unconverged options only. Each option is priced on its out-of-the-money side via put-call
+    parity, so convergence is judged relative to time value. Every option keeps a [low, high]
+    bracket; steps that leave it (or hit a vanishing vega) fall back to bisection, so each option
+    converges or runs out of iterations. Prices outside the no-arbitrage bounds, and options that do not converge within
+    max_iter, get NaN.
+    """
+    is_call, price, S, K, T = np.broadcast_arrays(*(np.asarray(x) for x in (is_call, price, S, K, T)))
+    is_call = is_call.astype(bool)
+    price, S, K, T = (np.asarray(x, dtype=np.float64) for x in (price, S, K, T))
+    discounted_strike = K * np.exp(-r * np.where(T > 0, T, 0))
+
+    # Each option is solved on its out-of-the-money side (put-call parity), so the convergence test is
+    # relative to the time value rather than to a large in-the-money price
+    forward_gap = S - discounted_strike
+    call_price = np.where(is_call, price, price + forward_gap)
+    otm_call = forward_gap <= 0
+    otm_price = np.where(otm_call == is_call, price, np.where(is_call, price - forward_gap, price + forward_gap))
+    valid = ((T > 0) & (S > 0) & (K > 0) & np.isfinite(call_price)
+             & (otm_price > 0) & (call_price < S))
+
+    sigma = np.full(price.shape, np.nan)
+    idx = np.flatnonzero(valid)
+    S, K, T, kd = S[idx], K[idx], T[idx], discounted_strike[idx]
+    call_target, target, otm_call = call_price[idx], otm_price[idx], otm_call[idx]
+
+    # Corrado-Miller initial guess
+    half_gap = (S - kd) / 2
+    inner = np.maximum((call_target - half_gap) ** 2 - (S - kd) ** 2 / np.pi, 0)
+    guess = np.sqrt(2 * np.pi / T) / (S + kd) * (call_target - half_gap + np.sqrt(inner))
+    guess = np.clip(np.nan_to_num(guess, nan=0.3), 1e-3, max_sigma)
+
+    low = np.full(idx.shape, 1e-6)
+    high = np.full(idx.shape, max_sigma)
+    current = guess
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        sqrt_t = np.sqrt(T)
+        d1 = (np.log(S / K) + (r + 0.5 * current ** 2) * T) / (current * sqrt_t)
+        d2 = d1 - current * sqrt_t
+        diff = np.where(otm_call, S * ndtr(d1) - kd * ndtr(d2), kd * ndtr(-d2) - S * ndtr(-d1)) - target
+        vega = S * np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi) * sqrt_t
+
+        converged = np.abs(diff) < tol * np.maximum(target, 1e-12)
+        sigma[idx[converged]] = current[converged]
+
+        high = np.where(diff > 0, current, high)
+        low = np.where(diff < 0, current, low)
+        newton = diff / np.where(vega > 0, vega, np.nan)
+        halley = 1 - 0.5 * newton * d1 * d2 / current
+        step = np.where(np.abs(halley) > 0.5, newton / halley, newton)
+        proposed = current - step
+        inside = np.isfinite(proposed) & (proposed > low) & (proposed < high)
+        current = np.where(inside, proposed, 0.5 * (low + high))
+
+        active = ~converged
+        idx, S, K, T, target, kd = idx[active], S[active], K[active], T[active], target[active], kd[active]
+        otm_call = otm_call[active]
+        low, high, current = low[active], high[active], current[active]
+
+    return sigma
+
+
+def add_solved_implied_volatility(options_data, recent_price, risk_free_rate=0.01, replace=False):
+    """Solve implied volatility from option prices instead of trusting the quoted impliedVolatility.
+
+    The mid price is used where both bid and ask are positive, otherwise the last trade price.
+    Adds 'solved_iv' (decimal). With replace=True, 'impliedVolatility' and 'implied_volatility' are
+    replaced by the solved values so every downstream chart and interpretation uses them; options
+    that cannot be solved keep the quoted value.
+    """
+    if options_data is None:
+        return None
+
+    bid = options_data['bid'].to_numpy(dtype=np.float64)
+    ask = options_data['ask'].to_numpy(dtype=np.float64)
+    price = np.where((bid > 0) & (ask > 0), 0.5 * (bid + ask), options_data['lastPrice'].to_numpy(dtype=np.float64))
+    solved_iv = implied_volatility_vectorized((options_data['type'] == 'call').to_numpy(), price, recent_price,
+                                              options_data['strike'].to_numpy(), time_to_expiry(options_data),
+                                              risk_free_rate)
+
+    options_data = options_data.assign(solved_iv=solved_iv)
+    if replace:
+        quoted = options_data['impliedVolatility']
+        options_data['impliedVolatility'] = np.where(np.isnan(solved_iv), quoted, solved_iv).astype(quoted.dtype)
+        options_data['implied_volatility'] = options_data['impliedVolatility'] * 100
+    return options_data
+
+
+def time_to_expiry(options_data, now=None):
+    """Year fractions (whole days / 365.25) from now until each option's expiration."""
+    now = now or pd.Timestamp.now()
+    if 'expiry' in options_data:
+        expiry = options_data['expiry']
+    else:
+        expiry = pd.to_datetime(options_data['expiration'].astype(str))
+    return ((expiry - now).dt.days / 365.25).to_numpy()
+
+
+def add_greeks_to_options_data(options_data, recent_price, risk_free_rate=0.01, higher_order=False,
+                               contract_size=100, context=None):
+    """Add Greeks calculations to options data.
+
+    With higher_order=True the higher-order Greeks are added as well, together with open-interest
+    weighted dollar exposures per row: dollar_delta (per $1 of spot), dollar_gamma (change in
+    dollar delta for a 1% spot move) and dollar_vega (per vol point). A prebuilt ChainContext
+    supplies the call mask and year fractions.
+    """
     if options_data is None:
         return None, None
-        
-    calls_data = options_data[options_data["type"] == "call"].copy()
-    puts_data = options_data[options_data["type"] == "put"].copy()
-
-    for index, row in calls_data.iterrows():
-        T = (pd.to_datetime(row['expiration']) - pd.Timestamp.now()).days / 365.25
-        if T > 0 and row['impliedVolatility'] > 0:
-            greeks = calculate_greeks("call", recent_price, row['strike'], T, risk_free_rate, row['impliedVolatility'])
-        else:
-            greeks = {'delta': np.nan, 'gamma': np.nan, 'theta': np.nan, 'vega': np.nan}
-        for greek, value in greeks.items():
-            calls_data.at[index, greek] = value
-
-    for index, row in puts_data.iterrows():
-        T = (pd.to_datetime(row['expiration']) - pd.Timestamp.now()).days / 365.25
-        if T > 0 and row['impliedVolatility'] > 0:
-            greeks = calculate_greeks("put", recent_price, row['strike'], T, risk_free_rate, row['impliedVolatility'])
-        else:
-            greeks = {'delta': np.nan, 'gamma': np.nan, 'theta': np.nan, 'vega': np.nan}
-        for greek, value in greeks.items():
-            puts_data.at[index, greek] = value
-
-    return calls_data, puts_data 
\ No newline at end of file
+
+    context = ChainContext.ensure(options_data, context, recent_price=recent_price, risk_free_rate=risk_free_rate)
+    is_call = context.is_call
+    greeks = calculate_greeks_vectorized(is_call, recent_price, options_data['strike'].to_numpy(),
+                                         context.time_to_expiry, risk_free_rate,
+                                         options_data['impliedVolatility'].to_numpy(), higher_order)
+    if higher_order:
+        open_interest = options_data['openInterest'].to_numpy(dtype=np.float64) * contract_size
+        greeks['dollar_delta'] = greeks['delta'] * open_interest * recent_price
+        greeks['dollar_gamma'] = greeks['gamma'] * open_interest * recent_price ** 2 * 0.01
+        greeks['dollar_vega'] = greeks['vega'] * open_interest
+    options_data = options_data.assign(**greeks)
+
+    calls_data = options_data.iloc[context.call_idx]
+    puts_data = options_data.iloc[context.put_idx]
+
+    return calls_data, puts_data
+
+
+def aggregate_greek_exposures(calls_data, puts_data):
+    """Aggregate dollar delta/gamma/vega exposures per strike and per expiration.
+
+    Expects frames returned by add_greeks_to_options_data(..., higher_order=True). Returns
+    (by_strike, by_expiration), each with call, put and net columns for every exposure.
+    """
+    if calls_data is None or puts_data is None:
+        return None, None
+
+    exposures = ['dollar_delta', 'dollar_gamma', 'dollar_vega']
+    options_data = pd.concat([calls_data, puts_data])
+    option_type = options_data['type'].astype(str)
+
+    def aggregate(key):
+        grouped = options_data.groupby([key, option_type], observed=True)[exposures].sum().unstack(fill_value=0)
+        grouped.columns = [f"{option_type_}_{exposure}" for exposure, option_type_ in grouped.columns]
+        for exposure in exposures:
+            grouped[f"net_{exposure}"] = grouped.get(f"call_{exposure}", 0) + grouped.get(f"put_{exposure}", 0)
+        return grouped
+
+    return aggregate('strike'), aggregate('expiration')
+
+
+def gamma_exposure_profile(options_data, recent_price, risk_free_rate=0.01, spot_range=(0.8, 1.2), n_spots=101,
+                           contract_size=100, context=None, max_cells=2_000_000):
+    """Dealer gamma exposure (GEX) per strike and re-evaluated over a grid of hypothetical spot prices.
+
+    Uses the common convention that dealers are long the calls and short the puts customers trade, so
+    call gamma counts positive and put gamma negative. Exposures are dollars per 1% spot move:
+    gamma * open interest * contract_size * S^2 * 0.01. The spot grid is evaluated as one broadcast
+    spots x options gamma array (in chunks of at most max_cells elements) reduced with a matrix product.
+
+    Returns (by_strike, profile, flip_level): by_strike has call_gex, put_gex and net_gex per strike at
+    the current spot, profile has total_gex per grid spot, and flip_level is the zero-gamma spot nearest
+    to the current price (None if the profile never changes sign).
+    """
+    if options_data is None:
+        return None, None, None
+
+    context = ChainContext.ensure(options_data, context, recent_price=recent_price, risk_free_rate=risk_free_rate)
+    T = context.time_to_expiry
+    K = options_data['strike'].to_numpy(dtype=np.float64)
+    sigma = options_data['impliedVolatility'].to_numpy(dtype=np.float64)
+    open_interest = np.nan_to_num(options_data['openInterest'].to_numpy(dtype=np.float64))
+    valid = (T > 0) & (sigma > 0) & (K > 0) & np.isfinite(T + sigma + K)
+    T, K, sigma = T[valid], K[valid], sigma[valid]
+    weights = np.where(context.is_call, 1.0, -1.0)[valid] * open_interest[valid] * contract_size
+    sigma_sqrt_t = sigma * np.sqrt(T)
+    drift = (risk_free_rate + 0.5 * sigma ** 2) * T
+
+    def gamma(spots):
+        d1 = (np.log(spots[:, None] / K) + drift) / sigma_sqrt_t
+        return np.exp(-0.5 * d1 ** 2) / (np.sqrt(2 * np.pi) * spots[:, None] * sigma_sqrt_t)
+
+    current = gamma(np.array([recent_price], dtype=np.float64))[0] * weights * recent_price ** 2 * 0.01
+    option_type = np.where(context.is_call[valid], 'call', 'put')
+    by_strike = pd.DataFrame({'strike': options_data['strike'].to_numpy()[valid], 'type': option_type, 'gex': current}) \
+        .pivot_table(index='strike', columns='type', values='gex', aggfunc='sum', fill_value=0.0)
+    by_strike = by_strike.reindex(columns=['call', 'put'], fill_value=0.0).add_suffix('_gex')
+    by_strike.columns.name = None
+    by_strike['net_gex'] = by_strike['call_gex'] + by_strike['put_gex']
+
+    spots = np.linspace(spot_range[0] * recent_price, spot_range[1] * recent_price, n_spots)
+    total = np.empty(n_spots)
+    chunk = max(1, max_cells // max(len(K), 1))
+    for start in range(0, n_spots, chunk):
+        block = spots[start:start + chunk]
+        total[start:start + chunk] = gamma(block) @ weights * block ** 2 * 0.01
+    profile = pd.DataFrame({'total_gex': total}, index=pd.Index(spots, name='spot'))
+
+    crossings = np.flatnonzero(np.sign(total[:-1]) * np.sign(total[1:]) < 0)
+    flip_level = None
+    if crossings.size:
+        s0, s1 = spots[crossings], spots[crossings + 1]
+        g0, g1 = total[crossings], total[crossings + 1]
+        levels = s0 - g0 * (s1 - s0) / (g1 - g0)
+        flip_level = float(levels[np.argmin(np.abs(levels - recent_price))])
+
+    return by_strike, profile, flip_level
+
+
+def _open_interest_payoffs(codes, strike, is_call, open_interest, contract_size=100):
+    """Aggregate option-holder payoff at every strike of every group, settled at that strike.
+
+    Rows are sorted by (group, strike) once; for a settlement price P the call payoff
+    sum(OI * (P - K)) over K < P and the put payoff sum(OI * (K - P)) over K > P are read off running
+    sums of OI and OI * K, so all groups are evaluated in O(n log n) instead of O(n^2) per group.
+
+    Returns (group, settlement, call_payoff, put_payoff) arrays, one entry per distinct group/strike pair,
+    sorted by group and settlement price.
+    """
+    valid = np.isfinite(strike)
+    codes, strike, is_call = codes[valid], strike[valid], is_call[valid]
+    open_interest = np.nan_to_num(open_interest[valid]) * contract_size
+
+    order = np.lexsort((strike, codes))
+    codes, strike, is_call, open_interest = codes[order], strike[order], is_call[order], open_interest[order]
+    call_oi = np.where(is_call, open_interest, 0.0)
+    put_oi = open_interest - call_oi
+
+    n = len(strike)
+    group_first = np.r_[True, codes[1:] != codes[:-1]] if n else np.zeros(0, dtype=bool)
+    run_last = np.r_[(codes[1:] != codes[:-1]) | (strike[1:] != strike[:-1]), True] if n else group_first
+    group_start = np.maximum.accumulate(np.where(group_first, np.arange(n), 0))
+
+    def up_to(values):
+        # Sum of values from the start of the row's group through the end of its strike run
+        running = np.r_[0.0, np.cumsum(values)]
+        return (running[1:] - running[group_start])[run_last]
+
+    def group_total(values):
+        return np.bincount(codes, weights=values, minlength=codes.max() + 1 if n else 0)[codes[run_last]]
+
+    group, settlement = codes[run_last], strike[run_last]
+    call_payoff = settlement * up_to(call_oi) - up_to(call_oi * strike)
+    put_payoff = (group_total(put_oi * strike) - up_to(put_oi * strike)) \
+        - settlement * (group_total(put_oi) - up_to(put_oi))
+    return group, settlement, call_payoff, put_payoff
+
+
+def _max_pain_table(group, settlement, call_payoff, put_payoff, labels, spot=None):
+    total = call_payoff + put_payoff
+    order = np.lexsort((total, group))
+    sorted_group = group[order]
+    first = order[np.r_[True, sorted_group[1:] != sorted_group[:-1]]] if len(order) else order
+    table = pd.DataFrame({
+        'max_pain': settlement[first],
+        'holder_payoff': total[first],
+        'call_payoff': call_payoff[first],
+        'put_payoff': put_payoff[first],
+    }, index=labels[group[first]])
+    if spot is not None:
+        table['distance_pct'] = (table['max_pain'] / np.asarray(spot, dtype=np.float64)[group[first]] - 1) * 100
+    return table
+
+
+def open_interest_payoff_curves(options_data, contract_size=100, context=None):
+    """Aggregate option-holder payoff at expiration for every candidate settlement price (each listed strike).
+
+    Returns a long DataFrame with expiration, settlement, call_payoff, put_payoff and total_payoff columns
+    (dollars), sorted by expiration and settlement price; None if there is no data.
+    """
+    if options_data is None:
+        return None
+
+    context = ChainContext.ensure(options_data, context)
+    group, settlement, call_payoff, put_payoff = _open_interest_payoffs(
+        context.expiration_codes, options_data['strike'].to_numpy(dtype=np.float64), context.is_call,
+        options_data['openInterest'].to_numpy(dtype=np.float64), contract_size)
+    return pd.DataFrame({
+        'expiration': context.expirations[group],
+        'settlement': settlement,
+        'call_payoff': call_payoff,
+        'put_payoff': put_payoff,
+        'total_payoff': call_payoff + put_payoff,
+    })
+
+
+def max_pain(options_data, recent_price=None, contract_size=100, context=None):
+    """Max pain per expiration: the strike at which option holders' aggregate payoff is smallest.
+
+    Returns a DataFrame indexed by expiration with max_pain, the holder payoff there (total, calls and
+    puts, in dollars) and, if recent_price is given, distance_pct from the current price; None if there
+    is no data.
+    """
+    if options_data is None:
+        return None
+
+    context = ChainContext.ensure(options_data, context)
+    payoffs = _open_interest_payoffs(context.expiration_codes, options_data['strike'].to_numpy(dtype=np.float64),
+                                     context.is_call, options_data['openInterest'].to_numpy(dtype=np.float64),
+                                     contract_size)
+    spot = None if recent_price is None else np.full(len(context.expirations), recent_price, dtype=np.float64)
+    return _max_pain_table(*payoffs, pd.Index(context.expirations, name='expiration'), spot)
+
+
+def max_pain_batch(options_data, recent_prices=None, contract_size=100):
+    """`max_pain` for every ticker and expiration of a `get_options_data_batch` frame in a single pass.
+
+    Returns a DataFrame indexed by (ticker, expiration).
+    """
+    if options_data is None:
+        return None
+
+    tickers = options_data['ticker'].astype(str)
+    codes, groups = pd.factorize(pd.MultiIndex.from_arrays([tickers, options_data['expiration'].astype(str)]))
+    groups = groups.set_names(['ticker', 'expiration'])
+    payoffs = _open_interest_payoffs(codes, options_data['strike'].to_numpy(dtype=np.float64),
+                                     (options_data['type'] == 'call').to_numpy(),
+                                     options_data['openInterest'].to_numpy(dtype=np.float64), contract_size)
+    spot = None
+    if recent_prices is not None:
+        spot = groups.get_level_values('ticker').map(recent_prices).to_numpy(dtype=np.float64)
+    return _max_pain_table(*payoffs, groups, spot)
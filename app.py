@@ -7,11 +7,15 @@ Bu uygulama, opsiyon verilerinin analizini yaparak piyasa hissiyatını ve impli
 
 import pandas as pd
 import streamlit as st
-from data_fetcher import get_options_data, get_historical_iv
+from data_fetcher import get_options_data, get_historical_iv, iter_options_data
 from analysis import (
     calculate_put_call_ratio, 
     calculate_sentiment_score, 
-    add_greeks_to_options_data
+    add_greeks_to_options_data,
+    add_solved_implied_volatility,
+    aggregate_greek_exposures,
+    gamma_exposure_profile,
+    max_pain
 )
 from visualization import (
     plot_volatility_smile,
@@ -19,8 +23,11 @@ from visualization import (
     plot_volume,
     plot_3d_puts_implied_volatility,
     plot_3d_calls_implied_volatility,
+    plot_iv_surface,
     plot_historical_iv,
     plot_greeks,
+    plot_gamma_exposure,
+    plot_risk_neutral_density,
     plot_future_iv_predictions
 )
 from interpretation import (
@@ -32,12 +39,18 @@ from interpretation import (
     interpret_historical_iv,
     interpret_put_call_ratio,
     interpret_greeks,
+    interpret_gamma_exposure,
+    interpret_risk_neutral_density,
     interpret_sentiment_score,
     overall_interpretation,
     interpret_future_iv_predictions
 )
-from utils import calculate_highest_iv_calls, calculate_lowest_iv_puts
-from ml_models import train_iv_prediction_model, predict_future_iv
+from chain_context import ChainContext
+from metrics import compute_chain_metrics, compute_skew_metrics
+from surface import fit_svi_surface
+from density import risk_neutral_density
+from ml_models import predict_future_iv
+from model_registry import get_or_train_model
 from datetime import datetime
 
 st.set_page_config(page_title="Implied Volatility Analizi", layout="wide", page_icon="📈")
@@ -49,57 +62,135 @@ Bu uygulama, seçtiğiniz hisse senedinin opsiyon verilerini analiz ederek impli
 with st.sidebar:
     st.header("Ayarlar")
     ticker = st.text_input("Sembol (ör. AAPL, TSLA)", value="AAPL")
+    force_refresh = st.checkbox("Önbelleği yenile", value=False)
+    progressive = st.checkbox("Kademeli yükleme", value=True,
+                              help="Grafikleri vadeler indikçe, en yakın vadeden başlayarak günceller.")
+    iv_source = st.selectbox("IV kaynağı", ["yfinance", "Fiyattan hesapla (orta fiyat)"],
+                             help="Fiyattan hesaplamada IV, bid/ask orta fiyatından (yoksa son fiyattan) "
+                                  "Black-Scholes ile çözülür.")
+    solve_iv = iv_source != "yfinance"
     analyze_btn = st.button("Analizi Başlat")
 
+TAB_NAMES = [
+    "Volatilite Smile",
+    "Açık Pozisyon",
+    "İşlem Hacmi",
+    "IV Yüzeyi",
+    "Tarihsel IV",
+    "Put/Call Oranı",
+    "Grekler",
+    "Gamma Maruziyeti",
+    "Hissiyat Skoru",
+    "En Yüksek/En Düşük IV",
+    "IV Tahmini (ML)",
+    "Genel Yorum"
+]
+
+
+def create_tabs():
+    """Sekmeleri ve kademeli olarak güncellenen grafikler için yer tutucuları oluşturur."""
+    tabs = st.tabs(TAB_NAMES)
+    with tabs[0]:
+        st.subheader("Volatilite Smile")
+        smile_placeholder = st.empty()
+    with tabs[1]:
+        st.subheader("Açık Pozisyon (Open Interest)")
+        oi_placeholder = st.empty()
+    return tabs, smile_placeholder, oi_placeholder
+
+
 if analyze_btn:
 
-    options_data, recent_price = get_options_data(ticker)
+    tabs = None
+    if progressive:
+        # Sekmeler veri inmeden oluşturulur, smile ve açık pozisyon grafikleri her yeni vadeyle güncellenir
+        tabs, smile_placeholder, oi_placeholder = create_tabs()
+        chunks = []
+        recent_price = None
+        for expiration, chunk, recent_price in iter_options_data(ticker, force_refresh=force_refresh):
+            if solve_iv:
+                chunk = add_solved_implied_volatility(chunk, recent_price, replace=True)
+            chunks.append(chunk)
+            partial_data = pd.concat(chunks)
+            smile_placeholder.plotly_chart(plot_volatility_smile(partial_data, recent_price, ticker)[0],
+                                           use_container_width=True, key=f"smile_{expiration}")
+            oi_placeholder.plotly_chart(plot_open_interest(partial_data, recent_price, ticker)[0],
+                                        use_container_width=True, key=f"oi_{expiration}")
+        options_data = pd.concat(chunks) if chunks else None
+    else:
+        options_data, recent_price = get_options_data(ticker, force_refresh=force_refresh)
+        if solve_iv:
+            options_data = add_solved_implied_volatility(options_data, recent_price, replace=True)
+
     if options_data is None:
         st.error(f"{ticker} için geçerli opsiyon verisi bulunamadı.")
     else:
-        tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9, tab10, tab11 = st.tabs([
-            "Volatilite Smile",
-            "Açık Pozisyon",
-            "İşlem Hacmi",
-            "IV Yüzeyi",
-            "Tarihsel IV",
-            "Put/Call Oranı",
-            "Grekler",
-            "Hissiyat Skoru",
-            "En Yüksek/En Düşük IV",
-            "IV Tahmini (ML)",
-            "Genel Yorum"
-        ])
+        if tabs is None:
+            tabs, smile_placeholder, oi_placeholder = create_tabs()
+        tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab_gex, tab8, tab9, tab10, tab11 = tabs
+        # Vadeye kalan süre, call/put indeksleri ve vade dilimleri tüm sekmeler için bir kez hesaplanır
+        context = ChainContext(options_data, recent_price)
+        # Ortalamalar, toplamlar, en yüksek/en düşük değerler ve gruplamalar tek bir geçişte hesaplanır
+        metrics = compute_chain_metrics(options_data, context)
 
         with tab1:
-            st.subheader("Volatilite Smile")
-            iv_results = plot_volatility_smile(options_data, recent_price, ticker)
-            st.plotly_chart(iv_results[0], use_container_width=True)
-            yorum = interpret_volatility_smile(ticker, iv_results[1], iv_results[2], iv_results[3], iv_results[4])
+            iv_results = plot_volatility_smile(options_data, recent_price, ticker, context, metrics)
+            smile_placeholder.plotly_chart(iv_results[0], use_container_width=True)
+            skew = compute_skew_metrics(options_data, recent_price, context=context)
+            if skew is not None and not skew.empty:
+                st.subheader("Vade Yapısı ve Çarpıklık")
+                st.dataframe(skew.drop(columns="time_to_expiry").round(2))
+            yorum = interpret_volatility_smile(ticker, iv_results[1], iv_results[2], iv_results[3], iv_results[4], skew)
             st.markdown(f"**Yorum:** {yorum}")
 
         with tab2:
-            st.subheader("Açık Pozisyon (Open Interest)")
-            oi_results = plot_open_interest(options_data, recent_price, ticker)
-            st.plotly_chart(oi_results[0], use_container_width=True)
-            yorum = interpret_open_interest(ticker, oi_results[1], oi_results[2], oi_results[3], oi_results[4])
+            oi_results = plot_open_interest(options_data, recent_price, ticker, context, metrics)
+            oi_placeholder.plotly_chart(oi_results[0], use_container_width=True)
+            pain = max_pain(options_data, recent_price, context=context)
+            if pain is not None and not pain.empty:
+                st.subheader("Vadeye Göre Max Pain")
+                st.dataframe(pain.round(2))
+            yorum = interpret_open_interest(ticker, oi_results[1], oi_results[2], oi_results[3], oi_results[4], metrics,
+                                            pain)
             st.markdown(f"**Yorum:** {yorum}")
 
         with tab3:
             st.subheader("İşlem Hacmi (Volume)")
-            vol_results = plot_volume(options_data, recent_price, ticker)
+            vol_results = plot_volume(options_data, recent_price, ticker, context, metrics)
             st.plotly_chart(vol_results[0], use_container_width=True)
-            yorum = interpret_volume(ticker, vol_results[1], vol_results[2], vol_results[3], vol_results[4])
+            yorum = interpret_volume(ticker, vol_results[1], vol_results[2], vol_results[3], vol_results[4], metrics)
             st.markdown(f"**Yorum:** {yorum}")
 
         with tab4:
             st.subheader("IV Yüzeyi (3D Volatilite)")
-            puts_data = plot_3d_puts_implied_volatility(options_data, ticker)
-            calls_data = plot_3d_calls_implied_volatility(options_data, ticker)
+            puts_data = plot_3d_puts_implied_volatility(options_data, ticker, context)
+            calls_data = plot_3d_calls_implied_volatility(options_data, ticker, context)
+            # Önceki çalıştırmanın parametrelerinden başlatılan SVI kalibrasyonu
+            iv_surface = fit_svi_surface(options_data, recent_price, ticker, context=context)
+            # Kalibrasyon hatası yüksek vadeler çizilmez, kullanıcıya listelenir
+            reliable_surface = iv_surface.reliable() if iv_surface is not None else None
+            if reliable_surface is not None:
+                st.plotly_chart(plot_iv_surface(reliable_surface, ticker), use_container_width=True)
+                st.caption(f"SVI kalibrasyonu: {len(reliable_surface.T)} vade, ortalama hata "
+                           f"{reliable_surface.rmse.mean() * 100:.2f} IV puanı.")
+                # Aynı yüzeyden tüm vadeler için risk-nötr yoğunluk
+                rnd = risk_neutral_density(options_data, recent_price, surface=reliable_surface)
+                if rnd.dropped:
+                    st.warning("Kalibrasyonu güvenilmez olduğu için yüzeyden ve yoğunluktan çıkarılan vadeler: "
+                               + ", ".join(f"{expiration} (hata {rmse * 100:.1f} IV puanı)"
+                                           for expiration, rmse in rnd.dropped.items()))
+                st.plotly_chart(plot_risk_neutral_density(rnd, recent_price, ticker), use_container_width=True)
+                st.dataframe(rnd.summary.round(3))
+                st.markdown(f"**Yorum:** {interpret_risk_neutral_density(ticker, rnd)}")
+            elif iv_surface is not None:
+                st.warning("SVI yüzeyi hiçbir vade için güvenilir biçimde kalibre edilemedi (ortalama hata "
+                           f"{iv_surface.rmse.mean() * 100:.1f} IV puanı).")
+            else:
+                st.info("SVI yüzeyi için yeterli sayıda geçerli opsiyon bulunamadı.")
             st.plotly_chart(puts_data[0], use_container_width=True)
             st.plotly_chart(calls_data[0], use_container_width=True)
-            yorum_put = interpret_3d_puts_implied_volatility(ticker, puts_data[1])
-            yorum_call = interpret_3d_calls_implied_volatility(ticker, calls_data[1])
+            yorum_put = interpret_3d_puts_implied_volatility(ticker, puts_data[1], context, metrics)
+            yorum_call = interpret_3d_calls_implied_volatility(ticker, calls_data[1], context, metrics)
             st.markdown(f"**Put Yorum:** {yorum_put}")
             st.markdown(f"**Call Yorum:** {yorum_call}")
 
@@ -107,7 +198,7 @@ if analyze_btn:
             st.subheader("Tarihsel Implied Volatility")
             start_date = "2020-01-01"
             end_date = datetime.now().strftime("%Y-%m-%d")
-            historical_iv = get_historical_iv(ticker, start_date, end_date)
+            historical_iv = get_historical_iv(ticker, start_date, end_date, force_refresh=force_refresh)
             hist_results = plot_historical_iv(ticker, historical_iv)
             st.plotly_chart(hist_results[0], use_container_width=True)
             yorum = interpret_historical_iv(ticker, hist_results[1], hist_results[2])
@@ -115,22 +206,38 @@ if analyze_btn:
 
         with tab6:
             st.subheader("Put/Call Oranı")
-            ratio_results = calculate_put_call_ratio(options_data)
+            ratio_results = calculate_put_call_ratio(options_data, context, metrics)
             st.metric("Put/Call Oranı", f"{ratio_results[2]:.2f}")
             yorum = interpret_put_call_ratio(ticker, *ratio_results)
             st.markdown(f"**Yorum:** {yorum}")
 
         with tab7:
             st.subheader("Grekler Analizi")
-            calls_with_greeks, puts_with_greeks = add_greeks_to_options_data(options_data, recent_price)
+            calls_with_greeks, puts_with_greeks = add_greeks_to_options_data(options_data, recent_price, higher_order=True,
+                                                                            context=context)
             st.plotly_chart(plot_greeks(calls_with_greeks, puts_with_greeks, recent_price, ticker), use_container_width=True)
             greeks_results = interpret_greeks(ticker, calls_with_greeks, puts_with_greeks)
             st.markdown(f"**Yorum:** {greeks_results[0]}")
 
+            exposure_by_strike, exposure_by_expiration = aggregate_greek_exposures(calls_with_greeks, puts_with_greeks)
+            with st.expander("Açık pozisyon ağırlıklı dolar maruziyetleri (delta / gamma / vega)"):
+                st.write("**Vade Tarihine Göre:**")
+                st.dataframe(exposure_by_expiration)
+                st.write("**Kullanım Fiyatına Göre:**")
+                st.dataframe(exposure_by_strike)
+
+        with tab_gex:
+            st.subheader("Gamma Maruziyeti (GEX)")
+            gex_by_strike, gex_profile, flip_level = gamma_exposure_profile(options_data, recent_price, context=context)
+            st.plotly_chart(plot_gamma_exposure(gex_by_strike, gex_profile, flip_level, recent_price, ticker),
+                            use_container_width=True)
+            yorum = interpret_gamma_exposure(ticker, gex_by_strike, gex_profile, flip_level, recent_price)
+            st.markdown(f"**Yorum:** {yorum}")
+
         with tab8:
             st.subheader("Piyasa Hissiyatı (Sentiment Skoru)")
-            high_iv_calls = calculate_highest_iv_calls(calls_data[1])
-            low_iv_puts = calculate_lowest_iv_puts(puts_data[1])
+            high_iv_calls = metrics.calls.max_iv if metrics.calls.count else 0
+            low_iv_puts = metrics.puts.min_iv if metrics.puts.count else 0
             total_puts, total_calls, _ = ratio_results
             sentiment_results = calculate_sentiment_score(options_data, high_iv_calls, low_iv_puts, total_calls, total_puts)
             yorum = interpret_sentiment_score(ticker, *sentiment_results, high_iv_calls, low_iv_puts, total_calls, total_puts)
@@ -161,10 +268,16 @@ if analyze_btn:
             window_size = 10
             days_to_predict = 5
             
-            with st.spinner("ML modeli eğitiliyor..."):
-                model, scaler, feature_columns = train_iv_prediction_model(historical_iv, window_size=window_size)
+            # Aynı veriyle eğitilmiş taze bir model kayıtta varsa yeniden eğitilmez
+            with st.spinner("ML modeli hazırlanıyor..."):
+                model, scaler, feature_columns, model_info = get_or_train_model(ticker, historical_iv,
+                                                                                 window_size=window_size)
             
             if model is not None:
+                trained_at = datetime.fromtimestamp(model_info["trained_at"]).strftime("%Y-%m-%d %H:%M")
+                source = {"cached": "kayıtlı model", "incremental": "artımlı güncellenen model",
+                          "full": "yeni eğitilen model"}[model_info["mode"]]
+                st.caption(f"{source} (eğitim: {trained_at}, doğrulama MSE: {model_info['metrics']['cv_mse']:.4f})")
                 with st.spinner("Gelecek IV değerleri tahmin ediliyor..."):
                     predictions_df = predict_future_iv(model, scaler, historical_iv, days_to_predict=days_to_predict, window_size=window_size)
                 
@@ -194,6 +307,7 @@ if analyze_btn:
                 hist_data, 
                 ratio_results, 
                 greeks_results,  
-                sentiment_data
+                sentiment_data,
+                metrics
             )
             st.markdown(f"**Genel Yorum:** {genel_yorum}")
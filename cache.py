@@ -0,0 +1,281 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+CACHE_DIR = os.environ.get(
+    "IV_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "implied_volatility_analysis")
+)
+CHAIN_TTL = 300
+HISTORY_TTL = 3600
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+LOCK_TIMEOUT = 10.0
+STALE_LOCK_SECONDS = 60.0
+# Önbellek boyutu yazma başına tüm dizin taranmadan süreç içinde tutulan bir toplamla izlenir; diğer
+# süreçlerin yazdıklarını da yakalamak için bu kadar yazmada bir tam tarama yapılır
+RESCAN_WRITES = 256
+
+_size_estimates = {}
+_size_lock = threading.Lock()
+
+
+def safe_name(value):
+    """Bir sembolü veya vadeyi dosya sistemi için güvenli, büyük harfli bir dizin adına çevirir."""
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(value).upper())
+
+
+def _chain_dir(ticker, expiration, cache_dir):
+    return os.path.join(cache_dir, "chains", safe_name(ticker), safe_name(expiration))
+
+
+def _meta_dir(ticker, cache_dir):
+    return os.path.join(cache_dir, "chains", safe_name(ticker), "_META")
+
+
+@contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT, stale=STALE_LOCK_SECONDS):
+    """Süreçler arası paylaşılan basit bir kilit dosyası oluşturur.
+
+    Kilit, `path + ".lock"` dosyasının atomik olarak oluşturulmasıyla alınır; `stale` saniyeden eski
+    kilitler çökmüş bir süreçten kaldığı varsayılarak silinir.
+    """
+    lock_path = path + ".lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{lock_path} kilidi {timeout} saniye içinde alınamadı.")
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def atomic_write(path, writer):
+    """Dosyayı önce geçici bir ada yazar, ardından tek adımda yerine taşır."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _latest_snapshot(directory, suffix):
+    """Dizindeki en yeni anlık görüntüyü (yol, zaman damgası) olarak döndürür."""
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(suffix)]
+    except FileNotFoundError:
+        return None, None
+    snapshots = []
+    for name in names:
+        try:
+            snapshots.append((int(name[:-len(suffix)]), name))
+        except ValueError:
+            continue
+    if not snapshots:
+        return None, None
+    timestamp, name = max(snapshots)
+    return os.path.join(directory, name), timestamp / 1000
+
+
+def _touch(path):
+    """LRU tahliyesi için dosyanın erişim zamanını günceller."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _write_snapshot(directory, suffix, writer, max_bytes, cache_dir):
+    """Yeni bir anlık görüntü yazar, aynı anahtarın eski görüntülerini siler ve önbelleği sınırlar."""
+    timestamp = int(time.time() * 1000)
+    path = os.path.join(directory, f"{timestamp}{suffix}")
+    with file_lock(directory):
+        atomic_write(path, writer)
+        delta = _file_size(path)
+        for name in os.listdir(directory):
+            if name.endswith(suffix) and name != os.path.basename(path):
+                old_path = os.path.join(directory, name)
+                size = _file_size(old_path)
+                try:
+                    os.remove(old_path)
+                    delta -= size
+                except OSError:
+                    pass
+    if max_bytes is not None:
+        _account_write(delta, max_bytes, cache_dir)
+    return path
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _account_write(delta, max_bytes, cache_dir):
+    """Süreç içi önbellek boyutu tahminini bir yazma kadar günceller.
+
+    Tam tarama ve tahliye yalnızca tahmin `max_bytes` değerini aştığında, tahmin henüz yokken veya her
+    `RESCAN_WRITES` yazmada bir yapılır.
+    """
+    key = os.path.abspath(cache_dir)
+    with _size_lock:
+        estimate = _size_estimates.get(key)
+        if estimate is not None and estimate["writes"] < RESCAN_WRITES:
+            estimate["bytes"] += delta
+            estimate["writes"] += 1
+            if estimate["bytes"] <= max_bytes:
+                return
+    evict_cache(max_bytes, cache_dir)
+
+
+def read_chain_snapshot(ticker, expiration, ttl=CHAIN_TTL, cache_dir=CACHE_DIR):
+    """Önbellekteki taze bir vade zincirini döndürür; yoksa veya süresi geçmişse None döndürür."""
+    path, timestamp = _latest_snapshot(_chain_dir(ticker, expiration, cache_dir), ".parquet")
+    if path is None or time.time() - timestamp > ttl:
+        return None
+    try:
+        data = pd.read_parquet(path)
+    except (OSError, ValueError):
+        return None
+    _touch(path)
+    return data
+
+
+def write_chain_snapshot(ticker, expiration, data, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Bir vade zincirini Parquet olarak önbelleğe yazar."""
+    return _write_snapshot(_chain_dir(ticker, expiration, cache_dir), ".parquet",
+                           lambda tmp_path: data.to_parquet(tmp_path), max_bytes, cache_dir)
+
+
+def read_meta_snapshot(ticker, ttl=CHAIN_TTL, cache_dir=CACHE_DIR):
+    """Önbellekteki vade listesini ve son fiyatı döndürür; yoksa (None, None) döndürür."""
+    path, timestamp = _latest_snapshot(_meta_dir(ticker, cache_dir), ".json")
+    if path is None or time.time() - timestamp > ttl:
+        return None, None
+    try:
+        with open(path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    _touch(path)
+    return tuple(meta["options"]), meta["recent_price"]
+
+
+def write_meta_snapshot(ticker, exp_dates, recent_price, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Bir sembolün vade listesini ve son fiyatını önbelleğe yazar."""
+    def writer(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"options": list(exp_dates), "recent_price": float(recent_price)}, f)
+
+    return _write_snapshot(_meta_dir(ticker, cache_dir), ".json", writer, max_bytes, cache_dir)
+
+
+def _history_path(ticker, cache_dir):
+    return os.path.join(cache_dir, "history", f"{safe_name(ticker)}.arrow")
+
+
+def read_history(ticker, cache_dir=CACHE_DIR):
+    """Bir sembolün kayıtlı günlük fiyat geçmişini bellek eşlemeli Arrow dosyasından okur.
+
+    Returns:
+        tuple: (history, fetched_at, covered_start) - Kayıtlı veri, son indirme zamanı ve indirilmiş en
+        erken başlangıç tarihi; kayıt yoksa (None, None, None).
+    """
+    path = _history_path(ticker, cache_dir)
+    try:
+        table = feather.read_table(path, memory_map=True)
+    except (OSError, pa.ArrowInvalid):
+        return None, None, None
+    metadata = table.schema.metadata or {}
+    fetched_at = float(metadata.get(b"fetched_at", 0))
+    covered_start = pd.Timestamp(metadata[b"covered_start"].decode()) if b"covered_start" in metadata else None
+    return table.to_pandas(), fetched_at, covered_start
+
+
+def write_history(ticker, history, covered_start=None, cache_dir=CACHE_DIR):
+    """Bir sembolün günlük fiyat geçmişini sıkıştırılmamış Arrow (Feather) dosyası olarak kaydeder.
+
+    `covered_start`, verinin ilk satırından önce de indirme yapılmış olsa bile kaydın kapsadığı en erken
+    tarihi saklar; böylece işlem görmediği bir dönem her seferinde yeniden istenmez.
+    """
+    path = _history_path(ticker, cache_dir)
+    table = pa.Table.from_pandas(history)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"fetched_at"] = str(time.time()).encode()
+    if covered_start is not None:
+        metadata[b"covered_start"] = pd.Timestamp(covered_start).isoformat().encode()
+    table = table.replace_schema_metadata(metadata)
+    with file_lock(path):
+        atomic_write(path, lambda tmp_path: feather.write_feather(table, tmp_path, compression="uncompressed"))
+    return path
+
+
+def evict_cache(max_bytes=MAX_CACHE_BYTES, cache_dir=CACHE_DIR):
+    """Önbellek boyutu `max_bytes` değerini aşarsa en uzun süredir kullanılmayan dosyaları siler.
+
+    Tüm önbellek dizinini tarar; taramadan sonraki boyut, yazmalarda kullanılan süreç içi tahminin
+    yeni başlangıç değeri olur.
+    """
+    entries = []
+    total = 0
+    for root, _, names in os.walk(os.path.join(cache_dir, "chains")):
+        for name in names:
+            if name.endswith((".lock", ".tmp")):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+    removed = 0
+    if total > max_bytes:
+        with file_lock(os.path.join(cache_dir, "evict")):
+            for _, size, path in sorted(entries):
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+    with _size_lock:
+        _size_estimates[os.path.abspath(cache_dir)] = {"bytes": total, "writes": 0}
+    return removed
+
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Opsiyon zinciri önbelleğini tamamen temizler."""
+    shutil.rmtree(os.path.join(cache_dir, "chains"), ignore_errors=True)
+    with _size_lock:
+        _size_estimates.pop(os.path.abspath(cache_dir), None)
@@ -0,0 +1,113 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+OPTION_TYPES = ("call", "put")
+
+
+class ChainContext:
+    """Bir opsiyon zinciri anlık görüntüsü için bir kez hesaplanıp tüm katmanlarca paylaşılan ön hesaplamalar.
+
+    Call/put satır indeksleri ve her tür için vadelere göre gruplanmış satır dilimleri (grup başlangıç
+    noktaları) kurulurken hesaplanır. Vadeye kalan süre, log-moneyness ve forward fiyat ise ilk
+    kullanıldıklarında hesaplanıp saklanır. Böylece analiz, grafik ve yorum fonksiyonları veriyi her vade
+    için yeniden taramak yerine hazır dilimleri kullanır.
+
+    Tüm indeksler `data` içindeki satır konumlarıdır; bağlam, aynı satır sırasını koruyan türetilmiş
+    tablolarla (ör. `assign` ile grek eklenmiş veri) da kullanılabilir.
+    """
+
+    def __init__(self, options_data, recent_price=None, risk_free_rate=0.01, now=None):
+        self.data = options_data
+        self.recent_price = recent_price
+        self.risk_free_rate = risk_free_rate
+        self.now = now or pd.Timestamp.now()
+
+        self.is_call = (options_data["type"] == "call").to_numpy()
+        self.call_idx = np.flatnonzero(self.is_call)
+        self.put_idx = np.flatnonzero(~self.is_call)
+
+        # Vadeler, eski `unique()` döngüleriyle aynı olacak şekilde ilk görülme sırasında tutulur
+        codes, uniques = pd.factorize(options_data["expiration"].astype(str), sort=False)
+        self.expirations = np.asarray(uniques)
+        self.expiration_codes = codes
+
+        self._order = {}
+        self._offsets = {}
+        for option_type, idx in zip(OPTION_TYPES, (self.call_idx, self.put_idx)):
+            order = idx[np.argsort(codes[idx], kind="stable")]
+            self._order[option_type] = order
+            self._offsets[option_type] = np.searchsorted(codes[order], np.arange(len(self.expirations) + 1))
+        self._sorted_columns = {}
+
+    @classmethod
+    def ensure(cls, options_data, context=None, **kwargs):
+        """Verilen bağlamı döndürür; yoksa `options_data` için yenisini kurar."""
+        return context if context is not None else cls(options_data, **kwargs)
+
+    @cached_property
+    def time_to_expiry(self):
+        """Her satır için vadeye kalan süre (tam gün / 365.25)."""
+        if "expiry" in self.data:
+            expiry = self.data["expiry"]
+        else:
+            expiry = pd.to_datetime(self.data["expiration"].astype(str))
+        return ((expiry - self.now).dt.days / 365.25).to_numpy()
+
+    @cached_property
+    def forward(self):
+        """Her satırın vadesi için forward fiyat."""
+        return self.recent_price * np.exp(self.risk_free_rate * self.time_to_expiry)
+
+    @cached_property
+    def log_moneyness(self):
+        """Her satır için forward'a göre log-moneyness: log(K / F)."""
+        return np.log(self.data["strike"].to_numpy(dtype=np.float64) / self.forward)
+
+    @cached_property
+    def calls(self):
+        return self.data.iloc[self.call_idx]
+
+    @cached_property
+    def puts(self):
+        return self.data.iloc[self.put_idx]
+
+    def frame(self, option_type):
+        """Belirtilen türün satırlarını DataFrame olarak döndürür."""
+        return self.calls if option_type == "call" else self.puts
+
+    def rows(self, option_type, expiration_position):
+        """Bir türün, `expirations` içinde verilen konumdaki vadesine ait satır konumları."""
+        offsets = self._offsets[option_type]
+        return self._order[option_type][offsets[expiration_position]:offsets[expiration_position + 1]]
+
+    def values(self, column, option_type, expiration_position=None):
+        """Bir sütunun tür (ve istenirse vade) dilimini kopyalamadan NumPy dizisi olarak döndürür."""
+        key = (column, option_type)
+        if key not in self._sorted_columns:
+            self._sorted_columns[key] = self.data[column].to_numpy()[self._order[option_type]]
+        values = self._sorted_columns[key]
+        if expiration_position is None:
+            return values
+        offsets = self._offsets[option_type]
+        return values[offsets[expiration_position]:offsets[expiration_position + 1]]
+
+    def expiration_groups(self, option_type):
+        """Bir tür için (vade, satır konumları) çiftlerini vade sırasıyla üretir; boş vadeler de dahildir."""
+        for position, expiration in enumerate(self.expirations):
+            yield expiration, self.rows(option_type, position)
+
+    def group_mean(self, column, option_type):
+        """Bir sütunun tür içindeki vade bazında ortalamaları (vade sırasıyla, boş vadeler hariç)."""
+        idx = self.call_idx if option_type == "call" else self.put_idx
+        codes = self.expiration_codes[idx]
+        values = self.data[column].to_numpy(dtype=np.float64)[idx]
+        valid = ~np.isnan(values)
+        n = len(self.expirations)
+        sums = np.bincount(codes[valid], weights=values[valid], minlength=n)
+        counts = np.bincount(codes[valid], minlength=n)
+        present = np.bincount(codes, minlength=n) > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        return pd.Series(means[present], index=self.expirations[present])
@@ -1,44 +1,480 @@
-import yfinance as yf
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+
 import pandas as pd
 
-def get_options_data(ticker):
-    """Belirtilen sembol için opsiyon verilerini getirir."""
-    asset = yf.Ticker(ticker)
-    exp_dates = asset.options
+import cache
+from providers import get_default_provider
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+DEFAULT_RATE_LIMIT = 5.0
+DEFAULT_MONEYNESS = (0.9, 1.1)
+
+# Analizde kullanılmayan, satır başına tekrarlanan ham yfinance sütunları
+DROPPED_COLUMNS = ["contractSymbol", "lastTradeDate", "currency", "contractSize"]
+FLOAT32_COLUMNS = ["strike", "lastPrice", "bid", "ask", "change", "percentChange",
+                   "volume", "openInterest", "impliedVolatility"]
+
+
+class TokenBucket:
+    """İş parçacıkları arasında paylaşılan basit token bucket hız sınırlayıcı.
+
+    Saniyede `rate` token eklenir, en fazla `capacity` token biriktirilir.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bir token alınana kadar bekler."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _CountingLimiter:
+    """Ortak bir sınırlayıcıdan alınan token sayısını sayar.
+
+    Kaynağa yapılan her çağrıdan (tekrar denemeler dahil) önce bir token alındığından sayaç, önbellekten
+    karşılananlar hariç gerçek kaynak çağrılarının sayısıdır.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        self.limiter.acquire()
+        with self._lock:
+            self.count += 1
+
+
+class SingleFlight:
+    """Aynı anahtar için eşzamanlı çağrıları tek bir çalıştırmada birleştirir (single-flight).
+
+    Bir anahtar için çalışan bir çağrı varken gelen diğer çağrılar yeni bir istek başlatmaz, ilk
+    çağrının sonucunu (veya hatasını) bekleyip paylaşır. `stats` toplam, çalıştırılan ve birleştirilen
+    çağrı sayılarını tutar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key, func, *args):
+        """`func(*args)` sonucunu döndürür; aynı `key` zaten çalışıyorsa onun sonucunu bekler."""
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats["executed"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+
+_in_flight = SingleFlight()
+
+
+def get_coalescing_stats():
+    """Birleştirilen (tek uçuşta paylaşılan) veri isteklerinin sayaçlarını döndürür."""
+    with _in_flight._lock:
+        return dict(_in_flight.stats)
+
+
+def select_expirations(exp_dates, max_days_to_expiry=None, max_expirations=None, today=None):
+    """Vade tarihlerini yakından uzağa sıralar ve vade ufku dışında kalanları eler."""
+    today = (today or pd.Timestamp.now()).normalize()
+    selected = sorted(exp_dates, key=pd.Timestamp)
+    if max_days_to_expiry is not None:
+        selected = [d for d in selected if (pd.Timestamp(d) - today).days <= max_days_to_expiry]
+    if max_expirations is not None:
+        selected = selected[:max_expirations]
+    return selected
+
+
+def _strike_bounds(recent_price, moneyness):
+    if moneyness is None:
+        return None
+    return recent_price * moneyness[0], recent_price * moneyness[1]
+
+
+def _filter_strikes(data, strike_bounds):
+    if strike_bounds is None:
+        return data
+    return data[data["strike"].between(*strike_bounds)]
+
+
+def _compact_chunk(data, expirations):
+    """Bir vade parçasını kompakt şemaya çevirir.
+
+    Kullanılmayan sütunlar atılır, sayısal sütunlar float32'ye indirilir, `type` ve `expiration`
+    kategorik yapılır (tüm parçalarda aynı kategoriler, böylece birleştirme kategorik kalır) ve
+    `expiry` sütununa gerçek bir tarih eklenir.
+    """
+    data = data.drop(columns=[c for c in DROPPED_COLUMNS if c in data.columns])
+    for column in FLOAT32_COLUMNS:
+        if column in data.columns:
+            data[column] = data[column].astype("float32")
+    data["type"] = pd.Categorical(data["type"], categories=["call", "put"])
+    data["expiration"] = pd.Categorical(data["expiration"], categories=list(expirations))
+    data["expiry"] = pd.to_datetime(data["expiration"].astype(str))
+    return data
+
+
+def _fetch_option_chain(provider, ticker, date, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, limiter=None,
+                        use_cache=True, force_refresh=False, cache_ttl=cache.CHAIN_TTL, strike_bounds=None):
+    """Tek bir vade için opsiyon zincirini bir kez indirir, hata olursa üstel beklemeyle tekrar dener.
+
+    `use_cache` açıksa ve `force_refresh` kapalıysa önce disk önbelleğindeki taze kopya kullanılır.
+    `strike_bounds` verilirse yalnızca bu aralıktaki kullanım fiyatları döndürülür; böylece bellekte
+    hiçbir zaman tüm vadelerin filtrelenmemiş zinciri birlikte tutulmaz.
+    """
+    if use_cache and not force_refresh:
+        cached = cache.read_chain_snapshot(ticker, date, ttl=cache_ttl)
+        if cached is not None:
+            return _filter_strikes(cached, strike_bounds)
+
+    # Aynı vade için eşzamanlı istekler (ör. aynı sembolü açan farklı oturumlar) tek indirmeyi paylaşır
+    data = _in_flight.do((id(provider), "chain", ticker, date), _download_option_chain,
+                         provider, ticker, date, retries, backoff, limiter, use_cache)
+    return _filter_strikes(data, strike_bounds)
+
+
+def _download_option_chain(provider, ticker, date, retries, backoff, limiter, use_cache):
+    """Vade zincirini kaynaktan indirir ve (isteğe bağlı olarak) önbelleğe yazar."""
+    for attempt in range(retries + 1):
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            calls, puts = provider.get_option_chain(ticker, date)
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+    calls = calls.copy()
+    puts = puts.copy()
+    calls["expiration"] = date
+    puts["expiration"] = date
+    calls["type"] = "call"
+    puts["type"] = "put"
+    data = pd.concat([calls, puts])
+
+    if use_cache:
+        try:
+            cache.write_chain_snapshot(ticker, date, data)
+        except (OSError, TimeoutError) as e:
+            print(f"{ticker} {date} vadesi önbelleğe yazılamadı: {e}")
+    return data
+
+
+def _fetch_ticker_meta(provider, ticker, limiter=None, use_cache=True, force_refresh=False, cache_ttl=cache.CHAIN_TTL):
+    """Bir sembolün vade tarihlerini ve son kapanış fiyatını getirir."""
+    if use_cache and not force_refresh:
+        exp_dates, recent_price = cache.read_meta_snapshot(ticker, ttl=cache_ttl)
+        if exp_dates:
+            return exp_dates, recent_price
+
+    return _in_flight.do((id(provider), "meta", ticker), _download_ticker_meta, provider, ticker, limiter, use_cache)
+
+
+def _download_ticker_meta(provider, ticker, limiter, use_cache):
+    """Vade tarihlerini ve son fiyatı kaynaktan indirir ve (isteğe bağlı olarak) önbelleğe yazar."""
+    if limiter is not None:
+        limiter.acquire()
+    exp_dates = provider.get_expirations(ticker)
+    if not exp_dates:
+        return (), None
+    if limiter is not None:
+        limiter.acquire()
+    recent_price = provider.get_recent_price(ticker)
+
+    if use_cache:
+        try:
+            cache.write_meta_snapshot(ticker, exp_dates, recent_price)
+        except (OSError, TimeoutError) as e:
+            print(f"{ticker} vade listesi önbelleğe yazılamadı: {e}")
+    return exp_dates, recent_price
+
+
+def _prepare_chunk(chunk, expirations, compact=True):
+    """Bir vade parçasını (isteğe bağlı olarak) kompakt şemaya çevirir ve IV'yi yüzdeye çevirir."""
+    if compact:
+        chunk = _compact_chunk(chunk, expirations)
+    else:
+        chunk = chunk.copy()
+    chunk["implied_volatility"] = chunk["impliedVolatility"] * 100
+    return chunk
+
+
+def iter_options_data(ticker, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT,
+                      retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                      use_cache=True, force_refresh=False, cache_ttl=cache.CHAIN_TTL, provider=None,
+                      moneyness=DEFAULT_MONEYNESS, max_days_to_expiry=None, max_expirations=None, compact=True):
+    """Opsiyon verilerini vade vade, en yakın vadeden başlayarak üretir.
+
+    Tüm vadeler arka planda paralel indirilirken her vade hazır olduğu anda (vade sırasıyla)
+    `(expiration, chunk, recent_price)` olarak döndürülür; böylece ilk grafik tüm zincir inmeden
+    çizilebilir. Parametreler `get_options_data` ile aynıdır. Üretici erken kapatılırsa bekleyen
+    istekler iptal edilir.
+    """
+    provider = provider or get_default_provider()
+    use_cache = use_cache and provider.cacheable
+    exp_dates, recent_price = _fetch_ticker_meta(provider, ticker, None, use_cache, force_refresh, cache_ttl)
+    exp_dates = select_expirations(exp_dates, max_days_to_expiry, max_expirations)
 
     if not exp_dates:
         print(f"{ticker} sembolü için opsiyon verisi bulunamadı.")
-        return None, None
+        return
+
+    strike_bounds = _strike_bounds(recent_price, moneyness)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(exp_dates))))
+    try:
+        futures = [
+            executor.submit(_fetch_option_chain, provider, ticker, date, retries, backoff, None,
+                            use_cache, force_refresh, cache_ttl, strike_bounds)
+            for date in exp_dates
+        ]
+        # Tüm vadeler aynı anda gönderildiğinden süre sınırı her vade için gönderim anından ölçülür;
+        # sırayla beklerken kalan süre kullanılır, böylece bekleme süreleri birikmez
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for date, future in zip(exp_dates, futures):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                chunk = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                print(f"{ticker} {date} vadesi {timeout} saniye içinde indirilemedi, atlanıyor.")
+                continue
+            except Exception as e:
+                print(f"{ticker} {date} vadesi indirilemedi: {e}")
+                continue
+            yield date, _prepare_chunk(chunk, exp_dates, compact), recent_price
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_options_data(ticker, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT,
+                     retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                     use_cache=True, force_refresh=False, cache_ttl=cache.CHAIN_TTL, provider=None,
+                     moneyness=DEFAULT_MONEYNESS, max_days_to_expiry=None, max_expirations=None, compact=True):
+    """Belirtilen sembol için opsiyon verilerini getirir.
+
+    Her vade tarihi sınırlı bir iş parçacığı havuzunda paralel olarak yalnızca bir kez indirilir.
+    İstekler gönderildikten sonra `timeout` saniye içinde gelmeyen (süre her vade için aynı andan
+    ölçülür, beklemeler birikmez) veya `retries` denemeden sonra hâlâ hata veren vadeler atlanır.
+    `cache_ttl` saniyeden yeni disk önbelleği kayıtları ağ yerine kullanılır; `force_refresh` bunu atlar.
+    `provider` verilmezse `providers.get_default_provider()` kullanılır.
 
-    recent_price = asset.history(period="1d")["Close"].iloc[-1]
+    Yalnızca son fiyatın `moneyness` katları arasındaki kullanım fiyatları tutulur (None ise hepsi) ve
+    bu filtre her vade geldiği anda uygulanır. `max_days_to_expiry` ve `max_expirations` vade ufkunu
+    sınırlar; ufuk dışındaki vadeler hiç indirilmez.
 
+    `compact` açıksa kullanılmayan ham sütunlar atılır, sayısal sütunlar float32, `type` ve `expiration`
+    kategorik olur ve `expiry` tarih sütunu eklenir; kapalıysa yfinance şeması olduğu gibi korunur.
+    """
     options_data = []
-    for date in exp_dates:
-        calls = asset.option_chain(date).calls
-        puts = asset.option_chain(date).puts
-        calls["expiration"] = date
-        puts["expiration"] = date
-        calls["type"] = "call"
-        puts["type"] = "put"
-        data = pd.concat([calls, puts])
-        options_data.append(data)
+    recent_price = None
+    for _, chunk, recent_price in iter_options_data(
+            ticker, max_workers, timeout, retries, backoff, use_cache, force_refresh, cache_ttl, provider,
+            moneyness, max_days_to_expiry, max_expirations, compact):
+        options_data.append(chunk)
 
     if not options_data:
         print(f"{ticker} sembolü için geçerli opsiyon verisi bulunamadı.")
         return None, None
 
-    options_data = pd.concat(options_data)
-    options_data = options_data[options_data["strike"].between(recent_price * 0.9, recent_price * 1.1)]
-    options_data["implied_volatility"] = options_data["impliedVolatility"] * 100
+    return pd.concat(options_data), recent_price
 
-    return options_data, recent_price
 
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def get_options_data_batch(tickers, max_workers=DEFAULT_MAX_WORKERS, rate_limit=DEFAULT_RATE_LIMIT, burst=None,
+                           retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, progress_callback=None, as_frame=True,
+                           use_cache=True, force_refresh=False, cache_ttl=cache.CHAIN_TTL, provider=None,
+                           moneyness=DEFAULT_MONEYNESS, max_days_to_expiry=None, max_expirations=None,
+                           compact=True):
+    """Birden fazla sembol için opsiyon verilerini tek bir ortak havuz üzerinden getirir.
+
+    Tüm sembol × vade istekleri aynı iş parçacığı havuzundan geçer ve saniyede en fazla `rate_limit`
+    isteğe izin veren ortak bir token bucket ile sınırlandırılır. Bir sembolde oluşan hata yalnızca
+    o sembolü etkiler. `progress_callback(done, total, ticker)` her tamamlanan istekten sonra çağrılır.
+    Kullanım fiyatı, vade ufku filtreleri ve kompakt şema `get_options_data` ile aynıdır.
+
+    Returns:
+        tuple: (options_data, recent_prices, timings) - `as_frame` True ise `ticker` sütunlu tek bir
+        DataFrame, aksi halde sembol -> DataFrame sözlüğü; sembol -> son fiyat sözlüğü ve sembol başına
+        kaynak çağrısı sayısı (önbellekten karşılananlar hariç, tekrar denemeler dahil), toplam istek
+        süresi, duvar saati süresi ve hata bilgisini içeren DataFrame.
+    """
+    provider = provider or get_default_provider()
+    use_cache = use_cache and provider.cacheable
+    tickers = list(dict.fromkeys(tickers))
+    limiter = TokenBucket(rate_limit, burst)
+    # Sembol başına kaynak çağrıları, ortak sınırlayıcıdan alınan tokenlar sayılarak izlenir
+    limiters = {t: _CountingLimiter(limiter) for t in tickers}
+    started = time.perf_counter()
+    stats = {t: {"requests": 0, "request_seconds": 0.0, "wall_seconds": 0.0, "error": None} for t in tickers}
+    chunks = {t: [] for t in tickers}
+    exp_dates, recent_prices = {}, {}
+    done = 0
+    total = len(tickers)
+
+    def report(ticker):
+        nonlocal done
+        done += 1
+        stats[ticker]["wall_seconds"] = time.perf_counter() - started
+        if progress_callback is not None:
+            progress_callback(done, total, ticker)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(_timed, _fetch_ticker_meta, provider, t, limiters[t], use_cache, force_refresh, cache_ttl): t
+            for t in tickers
+        }
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                (dates, price), elapsed = future.result()
+                stats[ticker]["request_seconds"] += elapsed
+                if not dates:
+                    stats[ticker]["error"] = "opsiyon verisi bulunamadı"
+                else:
+                    exp_dates[ticker] = select_expirations(dates, max_days_to_expiry, max_expirations)
+                    recent_prices[ticker] = price
+            except Exception as e:
+                stats[ticker]["error"] = str(e)
+            report(ticker)
+
+        total += sum(len(dates) for dates in exp_dates.values())
+        strike_bounds = {t: _strike_bounds(recent_prices[t], moneyness) for t in exp_dates}
+        futures = {
+            executor.submit(_timed, _fetch_option_chain, provider, t, date, retries, backoff, limiters[t],
+                            use_cache, force_refresh, cache_ttl, strike_bounds[t]): (t, date)
+            for t, dates in exp_dates.items() for date in dates
+        }
+        for future in as_completed(futures):
+            ticker, date = futures[future]
+            try:
+                chunk, elapsed = future.result()
+                stats[ticker]["request_seconds"] += elapsed
+                chunk = _prepare_chunk(chunk, exp_dates[ticker], compact)
+                chunks[ticker].append((exp_dates[ticker].index(date), chunk))
+            except Exception as e:
+                if stats[ticker]["error"] is None:
+                    stats[ticker]["error"] = f"{date}: {e}"
+            report(ticker)
+
+    results = {}
+    for ticker in tickers:
+        stats[ticker]["requests"] = limiters[ticker].count
+        if not chunks[ticker]:
+            if stats[ticker]["error"] is None:
+                stats[ticker]["error"] = "geçerli opsiyon verisi bulunamadı"
+            print(f"{ticker} sembolü için opsiyon verisi alınamadı: {stats[ticker]['error']}")
+            continue
+        ordered = [chunk for _, chunk in sorted(chunks[ticker], key=lambda item: item[0])]
+        results[ticker] = pd.concat(ordered)
+
+    timings = pd.DataFrame.from_dict(stats, orient="index")
+    timings["rows"] = [len(results[t]) if t in results else 0 for t in timings.index]
+    timings = timings.sort_values("request_seconds", ascending=False)
+
+    if as_frame:
+        results = pd.concat(results, names=["ticker"]).reset_index(level=0) if results else None
+        if results is not None and compact:
+            # Sembollerin vade kategorileri farklı olduğundan birleştirme sonrası yeniden kategorik yapılır
+            results["ticker"] = results["ticker"].astype("category")
+            results["expiration"] = results["expiration"].astype("category")
+    return results, recent_prices, timings
+
+
+def get_historical_iv(ticker, start_date, end_date, use_cache=True, force_refresh=False,
+                      cache_ttl=cache.HISTORY_TTL, provider=None):
+    """Tarihsel hisse senedi verilerini indirir ve yaklaşık IV hesaplar.
+
+    `use_cache` açıksa fiyat geçmişi sembol başına yerel olarak saklanır ve yalnızca kayıtlı son
+    günden (veya istenen başlangıç tarihi kayıttan önceyse ilk günden) sonraki eksik aralık indirilir.
+    Son indirme `cache_ttl` saniyeden yeniyse ağa hiç gidilmez. Aynı sembol ve aralık için eşzamanlı
+    çağrılar tek bir yüklemeyi paylaşır; her çağıran kendi kopyasını alır.
+    """
+    provider = provider or get_default_provider()
+    use_cache = use_cache and provider.cacheable
+    key = (id(provider), "history", ticker, str(start_date), str(end_date), use_cache, force_refresh)
+    hist_data = _in_flight.do(key, _load_history, provider, ticker, start_date, end_date,
+                              use_cache, force_refresh, cache_ttl)
+    return hist_data.copy()
+
+
+def _load_history(provider, ticker, start_date, end_date, use_cache, force_refresh, cache_ttl):
+    """Fiyat geçmişini yerel depodan ve eksik aralıkları kaynaktan yükleyip IV'yi hesaplar."""
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    stored, fetched_at, covered_start = (None, None, None) if not use_cache or force_refresh \
+        else cache.read_history(ticker)
+
+    if stored is None or stored.empty:
+        hist_data = provider.get_history(ticker, start_date, end_date)
+        changed = not hist_data.empty
+        covered_start = start
+    else:
+        parts = [stored]
+        if covered_start is None or covered_start > stored.index[0]:
+            covered_start = stored.index[0]
+        if start < covered_start:
+            parts.insert(0, provider.get_history(ticker, start, stored.index[0]))
+            covered_start = start
+        if stored.index[-1] < end - pd.Timedelta(days=1) and time.time() - fetched_at > cache_ttl:
+            # Son kayıtlı gün de yeniden indirilir, gün içi eksik bir çubuk olabilir
+            parts.append(provider.get_history(ticker, stored.index[-1], end))
+        changed = len(parts) > 1
+        hist_data = pd.concat([part for part in parts if not part.empty])
+        hist_data = hist_data[~hist_data.index.duplicated(keep="last")].sort_index()
+
+    if use_cache and changed:
+        try:
+            cache.write_history(ticker, hist_data.drop(columns="IV", errors="ignore"), covered_start)
+        except (OSError, TimeoutError) as e:
+            print(f"{ticker} fiyat geçmişi önbelleğe yazılamadı: {e}")
+
+    hist_data = hist_data[(hist_data.index >= start) & (hist_data.index < end)].copy()
 
-def get_historical_iv(ticker, start_date, end_date):
-    """Tarihsel hisse senedi verilerini indirir ve yaklaşık IV hesaplar."""
-    hist_data = yf.download(ticker, start=start_date, end=end_date)
-    
     # Yüksek ve düşük fiyatlar arasındaki yüzde fark olarak tarihsel implied volatility hesapla
     hist_data['IV'] = (hist_data['High'] - hist_data['Low']) / hist_data['Low'] * 100
-    
-    return hist_data
\ No newline at end of file
+
+    return hist_data
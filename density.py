@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from surface import MAX_RMSE, MIN_VARIANCE, fit_svi_surface
+
+# Yoğunluk ızgarasının forward etrafında kaç ATM standart sapma (sqrt(w)) genişliğinde kurulacağı
+DEFAULT_WIDTH = 6.0
+DEFAULT_GRID_SIZE = 401
+# Kuyruk olasılıkları için güncel fiyata göre göreli hareketler
+DEFAULT_TAIL_MOVES = (0.05, 0.10)
+
+
+@dataclass(frozen=True)
+class RiskNeutralDensity:
+    """Vade başına risk-nötr yoğunluklar ve özetleri.
+
+    `strikes` ve `density` (vade, ızgara) boyutundadır; her satır bir vadenin eşit aralıklı kullanım
+    fiyatı ızgarası ve o ızgaradaki olasılık yoğunluğudur. `summary` vade indeksli özet tablodur.
+    `dropped`, kalibrasyonu güvenilmez olduğu için çıkarılan vadeleri {vade: RMSE} olarak tutar.
+    """
+
+    expirations: list
+    T: np.ndarray
+    strikes: np.ndarray
+    density: np.ndarray
+    summary: pd.DataFrame
+    dropped: dict = field(default_factory=dict)
+
+
+def _call_prices(surface, strikes, T, forward):
+    """SVI yüzeyindeki toplam varyansla, her satırı bir vade olan ızgarada Black-76 call fiyatları."""
+    w = np.maximum(surface.total_variance(strikes, T[:, None]), MIN_VARIANCE)
+    sqrt_w = np.sqrt(w)
+    d1 = (np.log(forward[:, None] / strikes) + 0.5 * w) / sqrt_w
+    discount = np.exp(-surface.risk_free_rate * T)[:, None]
+    return discount * (forward[:, None] * ndtr(d1) - strikes * ndtr(d1 - sqrt_w))
+
+
+def risk_neutral_density(options_data, recent_price, ticker=None, risk_free_rate=0.01, surface=None, context=None,
+                         n_grid=DEFAULT_GRID_SIZE, width=DEFAULT_WIDTH, tail_moves=DEFAULT_TAIL_MOVES,
+                         max_rmse=MAX_RMSE):
+    """Breeden-Litzenberger yöntemiyle her vade için risk-nötr fiyat yoğunluğunu çıkarır.
+
+    Call fiyatları, kalibre edilmiş SVI yüzeyinden (verilmezse `fit_svi_surface` ile kurulur) her vade için
+    forward etrafında eşit aralıklı yoğun bir kullanım fiyatı ızgarasında hesaplanır ve yoğunluk
+    q(K) = e^(rT) * d²C/dK² ikinci farklarla bulunur. Tüm vadeler tek bir (vade, ızgara) dizisinde
+    işlenir. Arbitraj kaynaklı negatif yoğunluklar sıfırlanır; momentler toplam kütleye bölünerek
+    hesaplanır. Kalibrasyon RMSE'si `max_rmse` üzerindeki veya ATM varyansı sıfıra inmiş dilimler
+    hesaba katılmaz ve `dropped` içinde listelenir.
+
+    Returns:
+        RiskNeutralDensity: Yoğunluklar ve vade başına beklenen hareket (E|S_T - S|), log-getiri
+        çarpıklığı, kütle ve kuyruk olasılıkları; yeterli veri veya güvenilir dilim yoksa None.
+    """
+    if surface is None:
+        surface = fit_svi_surface(options_data, recent_price, ticker, risk_free_rate=risk_free_rate,
+                                  context=context)
+    if surface is not None:
+        surface = surface.reliable(max_rmse)
+    if surface is None:
+        return None
+
+    T = np.asarray(surface.T, dtype=np.float64)
+    forward = recent_price * np.exp(surface.risk_free_rate * T)
+    atm_variance = surface.total_variance(forward, T)
+    # ATM varyansı sıfıra inmiş dilimler için yoğunluk tanımsızdır; bu dilimler sonda çıkarılır
+    usable = atm_variance > MIN_VARIANCE
+    atm_sd = np.sqrt(np.where(usable, atm_variance, 1.0))
+    lower = forward * np.exp(-width * atm_sd)
+    upper = forward * np.exp(width * atm_sd)
+    steps = np.linspace(0.0, 1.0, n_grid)
+    grid = lower[:, None] + (upper - lower)[:, None] * steps
+    dK = (upper - lower) / (n_grid - 1)
+
+    calls = _call_prices(surface, grid, T, forward)
+    growth = np.exp(surface.risk_free_rate * T)[:, None]
+    strikes = grid[:, 1:-1]
+    density = np.maximum(growth * (calls[:, 2:] - 2 * calls[:, 1:-1] + calls[:, :-2]) / dK[:, None] ** 2, 0)
+
+    weights = density * dK[:, None]
+    mass = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        probability = weights / mass[:, None]
+        mean = (probability * strikes).sum(axis=1)
+        std = np.sqrt((probability * (strikes - mean[:, None]) ** 2).sum(axis=1))
+        log_return = np.log(strikes / forward[:, None])
+        log_mean = (probability * log_return).sum(axis=1)
+        log_std = np.sqrt((probability * (log_return - log_mean[:, None]) ** 2).sum(axis=1))
+        skewness = (probability * (log_return - log_mean[:, None]) ** 3).sum(axis=1) / log_std ** 3
+        expected_move = (probability * np.abs(strikes - recent_price)).sum(axis=1)
+
+    summary = pd.DataFrame({
+        "days_to_expiry": np.round(T * 365.25),
+        "forward": forward,
+        "mass": mass,
+        "mean": mean,
+        "std": std,
+        "expected_move": expected_move,
+        "expected_move_pct": expected_move / recent_price * 100,
+        "skewness": skewness,
+    }, index=pd.Index(surface.expirations, name="expiration"))
+
+    # Dağılım fonksiyonu P(S_T < K) = 1 + e^(rT) * dC/dK; ızgara eşit aralıklı olduğundan eşikler doğrudan
+    # indeksle enterpole edilir
+    cdf = np.clip(1 + growth * (calls[:, 2:] - calls[:, :-2]) / (2 * dK[:, None]), 0, 1)
+    last = strikes.shape[1] - 1
+    for move in tail_moves:
+        level = int(round(move * 100))
+        for name, threshold in ((f"p_down_{level}", recent_price * (1 - move)),
+                                (f"p_up_{level}", recent_price * (1 + move))):
+            position = np.clip((threshold - strikes[:, 0]) / dK, 0, last)
+            left = np.minimum(np.floor(position).astype(int), last - 1)
+            fraction = position - left
+            below = (1 - fraction) * cdf[np.arange(len(T)), left] + fraction * cdf[np.arange(len(T)), left + 1]
+            summary[name] = below * 100 if name.startswith("p_down") else (1 - below) * 100
+
+    dropped = {**surface.dropped, **{expiration: float(rmse) for expiration, rmse, kept
+                                     in zip(surface.expirations, surface.rmse, usable) if not kept}}
+    return RiskNeutralDensity([expiration for expiration, kept in zip(surface.expirations, usable) if kept],
+                              T[usable], strikes[usable], density[usable], summary[usable], dropped)
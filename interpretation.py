@@ -1,6 +1,7 @@
-import pandas as pd
+from metrics import compute_chain_metrics
 
-def interpret_volatility_smile(ticker, overall_avg_iv_calls, overall_avg_iv_puts, avg_iv_by_strike_calls, avg_iv_by_strike_puts):
+def interpret_volatility_smile(ticker, overall_avg_iv_calls, overall_avg_iv_puts, avg_iv_by_strike_calls, avg_iv_by_strike_puts,
+                               skew=None):
     """Volatilite smile verilerini yorumlar."""
     if overall_avg_iv_calls is None or overall_avg_iv_puts is None:
         return None
@@ -28,10 +29,37 @@ def interpret_volatility_smile(ticker, overall_avg_iv_calls, overall_avg_iv_puts
     else:
         interpretation += "- Put opsiyonlarındaki daha yüksek implied volatilite, yatırımcıların aşağı yönlü fiyat hareketleri veya hisse senedi fiyatında daha yüksek belirsizlik beklediğini gösterir.\n"
 
+    if skew is not None:
+        interpretation += _interpret_skew(skew)
+
     return interpretation
 
 
-def interpret_open_interest(ticker, overall_avg_oi_calls, overall_avg_oi_puts, calls_data, puts_data):
+def _interpret_skew(skew):
+    """`compute_skew_metrics` tablosundan en yakın vadenin çarpıklığını ve ATM vade yapısını yorumlar."""
+    interpretation = ""
+    skewed = skew.dropna(subset=["atm_iv", "rr_25d", "bf_25d"])
+    if not skewed.empty:
+        front = skewed.iloc[0]
+        interpretation += (f"- En yakın vadede ({skewed.index[0]}) ATM IV %{front['atm_iv']:.2f}, 25 delta risk reversal "
+                           f"{front['rr_25d']:+.2f} puan ve 25 delta butterfly {front['bf_25d']:+.2f} puan.\n")
+        if front["rr_25d"] < 0:
+            interpretation += "- Negatif risk reversal, piyasanın aşağı yönlü korumaya (put) yukarı yönlü opsiyonlardan daha fazla prim ödediğini gösterir.\n"
+        else:
+            interpretation += "- Pozitif risk reversal, piyasanın yukarı yönlü opsiyonlara (call) daha fazla prim ödediğini gösterir.\n"
+
+    term = skew["atm_iv"].dropna()
+    if len(term) >= 2:
+        slope = term.iloc[-1] - term.iloc[0]
+        if slope > 0:
+            interpretation += f"- ATM vade yapısı yukarı eğimli (contango, {slope:+.2f} puan): kısa vadede piyasa görece sakin fiyatlanıyor.\n"
+        else:
+            interpretation += f"- ATM vade yapısı aşağı eğimli (backwardation, {slope:+.2f} puan): yakın vadede yüksek belirsizlik fiyatlanıyor.\n"
+    return interpretation
+
+
+def interpret_open_interest(ticker, overall_avg_oi_calls, overall_avg_oi_puts, calls_data, puts_data, metrics=None,
+                            max_pain=None):
     """Açık pozisyon verilerini yorumlar."""
     if overall_avg_oi_calls is None or overall_avg_oi_puts is None:
         return None
@@ -46,8 +74,11 @@ def interpret_open_interest(ticker, overall_avg_oi_calls, overall_avg_oi_puts, c
     else:
         interpretation += "- Put opsiyonlarında daha yüksek ortalama açık pozisyon var, bu da put'larda daha yüksek işlem aktivitesi ve ilgi olduğunu gösterir.\n"
 
-    highest_oi_call = calls_data.loc[calls_data['openInterest'].idxmax()]
-    highest_oi_put = puts_data.loc[puts_data['openInterest'].idxmax()]
+    if metrics is not None:
+        highest_oi_call, highest_oi_put = metrics.calls.max_open_interest_row, metrics.puts.max_open_interest_row
+    else:
+        highest_oi_call = calls_data.loc[calls_data['openInterest'].idxmax()]
+        highest_oi_put = puts_data.loc[puts_data['openInterest'].idxmax()]
 
     interpretation += f"- Call'lar için en yüksek açık pozisyona sahip kullanım fiyatı {highest_oi_call['strike']} ile {highest_oi_call['openInterest']} kontrat.\n"
     interpretation += f"- Put'lar için en yüksek açık pozisyona sahip kullanım fiyatı {highest_oi_put['strike']} ile {highest_oi_put['openInterest']} kontrat.\n"
@@ -57,10 +88,17 @@ def interpret_open_interest(ticker, overall_avg_oi_calls, overall_avg_oi_puts, c
     else:
         interpretation += "- Put opsiyonlarındaki daha yüksek açık pozisyon, yatırımcıların aşağı yönlü fiyat hareketleri beklediğini gösterebilir.\n"
 
+    if max_pain is not None and not max_pain.empty:
+        front = max_pain.iloc[0]
+        interpretation += f"- En yakın vade ({max_pain.index[0]}) için max pain seviyesi {front['max_pain']:.2f}"
+        if "distance_pct" in max_pain:
+            interpretation += f" (güncel fiyata göre %{front['distance_pct']:+.2f})"
+        interpretation += "; opsiyon sahiplerinin toplam kazancı vade sonunda bu fiyatta en düşük olur.\n"
+
     return interpretation
 
 
-def interpret_volume(ticker, overall_avg_vol_calls, overall_avg_vol_puts, calls_data, puts_data):
+def interpret_volume(ticker, overall_avg_vol_calls, overall_avg_vol_puts, calls_data, puts_data, metrics=None):
     """İşlem hacmi verilerini yorumlar."""
     if overall_avg_vol_calls is None or overall_avg_vol_puts is None:
         return None
@@ -75,8 +113,11 @@ def interpret_volume(ticker, overall_avg_vol_calls, overall_avg_vol_puts, calls_
     else:
         interpretation += "- Put opsiyonlarında daha yüksek ortalama işlem hacmi var, bu da put'larda daha yüksek işlem aktivitesi ve ilgi olduğunu gösterir.\n"
 
-    highest_vol_call = calls_data.loc[calls_data['volume'].idxmax()]
-    highest_vol_put = puts_data.loc[puts_data['volume'].idxmax()]
+    if metrics is not None:
+        highest_vol_call, highest_vol_put = metrics.calls.max_volume_row, metrics.puts.max_volume_row
+    else:
+        highest_vol_call = calls_data.loc[calls_data['volume'].idxmax()]
+        highest_vol_put = puts_data.loc[puts_data['volume'].idxmax()]
 
     interpretation += f"- Call'lar için en yüksek işlem hacmine sahip kullanım fiyatı {highest_vol_call['strike']} ile {highest_vol_call['volume']} kontrat.\n"
     interpretation += f"- Put'lar için en yüksek işlem hacmine sahip kullanım fiyatı {highest_vol_put['strike']} ile {highest_vol_put['volume']} kontrat.\n"
@@ -89,42 +130,36 @@ def interpret_volume(ticker, overall_avg_vol_calls, overall_avg_vol_puts, calls_
     return interpretation
 
 
-def interpret_3d_puts_implied_volatility(ticker, puts_data):
+def interpret_3d_puts_implied_volatility(ticker, puts_data, context=None, metrics=None):
     """3D put opsiyonları implied volatilite verilerini yorumlar."""
     if puts_data is None:
         return None
         
     interpretation = f"**{ticker} Put Opsiyonları İmplied Volatilite (3D Grafik) Yorumu:**\n"
 
-    overall_avg_iv_puts = puts_data["implied_volatility"].mean()
+    if metrics is None:
+        metrics = compute_chain_metrics(puts_data, context)
+    side = metrics.puts
+
+    overall_avg_iv_puts = side.mean_iv
     interpretation += f"- Put opsiyonları için ortalama implied volatilite %{overall_avg_iv_puts:.2f}.\n"
 
-    highest_iv_put_idx = puts_data['implied_volatility'].idxmax()
-    highest_iv_put = puts_data.loc[highest_iv_put_idx]
-    if isinstance(highest_iv_put, pd.Series):
-        strike_price = highest_iv_put['strike']
-        implied_volatility = highest_iv_put['implied_volatility']
-        expiration_date = highest_iv_put['expiration']
-    else:
-        strike_price = highest_iv_put.iloc[0]['strike']
-        implied_volatility = highest_iv_put.iloc[0]['implied_volatility']
-        expiration_date = highest_iv_put.iloc[0]['expiration']
+    highest_iv_put = side.max_iv_row
+    strike_price = highest_iv_put['strike']
+    implied_volatility = highest_iv_put['implied_volatility']
+    expiration_date = highest_iv_put['expiration']
 
     interpretation += f"- Put'lar için en yüksek implied volatiliteye sahip kullanım fiyatı {strike_price} ile %{implied_volatility:.2f} implied volatilite, vade tarihi {expiration_date}.\n"
 
     interpretation += "\n**Vade Tarihlerine Göre İmplied Volatilite:**\n"
-    for exp in puts_data['expiration'].unique():
-        exp_data = puts_data[puts_data['expiration'] == exp]
-        avg_iv_exp = exp_data['implied_volatility'].mean()
+    for exp, avg_iv_exp in side.iv_by_expiration.items():
         interpretation += f"- {exp} tarihinde sona eren put'lar için ortalama IV: %{avg_iv_exp:.2f}.\n"
 
     interpretation += "\n**Kullanım Fiyatlarına Göre İmplied Volatilite:**\n"
-    strike_price_bins = pd.cut(puts_data['strike'], bins=5)
-    grouped_strike_data = puts_data.groupby(strike_price_bins)['implied_volatility'].mean()
-    for interval, avg_iv_strike in grouped_strike_data.items():
+    for interval, avg_iv_strike in side.iv_by_strike_bin.items():
         interpretation += f"- {interval} aralığındaki kullanım fiyatlarına sahip put'lar için ortalama IV: %{avg_iv_strike:.2f}.\n"
 
-    iv_variability = puts_data['implied_volatility'].std()
+    iv_variability = side.std_iv
     if iv_variability > 10:
         interpretation += "\n**Genel Piyasa Yorumu:**\n"
         interpretation += f"- Farklı kullanım fiyatları ve vade tarihleri arasında implied volatilitede önemli bir değişkenlik var (standart sapma: %{iv_variability:.2f}).\n"
@@ -143,42 +178,36 @@ def interpret_3d_puts_implied_volatility(ticker, puts_data):
     return interpretation
 
 
-def interpret_3d_calls_implied_volatility(ticker, calls_data):
+def interpret_3d_calls_implied_volatility(ticker, calls_data, context=None, metrics=None):
     """3D call opsiyonları implied volatilite verilerini yorumlar."""
     if calls_data is None:
         return None
         
     interpretation = f"**{ticker} Call Opsiyonları İmplied Volatilite (3D Grafik) Yorumu:**\n"
 
-    overall_avg_iv_calls = calls_data["implied_volatility"].mean()
+    if metrics is None:
+        metrics = compute_chain_metrics(calls_data, context)
+    side = metrics.calls
+
+    overall_avg_iv_calls = side.mean_iv
     interpretation += f"- Call opsiyonları için ortalama implied volatilite %{overall_avg_iv_calls:.2f}.\n"
 
-    highest_iv_call_idx = calls_data['implied_volatility'].idxmax()
-    highest_iv_call = calls_data.loc[highest_iv_call_idx]
-    if isinstance(highest_iv_call, pd.Series):
-        strike_price = highest_iv_call['strike']
-        implied_volatility = highest_iv_call['implied_volatility']
-        expiration_date = highest_iv_call['expiration']
-    else:
-        strike_price = highest_iv_call.iloc[0]['strike']
-        implied_volatility = highest_iv_call.iloc[0]['implied_volatility']
-        expiration_date = highest_iv_call.iloc[0]['expiration']
+    highest_iv_call = side.max_iv_row
+    strike_price = highest_iv_call['strike']
+    implied_volatility = highest_iv_call['implied_volatility']
+    expiration_date = highest_iv_call['expiration']
 
     interpretation += f"- Call'lar için en yüksek implied volatiliteye sahip kullanım fiyatı {strike_price} ile %{implied_volatility:.2f} implied volatilite, vade tarihi {expiration_date}.\n"
 
     interpretation += "\n**Vade Tarihlerine Göre İmplied Volatilite:**\n"
-    for exp in calls_data['expiration'].unique():
-        exp_data = calls_data[calls_data['expiration'] == exp]
-        avg_iv_exp = exp_data['implied_volatility'].mean()
+    for exp, avg_iv_exp in side.iv_by_expiration.items():
         interpretation += f"- {exp} tarihinde sona eren call'lar için ortalama IV: %{avg_iv_exp:.2f}.\n"
 
     interpretation += "\n**Kullanım Fiyatlarına Göre İmplied Volatilite:**\n"
-    strike_price_bins = pd.cut(calls_data['strike'], bins=5)
-    grouped_strike_data = calls_data.groupby(strike_price_bins)['implied_volatility'].mean()
-    for interval, avg_iv_strike in grouped_strike_data.items():
+    for interval, avg_iv_strike in side.iv_by_strike_bin.items():
         interpretation += f"- {interval} aralığındaki kullanım fiyatlarına sahip call'lar için ortalama IV: %{avg_iv_strike:.2f}.\n"
 
-    iv_variability = calls_data['implied_volatility'].std()
+    iv_variability = side.std_iv
     if iv_variability > 10:
         interpretation += "\n**Genel Piyasa Yorumu:**\n"
         interpretation += f"- Farklı kullanım fiyatları ve vade tarihleri arasında implied volatilitede önemli bir değişkenlik var (standart sapma: %{iv_variability:.2f}).\n"
@@ -331,7 +360,8 @@ def interpret_sentiment_score(ticker, sentiment_score, sentiment_description, hi
     return interpretation
 
 
-def overall_interpretation(ticker, iv_data, vol_data, oi_data, hist_data, ratio_data, greeks_data, sentiment_data):
+def overall_interpretation(ticker, iv_data, vol_data, oi_data, hist_data, ratio_data, greeks_data, sentiment_data,
+                           metrics=None):
     """Tüm analiz sonuçlarının genel bir yorumunu oluşturur."""
     if None in [iv_data, vol_data, oi_data, hist_data, ratio_data, greeks_data, sentiment_data]:
         return "Eksik veriler nedeniyle genel yorum oluşturulamıyor."
@@ -358,8 +388,11 @@ def overall_interpretation(ticker, iv_data, vol_data, oi_data, hist_data, ratio_
     interpretation += f"- Call opsiyonları için ortalama işlem hacmi {overall_avg_vol_calls:.2f} kontrat.\n"
     interpretation += f"- Put opsiyonları için ortalama işlem hacmi {overall_avg_vol_puts:.2f} kontrat.\n"
     interpretation += f"- {'Call' if overall_avg_vol_calls > overall_avg_vol_puts else 'Put'} opsiyonlarında daha yüksek ortalama işlem hacmi var, bu da {'call' if overall_avg_vol_calls > overall_avg_vol_puts else 'put'}larda daha yüksek işlem aktivitesi ve ilgi olduğunu gösterir.\n"
-    highest_vol_call = calls_data.loc[calls_data['volume'].idxmax()]
-    highest_vol_put = puts_data.loc[puts_data['volume'].idxmax()]
+    if metrics is not None:
+        highest_vol_call, highest_vol_put = metrics.calls.max_volume_row, metrics.puts.max_volume_row
+    else:
+        highest_vol_call = calls_data.loc[calls_data['volume'].idxmax()]
+        highest_vol_put = puts_data.loc[puts_data['volume'].idxmax()]
     interpretation += f"- Call'lar için en yüksek işlem hacmine sahip kullanım fiyatı {highest_vol_call['strike']} ile {highest_vol_call['volume']} kontrat.\n"
     interpretation += f"- Put'lar için en yüksek işlem hacmine sahip kullanım fiyatı {highest_vol_put['strike']} ile {highest_vol_put['volume']} kontrat.\n\n"
 
@@ -475,6 +508,72 @@ def overall_interpretation(ticker, iv_data, vol_data, oi_data, hist_data, ratio_
     return interpretation
 
 
+def interpret_gamma_exposure(ticker, gex_by_strike, gex_profile, flip_level, recent_price):
+    """Gamma maruziyeti (GEX) profilini yorumlar."""
+    if gex_by_strike is None or gex_profile is None:
+        return None
+    if gex_by_strike.empty:
+        return f"{ticker} için gamma maruziyeti hesaplanabilecek geçerli opsiyon verisi bulunamadı."
+
+    interpretation = f"**{ticker} Gamma Maruziyeti Yorumu:**\n"
+
+    total_gex = gex_by_strike['net_gex'].sum()
+    interpretation += f"- Güncel fiyatta toplam net gamma maruziyeti, %1'lik fiyat hareketi başına ${total_gex:,.0f}.\n"
+
+    if total_gex > 0:
+        interpretation += "- Pozitif gamma, piyasa yapıcıların fiyat yükseldikçe satıp düştükçe alarak hareketleri sönümleme eğiliminde olduğunu gösterir; volatilitenin baskılanması beklenebilir.\n"
+    else:
+        interpretation += "- Negatif gamma, piyasa yapıcıların fiyat yönünde işlem yaparak hareketleri büyütme eğiliminde olduğunu gösterir; daha sert fiyat hareketleri görülebilir.\n"
+
+    top_call_strike = gex_by_strike['call_gex'].idxmax()
+    top_put_strike = gex_by_strike['put_gex'].idxmin()
+    interpretation += f"- En yüksek call gamma yoğunlaşması {top_call_strike} kullanım fiyatında; bu seviye bir direnç gibi davranabilir.\n"
+    interpretation += f"- En yüksek put gamma yoğunlaşması {top_put_strike} kullanım fiyatında; bu seviye bir destek gibi davranabilir.\n"
+
+    if flip_level is not None:
+        side = "üzerinde" if recent_price > flip_level else "altında"
+        interpretation += f"- Gamma dönüş (sıfır gamma) seviyesi yaklaşık {flip_level:.2f}. Güncel fiyat ({recent_price:.2f}) bu seviyenin {side}.\n"
+        interpretation += "- Fiyatın bu seviyeyi geçmesi, piyasa yapıcıların koruma davranışını değiştirerek volatilite rejiminde bir değişime işaret edebilir.\n"
+    else:
+        lower, upper = gex_profile.index.min(), gex_profile.index.max()
+        interpretation += f"- İncelenen {lower:.2f} - {upper:.2f} fiyat aralığında gamma işaret değiştirmiyor; belirgin bir dönüş seviyesi yok.\n"
+
+    return interpretation
+
+
+def interpret_risk_neutral_density(ticker, rnd):
+    """Risk-nötr yoğunluk özetini (beklenen hareket, çarpıklık, kuyruk olasılıkları) yorumlar."""
+    summary = rnd.summary.dropna(subset=["expected_move"]) if rnd is not None else None
+    if summary is None or summary.empty:
+        return None
+
+    interpretation = f"**{ticker} Risk-Nötr Dağılım Yorumu:**\n"
+    front = summary.iloc[0]
+    expiration = summary.index[0]
+    interpretation += (f"- En yakın vade ({expiration}, {front['days_to_expiry']:.0f} gün) için opsiyon fiyatlarının ima ettiği "
+                       f"beklenen hareket ±{front['expected_move']:.2f} (%{front['expected_move_pct']:.2f}).\n")
+
+    tails = [c[len("p_down_"):] for c in summary.columns if c.startswith("p_down_")]
+    for level in tails:
+        interpretation += (f"- Vade sonunda fiyatın %{level} veya daha fazla düşme olasılığı %{front[f'p_down_{level}']:.1f}, "
+                           f"%{level} veya daha fazla yükselme olasılığı %{front[f'p_up_{level}']:.1f}.\n")
+
+    if front["skewness"] < -0.1:
+        interpretation += "- Dağılım sola çarpık: piyasa sert düşüşlere, benzer büyüklükteki yükselişlerden daha yüksek olasılık veriyor.\n"
+    elif front["skewness"] > 0.1:
+        interpretation += "- Dağılım sağa çarpık: piyasa sert yükselişlere görece daha yüksek olasılık veriyor.\n"
+    else:
+        interpretation += "- Dağılım yaklaşık simetrik; yukarı ve aşağı yönlü sert hareketler benzer olasılıkla fiyatlanıyor.\n"
+
+    if abs(front["mass"] - 1) > 0.05:
+        interpretation += f"- Yoğunluğun toplam kütlesi {front['mass']:.2f}; bu, fiyatlarda arbitraj veya veri kalitesi sorunlarına işaret edebilir.\n"
+
+    if rnd.dropped:
+        interpretation += f"- Kalibrasyonu güvenilmez olan {len(rnd.dropped)} vade ({', '.join(rnd.dropped)}) yoruma katılmadı.\n"
+
+    return interpretation
+
+
 def interpret_future_iv_predictions(ticker, historical_iv, predictions_df):
     """Gelecekteki IV tahminlerini yorumlar."""
     if historical_iv is None or predictions_df is None or predictions_df.empty:
@@ -0,0 +1,263 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from chain_context import OPTION_TYPES, ChainContext
+
+SUMMARY_COLUMNS = ["implied_volatility", "volume", "openInterest"]
+SUMMARY_STATS = ["sum", "mean", "std", "min", "max"]
+# Risk reversal ve butterfly için izlenen delta seviyeleri
+SKEW_DELTAS = (0.25, 0.10)
+
+
+@dataclass(frozen=True)
+class SideMetrics:
+    """Tek bir opsiyon türü (call veya put) için özet istatistikler."""
+
+    count: int
+    # {sütun: {istatistik: değer}}; sütunlar SUMMARY_COLUMNS, istatistikler SUMMARY_STATS
+    stats: dict
+    max_iv_row: pd.Series
+    min_iv_row: pd.Series
+    max_volume_row: pd.Series
+    max_open_interest_row: pd.Series
+    iv_by_strike: pd.Series
+    iv_by_expiration: pd.Series
+    iv_by_strike_bin: pd.Series
+
+    @property
+    def mean_iv(self):
+        return self.stats["implied_volatility"]["mean"]
+
+    @property
+    def std_iv(self):
+        return self.stats["implied_volatility"]["std"]
+
+    @property
+    def max_iv(self):
+        return self.stats["implied_volatility"]["max"]
+
+    @property
+    def min_iv(self):
+        return self.stats["implied_volatility"]["min"]
+
+    @property
+    def total_volume(self):
+        return self.stats["volume"]["sum"]
+
+    @property
+    def mean_volume(self):
+        return self.stats["volume"]["mean"]
+
+    @property
+    def mean_open_interest(self):
+        return self.stats["openInterest"]["mean"]
+
+
+@dataclass(frozen=True)
+class ChainMetrics:
+    """Bir opsiyon zinciri için tüm sekmelerin kullandığı değişmez özet kaydı."""
+
+    calls: SideMetrics
+    puts: SideMetrics
+
+    @property
+    def total_calls(self):
+        return self.calls.total_volume
+
+    @property
+    def total_puts(self):
+        return self.puts.total_volume
+
+    @property
+    def put_call_ratio(self):
+        if self.total_calls == 0:
+            return float('inf')
+        return self.total_puts / self.total_calls
+
+    def side(self, option_type):
+        return self.calls if option_type == "call" else self.puts
+
+
+def _row_at(data, idx, values, func):
+    """`values` içindeki en büyük/küçük (NaN hariç) değerin satırını döndürür; ilk eşleşme seçilir."""
+    if not np.isfinite(values).any():
+        return None
+    return data.iloc[idx[func(values)]]
+
+
+def compute_chain_metrics(options_data, context=None, strike_bins=5):
+    """Opsiyon zinciri özetlerini (toplam, ortalama, std, min/maks ve satırları, vade ve kullanım fiyatı
+    grupları) tek bir gruplanmış geçişte hesaplar.
+
+    Put/call oranı, en yüksek/en düşük IV ve grafiklerin genel ortalamaları bu kayıttan okunur; böylece
+    sekmeler aynı veriyi tekrar tekrar taramaz.
+
+    Returns:
+        ChainMetrics: Call ve put özetlerini içeren değişmez kayıt; veri yoksa None.
+    """
+    if options_data is None:
+        return None
+
+    context = ChainContext.ensure(options_data, context)
+    data = context.data
+    option_type = data["type"].astype(str)
+
+    stats = data.groupby(option_type, sort=False)[SUMMARY_COLUMNS].agg(SUMMARY_STATS)
+    iv_by_strike = data.groupby([option_type, "strike"])["implied_volatility"].mean()
+
+    sides = {}
+    for side, idx in zip(OPTION_TYPES, (context.call_idx, context.put_idx)):
+        side_data = context.frame(side)
+        if side in stats.index:
+            side_stats = {column: {stat: stats.loc[side, (column, stat)] for stat in SUMMARY_STATS}
+                          for column in SUMMARY_COLUMNS}
+            by_strike = iv_by_strike.xs(side, level=0)
+        else:
+            side_stats = {column: {stat: 0 if stat == "sum" else np.nan for stat in SUMMARY_STATS}
+                          for column in SUMMARY_COLUMNS}
+            by_strike = pd.Series(dtype=float, name="implied_volatility")
+
+        iv = data["implied_volatility"].to_numpy(dtype=np.float64)[idx]
+        volume = data["volume"].to_numpy(dtype=np.float64)[idx]
+        open_interest = data["openInterest"].to_numpy(dtype=np.float64)[idx]
+        strike_bin_groups = pd.cut(side_data["strike"], bins=strike_bins) if len(side_data) else side_data["strike"]
+
+        sides[side] = SideMetrics(
+            count=len(idx),
+            stats=side_stats,
+            max_iv_row=_row_at(data, idx, iv, np.nanargmax),
+            min_iv_row=_row_at(data, idx, iv, np.nanargmin),
+            max_volume_row=_row_at(data, idx, volume, np.nanargmax),
+            max_open_interest_row=_row_at(data, idx, open_interest, np.nanargmax),
+            iv_by_strike=by_strike,
+            iv_by_expiration=context.group_mean("implied_volatility", side),
+            iv_by_strike_bin=side_data.groupby(strike_bin_groups, observed=False)["implied_volatility"].mean(),
+        )
+
+    return ChainMetrics(calls=sides["call"], puts=sides["put"])
+
+
+def _interpolate_groups(codes, x, y, targets):
+    """Her grup içinde y(x) doğrusal enterpolasyonunu tüm gruplar için tek seferde yapar.
+
+    Noktalar (grup, x) sırasına dizilir ve grup kodu x eksenine kaydırılarak tek bir sıralı anahtar
+    oluşturulur; böylece tüm gruplardaki hedefler tek bir `searchsorted` çağrısıyla bulunur. Bir grubun
+    x aralığı dışında kalan hedefler için (dışdeğerleme yapılmaz) NaN döner.
+
+    Args:
+        codes: Her noktanın grup kodu (0..n_groups-1)
+        x, y: Nokta koordinatları
+        targets: (n_groups, m) boyutunda, her grup için aranacak x değerleri
+
+    Returns:
+        np.ndarray: (n_groups, m) boyutunda enterpole edilmiş y değerleri
+    """
+    result = np.full(targets.shape, np.nan)
+    valid = np.isfinite(x) & np.isfinite(y)
+    codes, x, y = codes[valid], x[valid], y[valid]
+    if x.size == 0:
+        return result
+
+    order = np.lexsort((x, codes))
+    codes, x, y = codes[order], x[order], y[order]
+    low = min(x.min(), np.nanmin(targets))
+    span = max(x.max(), np.nanmax(targets)) - low + 1
+    keys = codes * span + (x - low)
+    group = np.broadcast_to(np.arange(len(targets))[:, None], targets.shape)
+    position = np.searchsorted(keys, group * span + (targets - low))
+
+    upper = np.minimum(position, x.size - 1)
+    lower = np.maximum(position - 1, 0)
+    has_upper = (position < x.size) & (codes[upper] == group)
+    has_lower = (position > 0) & (codes[lower] == group)
+    exact = has_upper & (x[upper] == targets)
+    between = has_lower & has_upper & ~exact
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = (targets - x[lower]) / (x[upper] - x[lower])
+        result[between] = (y[lower] + weight * (y[upper] - y[lower]))[between]
+    result[exact] = y[upper][exact]
+    return result
+
+
+def _skew_table(context, codes, index):
+    """Grup (vade) başına ATM IV, delta bazlı IV'ler, risk reversal ve butterfly tablosunu kurar."""
+    data = context.data
+    T = context.time_to_expiry
+    k = context.log_moneyness
+    iv = data["impliedVolatility"].to_numpy(dtype=np.float64)
+    is_call = context.is_call
+    valid = (T > 0) & (iv > 0) & np.isfinite(T + iv + k)
+    n_groups = len(index)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d1 = (-k + 0.5 * iv * iv * T) / (iv * np.sqrt(T))
+    delta = ndtr(d1) - ~is_call
+
+    # ATM IV, forward'a göre out-of-the-money opsiyonlar üzerinden log-moneyness = 0 noktasında bulunur
+    out_of_the_money = valid & np.where(is_call, k >= 0, k < 0)
+    atm_iv = _interpolate_groups(codes[out_of_the_money], k[out_of_the_money], iv[out_of_the_money],
+                                 np.zeros((n_groups, 1)))[:, 0]
+
+    deltas = np.array(SKEW_DELTAS)
+    calls, puts = valid & is_call, valid & ~is_call
+    call_iv = _interpolate_groups(codes[calls], delta[calls], iv[calls], np.tile(deltas, (n_groups, 1)))
+    put_iv = _interpolate_groups(codes[puts], delta[puts], iv[puts], np.tile(-deltas, (n_groups, 1)))
+
+    counts = np.bincount(codes, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        group_T = np.bincount(codes, weights=T, minlength=n_groups) / counts
+
+    columns = {"time_to_expiry": group_T, "days_to_expiry": np.round(group_T * 365.25), "atm_iv": atm_iv * 100}
+    for i, level in enumerate(np.rint(deltas * 100).astype(int)):
+        columns[f"call_{level}d_iv"] = call_iv[:, i] * 100
+        columns[f"put_{level}d_iv"] = put_iv[:, i] * 100
+        columns[f"rr_{level}d"] = (call_iv[:, i] - put_iv[:, i]) * 100
+        columns[f"bf_{level}d"] = ((call_iv[:, i] + put_iv[:, i]) / 2 - atm_iv) * 100
+    return pd.DataFrame(columns, index=index)
+
+
+def compute_skew_metrics(options_data, recent_price, risk_free_rate=0.01, context=None):
+    """Her vade için ATM IV, 25 ve 10 delta risk reversal/butterfly değerlerini hesaplar.
+
+    Deltalar her opsiyonun kendi IV'si ile Black-Scholes'tan bulunur; delta bazlı IV'ler ve ATM IV
+    (forward'a göre log-moneyness = 0) tüm vadeler için tek seferde, vade içinde doğrusal enterpolasyonla
+    hesaplanır. Risk reversal = call IV - put IV, butterfly = (call IV + put IV) / 2 - ATM IV. Tüm IV
+    değerleri yüzde cinsindendir; vade aralığı dışındaki deltalar için NaN döner.
+
+    Returns:
+        pd.DataFrame: Vadeye göre sıralı (ATM vade yapısı `atm_iv` sütunudur), vade indeksli tablo;
+        veri yoksa None.
+    """
+    if options_data is None:
+        return None
+
+    context = ChainContext.ensure(options_data, context, recent_price=recent_price, risk_free_rate=risk_free_rate)
+    table = _skew_table(context, context.expiration_codes, pd.Index(context.expirations, name="expiration"))
+    return table.sort_values("time_to_expiry", kind="stable")
+
+
+def compute_skew_metrics_batch(options_data, recent_prices, risk_free_rate=0.01):
+    """`compute_skew_metrics` tablosunu, `get_options_data_batch` çıktısındaki tüm semboller için tek
+    seferde hesaplar; sembol başına döngü kurulmaz.
+
+    Args:
+        options_data (pd.DataFrame): `ticker` sütunlu birleşik opsiyon verisi
+        recent_prices (dict): Sembol -> son fiyat
+
+    Returns:
+        pd.DataFrame: (ticker, expiration) indeksli, her sembol içinde vadeye göre sıralı tablo.
+    """
+    if options_data is None:
+        return None
+
+    tickers = options_data["ticker"].astype(str)
+    spot = tickers.map(recent_prices).to_numpy(dtype=np.float64)
+    context = ChainContext(options_data, spot, risk_free_rate)
+    codes, groups = pd.factorize(pd.MultiIndex.from_arrays([tickers, options_data["expiration"].astype(str)]))
+    groups = groups.set_names(["ticker", "expiration"])
+    table = _skew_table(context, codes, groups)
+    return table.sort_values("time_to_expiry", kind="stable").sort_index(level=0, sort_remaining=False)
@@ -1,9 +1,11 @@
+import time
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_squared_error, r2_score
-from sklearn.model_selection import RandomizedSearchCV
+from sklearn.model_selection import RandomizedSearchCV, ParameterSampler
 import warnings
 warnings.filterwarnings('ignore')
 import lightgbm as lgb
@@ -45,54 +47,166 @@ def prepare_time_series_data(df, window_size=20):
     df = df.sort_index()
     df = df.fillna(method='ffill').fillna(method='bfill')
     df = add_technical_features(df)
-    features, targets, dates = [], [], []
     min_required_rows = max(window_size, 20) + 1
     if len(df) <= min_required_rows:
         print(f"Uyarı: Veri seti çok küçük! En az {min_required_rows} satır gerekli.")
         return None, None, None
-    for i in range(len(df) - window_size):
-        window_features = df['IV'].iloc[i:i+window_size].values
-        extra_features = df.iloc[i+window_size-1][get_feature_columns()].values
-        all_features = np.concatenate([window_features, extra_features])
-        # Hedef değişken: log(IV) farkı
-        prev_iv = df['IV'].iloc[i+window_size-1]
-        curr_iv = df['IV'].iloc[i+window_size]
-        # Negatif veya sıfır IV varsa log alınamaz, küçük bir sabit ekle
-        prev_iv = max(prev_iv, 1e-6)
-        curr_iv = max(curr_iv, 1e-6)
-        target = np.log(curr_iv) - np.log(prev_iv)
-        features.append(all_features)
-        targets.append(target)
-        dates.append(df.index[i+window_size])
-    return np.array(features), np.array(targets), dates
-
-def train_iv_prediction_model(historical_iv_data, window_size=20, test_size=0.2):
+    n_samples = len(df) - window_size
+    iv = df['IV'].to_numpy()
+    # Satır i: IV[i:i+window_size] penceresi ve pencerenin son günündeki teknik özellikler
+    windows = sliding_window_view(iv, window_size)[:n_samples]
+    extra_features = df[get_feature_columns()].to_numpy(dtype=np.float64)[window_size - 1:window_size - 1 + n_samples]
+    features = np.concatenate([windows, extra_features], axis=1)
+    # Hedef değişken: log(IV) farkı; negatif veya sıfır IV varsa log alınamaz, küçük bir sabitle kırpılır
+    log_iv = np.log(np.maximum(iv, 1e-6))
+    targets = log_iv[window_size:] - log_iv[window_size - 1:-1]
+    dates = list(df.index[window_size:])
+    return features, targets, dates
+
+PARAM_GRID = {
+    'num_leaves': [15, 31, 63, 127],
+    'learning_rate': [0.005, 0.01, 0.05, 0.1, 0.2],
+    'n_estimators': [200, 500, 1000, 1500],
+    'min_child_samples': [3, 5, 10, 20],
+    'min_split_gain': [0.0, 0.01, 0.05],
+    'reg_alpha': [0, 0.1, 1],
+    'reg_lambda': [0, 0.1, 1]
+}
+
+def halving_search(X, y, n_candidates=27, eta=3, min_rounds=50, max_rounds=None, early_stopping_rounds=50,
+                   n_splits=3, time_budget=None, budget_clock='wall', random_state=42):
+    # Ardışık yarılama: tüm adaylar az sayıda boosting turuyla başlar, her basamakta en iyi 1/eta'sı
+    # eta kat daha fazla turla (önceki booster'dan devam ederek) eğitilmeye devam eder. Her zaman serisi
+    # katmanında erken durdurma uygulanır; `time_budget` saniye (duvar saati veya 'cpu') dolduğunda arama
+    # durur ve o ana kadar bulunan en iyi aday döndürülür.
+    clock = time.process_time if budget_clock == 'cpu' else time.perf_counter
+    started = clock()
+
+    def exhausted():
+        return time_budget is not None and clock() - started > time_budget
+
+    max_rounds = max_rounds or max(PARAM_GRID['n_estimators'])
+    grid = {key: values for key, values in PARAM_GRID.items() if key != 'n_estimators'}
+    candidates = list(ParameterSampler(grid, n_iter=n_candidates, random_state=random_state))
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+    state = {(c, f): {'booster': None, 'rounds': 0, 'best_score': np.inf, 'best_iteration': 0, 'stopped': False}
+             for c in range(len(candidates)) for f in range(len(folds))}
+    scores = {}
+    survivors = list(range(len(candidates)))
+    rounds = min(min_rounds, max_rounds)
+    fits = 0
+    while survivors:
+        for c in survivors:
+            for f, (train_idx, valid_idx) in enumerate(folds):
+                fold = state[(c, f)]
+                if fold['stopped'] or fold['rounds'] >= rounds or exhausted():
+                    continue
+                params = {**candidates[c], 'objective': 'regression', 'verbose': -1, 'seed': random_state}
+                train_set = lgb.Dataset(X[train_idx], y[train_idx])
+                valid_set = lgb.Dataset(X[valid_idx], y[valid_idx], reference=train_set)
+                history = {}
+                booster = lgb.train(params, train_set, num_boost_round=rounds - fold['rounds'], valid_sets=[valid_set],
+                                    init_model=fold['booster'], keep_training_booster=True,
+                                    callbacks=[lgb.record_evaluation(history),
+                                               lgb.early_stopping(early_stopping_rounds, verbose=False)])
+                valid_scores = history['valid_0']['l2']
+                best = int(np.argmin(valid_scores))
+                if valid_scores[best] < fold['best_score']:
+                    fold['best_score'], fold['best_iteration'] = valid_scores[best], fold['rounds'] + best + 1
+                fold['booster'], fold['rounds'] = booster, fold['rounds'] + len(valid_scores)
+                fold['stopped'] = (fold['rounds'] < rounds
+                                   or fold['rounds'] - fold['best_iteration'] >= early_stopping_rounds)
+                fits += 1
+        # Basamağı tüm katmanlarda tamamlayan adaylar puanlanır ve en iyileri bir sonraki basamağa geçer
+        completed = [c for c in survivors
+                     if all(state[(c, f)]['stopped'] or state[(c, f)]['rounds'] >= rounds for f in range(len(folds)))]
+        for c in completed:
+            scores[c] = float(np.mean([state[(c, f)]['best_score'] for f in range(len(folds))]))
+        if exhausted() or rounds >= max_rounds:
+            break
+        survivors = sorted(completed, key=scores.get)[:max(1, len(completed) // eta)]
+        rounds = min(rounds * eta, max_rounds)
+
+    info = {'mode': 'halving', 'fits': fits, 'candidates': len(candidates), 'scored': len(scores),
+            'final_rounds': rounds, 'seconds': clock() - started, 'budget_exhausted': exhausted()}
+    if not scores:
+        return candidates[0], float('nan'), min_rounds, info
+    best = min(scores, key=scores.get)
+    n_rounds = max(1, int(round(np.mean([state[(best, f)]['best_iteration'] for f in range(len(folds))]))))
+    return candidates[best], scores[best], n_rounds, info
+
+def fit_iv_prediction_model(historical_iv_data, window_size=20, search='random', time_budget=None, budget_clock='wall'):
     X, y, dates = prepare_time_series_data(historical_iv_data, window_size)
     if X is None or len(X) < 10:
         print("Yeterli veri yok! Model eğitilemedi.")
-        return None, None, None
+        return None
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
-    param_grid = {
-        'num_leaves': [15, 31, 63, 127],
-        'learning_rate': [0.005, 0.01, 0.05, 0.1, 0.2],
-        'n_estimators': [200, 500, 1000, 1500],
-        'min_child_samples': [3, 5, 10, 20],
-        'min_split_gain': [0.0, 0.01, 0.05],
-        'reg_alpha': [0, 0.1, 1],
-        'reg_lambda': [0, 0.1, 1]
-    }
-    lgbm = lgb.LGBMRegressor(random_state=42)
-    tscv = TimeSeriesSplit(n_splits=3)
-    search = RandomizedSearchCV(lgbm, param_grid, n_iter=20, scoring='neg_mean_squared_error', cv=tscv, n_jobs=-1, random_state=42)
-    search.fit(X_scaled, y)
-    model = search.best_estimator_
+    if search == 'halving':
+        params, cv_mse, n_rounds, search_info = halving_search(X_scaled, y, time_budget=time_budget,
+                                                               budget_clock=budget_clock)
+        params = {**params, 'n_estimators': n_rounds}
+        model = lgb.LGBMRegressor(random_state=42, **params)
+        model.fit(X_scaled, y)
+    else:
+        lgbm = lgb.LGBMRegressor(random_state=42)
+        tscv = TimeSeriesSplit(n_splits=3)
+        random_search = RandomizedSearchCV(lgbm, PARAM_GRID, n_iter=20, scoring='neg_mean_squared_error', cv=tscv, n_jobs=-1, random_state=42)
+        random_search.fit(X_scaled, y)
+        model = random_search.best_estimator_
+        params, cv_mse = dict(random_search.best_params_), float(-random_search.best_score_)
+        search_info = {'mode': 'random', 'fits': len(random_search.cv_results_['params']) * random_search.n_splits_}
     y_pred = model.predict(X_scaled)
     mse = mean_squared_error(y, y_pred)
     r2 = r2_score(y, y_pred)
     print(f"LightGBM Model (log(IV) farkı) - MSE: {mse:.4f}, R²: {r2:.4f}")
     print_feature_importance(model, window_size)
-    return model, scaler, get_feature_columns()
+    return {
+        'model': model,
+        'scaler': scaler,
+        'feature_columns': get_feature_columns(),
+        'params': params,
+        'metrics': {'train_mse': mse, 'train_r2': r2, 'cv_mse': cv_mse},
+        'n_samples': len(X),
+        'last_date': dates[-1],
+        'search': search_info,
+    }
+
+def update_iv_prediction_model(model, scaler, params, historical_iv_data, window_size=20, since=None,
+                               update_rounds=None, update_window=250):
+    # Hiperparametre araması yapılmaz: mevcut booster, son `update_window` örnek üzerinde aynı
+    # parametrelerle `update_rounds` ağaç daha eğitilerek güncellenir (varsayılan: ayarlanmış ağaç
+    # sayısının %5'i). Ölçekleyici, önceki ağaçlarla tutarlı kalması için yeniden uydurulmaz.
+    if update_rounds is None:
+        update_rounds = max(1, int(np.ceil(params.get('n_estimators', 100) * 0.05)))
+    X, y, dates = prepare_time_series_data(historical_iv_data, window_size)
+    if X is None:
+        return None
+    if since is not None and not dates[-1] > since:
+        return None
+    X_scaled = scaler.transform(X[-update_window:])
+    y_window = y[-update_window:]
+    updated = lgb.LGBMRegressor(random_state=42, **{**params, 'n_estimators': update_rounds})
+    updated.fit(X_scaled, y_window, init_model=model.booster_)
+    y_pred = updated.predict(X_scaled)
+    mse = mean_squared_error(y_window, y_pred)
+    r2 = r2_score(y_window, y_pred)
+    print(f"LightGBM Model güncellendi (+{update_rounds} ağaç) - MSE: {mse:.4f}, R²: {r2:.4f}")
+    return {
+        'model': updated,
+        'scaler': scaler,
+        'feature_columns': get_feature_columns(),
+        'params': dict(params),
+        'metrics': {'train_mse': mse, 'train_r2': r2},
+        'n_samples': len(X),
+        'last_date': dates[-1],
+    }
+
+def train_iv_prediction_model(historical_iv_data, window_size=20, test_size=0.2, search='random', time_budget=None):
+    result = fit_iv_prediction_model(historical_iv_data, window_size, search, time_budget)
+    if result is None:
+        return None, None, None
+    return result['model'], result['scaler'], result['feature_columns']
 
 def print_feature_importance(model, window_size):
     feature_importance = model.feature_importances_
@@ -122,6 +236,41 @@ def create_empty_prediction_df(last_date, days_to_predict, default_value=None):
         df['IV'] = np.nan
     return df, future_dates
 
+class _RollingIVState:
+    # Tahmin adımları için sabit zamanlı kayan durum: son 20 IV değerinin halka tamponu ve 5/10/20 günlük
+    # toplamlar (10 günlük kareler toplamıyla birlikte) her yeni değerde yalnızca giren ve çıkan değerle
+    # güncellenir. 20 satırdan kısa geçmişlerde tamponun başı sıfırla doldurulur; böylece toplamlar
+    # yalnızca mevcut değerleri içerir ve ortalamalar `count` kadar değer üzerinden alınır.
+    SIZE = 20
+
+    def __init__(self, history):
+        history = np.asarray(history[-self.SIZE:], dtype=np.float64)
+        self.buffer = np.zeros(self.SIZE)
+        self.buffer[self.SIZE - len(history):] = history
+        self.head = 0
+        self.count = len(history)
+        self.sums = {n: self.buffer[-n:].sum() for n in (5, 10, 20)}
+        self.sum_sq10 = (self.buffer[-10:] ** 2).sum()
+
+    def _ago(self, lag):
+        # lag=1 en son eklenen değerdir; mevcut değerlerden eski konumlar sıfır dolgudur
+        return self.buffer[(self.head - lag) % self.SIZE]
+
+    def push(self, value):
+        for n in (5, 10, 20):
+            self.sums[n] += value - self._ago(n)
+        self.sum_sq10 += value * value - self._ago(10) ** 2
+        self.buffer[self.head] = value
+        self.head = (self.head + 1) % self.SIZE
+        self.count += 1
+
+    def mean(self, n):
+        return self.sums[n] / min(n, self.count)
+
+    def std10(self):
+        # Yalnızca count >= 10 iken anlamlıdır
+        return np.sqrt(max(self.sum_sq10 - self.sums[10] ** 2 / 10, 0.0) / 9)
+
 def predict_future_iv(model, scaler, historical_iv_data, days_to_predict=15, window_size=20):
     if model is None:
         print("Model eğitilemedi! Tahmin yapılamıyor.")
@@ -133,71 +282,69 @@ def predict_future_iv(model, scaler, historical_iv_data, days_to_predict=15, win
         )
         return predictions_df
     df = add_technical_features(historical_iv_data.copy().sort_index())
-    latest_iv_values = df['IV'].values[-window_size:]
+    iv_history = df['IV'].to_numpy(dtype=np.float64)
     last_date = df.index[-1]
-    last_iv = df['IV'].iloc[-1]
-    last_iv = max(last_iv, 1e-6)  # Log alınabilir olması için
-    last_volatility = df['Volatility'].iloc[-1]
-    predicted_df, future_dates = create_empty_prediction_df(last_date, days_to_predict)
-    combined_df = df.copy()
-    future_predictions = []
-    current_features = latest_iv_values.copy()
-    ema5 = df['EMA5'].iloc[-1]
-    ema10 = df['EMA10'].iloc[-1]
+    last_iv = max(iv_history[-1], 1e-6)  # Log alınabilir olması için
+    _, future_dates = create_empty_prediction_df(last_date, days_to_predict)
+    last_row = df[get_feature_columns()].iloc[-1]
+
+    # Her adımda yalnızca sabit boyutlu durum güncellenir; özellik ve ölçeklenmiş satırlar önceden ayrılır
+    state = _RollingIVState(iv_history)
+    # Pencereden kısa geçmişlerde model girdisinin boyutu korunur; eksik baş kısım ilk değerle doldurulur
+    window = np.empty(window_size)
+    latest = iv_history[-window_size:]
+    window[:window_size - len(latest)] = latest[0]
+    window[window_size - len(latest):] = latest
+    window_head = 0
+    n_features = window_size + len(get_feature_columns())
+    features = np.empty((1, n_features))
+    scaled = np.empty((1, n_features))
+    dow = np.asarray(future_dates.dayofweek)
+    dom = np.asarray(future_dates.day)
+    future_predictions = np.empty(days_to_predict)
+    ema5 = last_row['EMA5']
+    ema10 = last_row['EMA10']
+    recent_max = recent_min = None
     for i in range(days_to_predict):
-        future_date = future_dates[i]
-        day_of_week_sin, day_of_week_cos, day_of_month_sin, day_of_month_cos = get_cyclic_date_features(future_date)
         if i == 0:
-            ma5 = df['MA5'].iloc[-1]
-            ma10 = df['MA10'].iloc[-1]
-            ma20 = df['MA20'].iloc[-1]
-            volatility = df['Volatility'].iloc[-1]
-            roc5 = df['ROC5'].iloc[-1]
-            roc10 = df['ROC10'].iloc[-1]
-            iv_diff1 = df['IV_diff1'].iloc[-1]
-            iv_diff5 = df['IV_diff5'].iloc[-1]
-            iv_max5 = df['IV_max5'].iloc[-1]
-            iv_min5 = df['IV_min5'].iloc[-1]
-            vol_change = df['Vol_change'].iloc[-1]
-            macd = df['MACD'].iloc[-1]
+            extra = [last_row[c] for c in ('MA5', 'MA10', 'MA20', 'Volatility', 'ROC5', 'ROC10')]
+            ema_part = [ema5, ema10, last_row['MACD']]
+            tail = [last_row[c] for c in ('IV_diff1', 'IV_diff5', 'IV_max5', 'IV_min5', 'Vol_change')]
         else:
-            for prev_date in future_dates[:i]:
-                if prev_date in predicted_df.index:
-                    combined_df.loc[prev_date, 'IV'] = predicted_df.loc[prev_date, 'IV']
-            ma5 = combined_df['IV'].iloc[-5:].mean()
-            ma10 = combined_df['IV'].iloc[-10:].mean()
-            ma20 = combined_df['IV'].iloc[-20:].mean()
-            volatility = combined_df['IV'].iloc[-10:].std() if len(combined_df) >= 10 else last_volatility
-            roc5 = (future_predictions[-1] - future_predictions[-5]) / future_predictions[-5] * 100 if len(future_predictions) >= 5 and future_predictions[-5] != 0 else 0
-            roc10 = 0
-            if len(future_predictions) > 0:
-                ema5 = ema5 * 0.8 + future_predictions[-1] * 0.2
-                ema10 = ema10 * 0.9 + future_predictions[-1] * 0.1
-            macd = ema5 - ema10
-            iv_diff1 = future_predictions[-1] - (future_predictions[-2] if len(future_predictions) > 1 else current_features[-1])
-            iv_diff5 = 0
-            iv_max5 = max(future_predictions[-5:]) if len(future_predictions) >= 5 else max(future_predictions + list(current_features))
-            iv_min5 = min(future_predictions[-5:]) if len(future_predictions) >= 5 else min(future_predictions + list(current_features))
-            vol_change = 0
-        extra_features = np.array([
-            ma5, ma10, ma20, volatility, roc5, roc10, ema5, ema10, macd,
-            day_of_week_sin, day_of_week_cos, day_of_month_sin, day_of_month_cos,
-            iv_diff1, iv_diff5, iv_max5, iv_min5, vol_change
-        ])
-        all_features = np.concatenate([current_features, extra_features])
-        scaled_features = scaler.transform(all_features.reshape(1, -1))
+            previous = future_predictions[i - 1]
+            roc5 = (previous - future_predictions[i - 5]) / future_predictions[i - 5] * 100 \
+                if i >= 5 and future_predictions[i - 5] != 0 else 0
+            ema5 = ema5 * 0.8 + previous * 0.2
+            ema10 = ema10 * 0.9 + previous * 0.1
+            volatility = state.std10() if state.count >= 10 else last_row['Volatility']
+            extra = [state.mean(5), state.mean(10), state.mean(20), volatility, roc5, 0]
+            ema_part = [ema5, ema10, ema5 - ema10]
+            # İlk tahmin adımından sonra pencerenin son değeri de önceki tahmindir, bu yüzden fark 0 olur
+            iv_diff1 = previous - future_predictions[i - 2] if i > 1 else 0.0
+            if i >= 5:
+                recent = future_predictions[i - 5:i]
+                iv_max5, iv_min5 = recent.max(), recent.min()
+            else:
+                iv_max5 = max(recent_max, window.max())
+                iv_min5 = min(recent_min, window.min())
+            tail = [iv_diff1, 0, iv_max5, iv_min5, 0]
+        features[0, :window_size] = np.roll(window, -window_head)
+        features[0, window_size:] = extra + ema_part + [
+            np.sin(2 * np.pi * dow[i] / 7), np.cos(2 * np.pi * dow[i] / 7),
+            np.sin(2 * np.pi * dom[i] / 31), np.cos(2 * np.pi * dom[i] / 31),
+        ] + tail
+        np.subtract(features, scaler.mean_, out=scaled)
+        np.divide(scaled, scaler.scale_, out=scaled)
         # Model log(IV) farkı tahmin ediyor
-        next_log_iv_delta = model.predict(scaled_features)[0]
-        next_log_iv = np.log(last_iv) + next_log_iv_delta
-        next_iv = np.exp(next_log_iv)
-        next_iv = max(next_iv, 0)  # Negatif IV engellenir
+        next_log_iv_delta = model.predict(scaled)[0]
+        next_iv = max(np.exp(np.log(last_iv) + next_log_iv_delta), 0)  # Negatif IV engellenir
         last_iv = next_iv
-        future_predictions.append(next_iv)
-        predicted_df.loc[future_date, 'IV'] = next_iv
-        combined_df.loc[future_date] = np.nan
-        combined_df.loc[future_date, 'IV'] = next_iv
-        current_features = np.roll(current_features, -1)
-        current_features[-1] = next_iv
+        future_predictions[i] = next_iv
+        recent_max = next_iv if recent_max is None else max(recent_max, next_iv)
+        recent_min = next_iv if recent_min is None else min(recent_min, next_iv)
+        state.push(next_iv)
+        window[window_head] = next_iv
+        window_head = (window_head + 1) % window_size
     predictions_df = pd.DataFrame({
         'Predicted_IV': future_predictions
     }, index=future_dates)
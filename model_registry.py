@@ -0,0 +1,179 @@
+import hashlib
+import os
+import shutil
+import time
+
+import joblib
+import pandas as pd
+
+from cache import CACHE_DIR, atomic_write, file_lock, safe_name
+from ml_models import fit_iv_prediction_model, update_iv_prediction_model
+
+REGISTRY_DIR = os.path.join(CACHE_DIR, "models")
+# Bu süreden eski modeller veri değişmemiş olsa bile yeniden eğitilir
+MODEL_MAX_AGE = 7 * 24 * 3600
+# Tam hiperparametre araması bu aralıkta bir yapılır; arada yeni veriler artımlı güncellemeyle eklenir
+RETUNE_INTERVAL = 7 * 24 * 3600
+# Bir tam aramadan sonra yapılabilecek en fazla artımlı güncelleme (ağaç sayısını sınırlamak için)
+MAX_UPDATES = 20
+# Her (sembol, pencere) için diskte tutulan en fazla model sürümü
+MAX_VERSIONS = 3
+# Tam eğitimde kullanılan hiperparametre araması ve süre sınırı (saniye)
+DEFAULT_SEARCH = "halving"
+SEARCH_TIME_BUDGET = 60
+SUFFIX = ".joblib"
+
+
+def data_fingerprint(historical_iv_data):
+    """Eğitim verisinin (tarih indeksi ve IV değerleri) kısa bir özetini döndürür."""
+    iv = historical_iv_data["IV"].sort_index()
+    hashed = pd.util.hash_pandas_object(iv, index=True).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()[:16]
+
+
+def _model_dir(ticker, window_size, registry_dir):
+    return os.path.join(registry_dir, safe_name(ticker), f"w{int(window_size)}")
+
+
+def _versions(directory):
+    """Dizindeki model sürümlerini (zaman damgası, parmak izi, yol) olarak yeniden eskiye sıralar."""
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(SUFFIX)]
+    except FileNotFoundError:
+        return []
+    versions = []
+    for name in names:
+        timestamp, _, fingerprint = name[:-len(SUFFIX)].partition("_")
+        try:
+            versions.append((int(timestamp) / 1000, fingerprint, os.path.join(directory, name)))
+        except ValueError:
+            continue
+    return sorted(versions, reverse=True)
+
+
+def load_model(ticker, window_size, fingerprint=None, max_age=MODEL_MAX_AGE, registry_dir=REGISTRY_DIR):
+    """Kayıtlı en yeni modeli döndürür.
+
+    `fingerprint` verilirse yalnızca aynı veriyle eğitilmiş sürüm kabul edilir; `max_age` saniyeden eski
+    sürümler yok sayılır. Uygun sürüm yoksa veya dosya okunamıyorsa None döndürür.
+    """
+    for trained_at, version_fingerprint, path in _versions(_model_dir(ticker, window_size, registry_dir)):
+        if max_age is not None and time.time() - trained_at > max_age:
+            break
+        if fingerprint is not None and version_fingerprint != fingerprint:
+            continue
+        try:
+            entry = joblib.load(path)
+        except Exception:
+            continue
+        return entry
+    return None
+
+
+def save_model(ticker, window_size, fingerprint, entry, max_versions=MAX_VERSIONS, registry_dir=REGISTRY_DIR):
+    """Bir model kaydını diske yazar ve aynı (sembol, pencere) için en yeni `max_versions` sürümü tutar."""
+    directory = _model_dir(ticker, window_size, registry_dir)
+    trained_at = entry.get("trained_at", time.time())
+    path = os.path.join(directory, f"{int(trained_at * 1000)}_{fingerprint}{SUFFIX}")
+    with file_lock(directory):
+        atomic_write(path, lambda tmp_path: joblib.dump(entry, tmp_path))
+        for _, _, old_path in _versions(directory)[max_versions:]:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    return path
+
+
+def _incremental_update(previous, historical_iv_data, window_size, retune_interval, max_updates):
+    """Kayıtlı son modeli yeni verilerle günceller; tam arama zamanı gelmişse veya yeni gün yoksa None."""
+    if previous is None or "last_date" not in previous:
+        return None
+    if time.time() - previous.get("tuned_at", previous["trained_at"]) > retune_interval:
+        return None
+    if previous.get("updates", 0) >= max_updates:
+        return None
+    entry = update_iv_prediction_model(previous["model"], previous["scaler"], previous["params"],
+                                       historical_iv_data, window_size, since=previous["last_date"])
+    if entry is None:
+        return None
+    # Çapraz doğrulama hatası son tam aramadan taşınır
+    entry["metrics"] = {**previous["metrics"], **entry["metrics"]}
+    entry.update(tuned_at=previous.get("tuned_at", previous["trained_at"]), updates=previous.get("updates", 0) + 1)
+    return entry
+
+
+def get_or_train_model(ticker, historical_iv_data, window_size=20, max_age=MODEL_MAX_AGE, force_retrain=False,
+                       incremental=True, retune_interval=RETUNE_INTERVAL, max_updates=MAX_UPDATES,
+                       search=DEFAULT_SEARCH, time_budget=SEARCH_TIME_BUDGET, registry_dir=REGISTRY_DIR):
+    """Aynı veri ve pencere için taze bir kayıtlı model varsa onu yükler, yoksa günceller veya eğitir.
+
+    Veri değişmemişse (aynı parmak izi) ve kayıtlı model `max_age` saniyeden yeniyse yeniden eğitim
+    yapılmaz. Veri yeni günlerle uzamışsa ve son tam hiperparametre araması `retune_interval` saniyeden
+    yeniyse, `incremental` açıkken mevcut booster aynı hiperparametrelerle son örnekler üzerinde birkaç ağaç
+    daha eğitilir (en fazla `max_updates` kez). Diğer durumlarda veya `force_retrain` verildiğinde tam
+    hiperparametre araması (`search`, varsayılan olarak `time_budget` saniyeyle sınırlı ardışık yarılama)
+    yapılır.
+
+    Returns:
+        tuple: (model, scaler, feature_columns, info) - `info` hiperparametreleri, doğrulama metriklerini,
+        eğitim zamanını, parmak izini, modelin nasıl elde edildiğini (`mode`: "cached", "incremental" veya
+        "full") ve kayıttan gelip gelmediğini (`cached`) içerir. Model eğitilemezse ilk üç değer None olur.
+    """
+    fingerprint = data_fingerprint(historical_iv_data)
+    entry = None if force_retrain else load_model(ticker, window_size, fingerprint, max_age, registry_dir)
+    mode = "cached"
+
+    if entry is None and incremental and not force_retrain:
+        previous = load_model(ticker, window_size, None, retune_interval, registry_dir)
+        entry = _incremental_update(previous, historical_iv_data, window_size, retune_interval, max_updates)
+        mode = "incremental"
+
+    if entry is None:
+        entry = fit_iv_prediction_model(historical_iv_data, window_size, search, time_budget)
+        if entry is None:
+            return None, None, None, None
+        mode = "full"
+
+    if mode != "cached":
+        now = time.time()
+        entry.update(ticker=ticker, window_size=window_size, fingerprint=fingerprint, trained_at=now)
+        if mode == "full":
+            entry.update(tuned_at=now, updates=0)
+        try:
+            save_model(ticker, window_size, fingerprint, entry, registry_dir=registry_dir)
+        except (OSError, TimeoutError) as e:
+            print(f"{ticker} modeli kayda yazılamadı: {e}")
+
+    info = {key: value for key, value in entry.items() if key not in ("model", "scaler")}
+    info.update(mode=mode, cached=mode == "cached")
+    return entry["model"], entry["scaler"], entry["feature_columns"], info
+
+
+def refresh_models(histories, window_size=20, registry_dir=REGISTRY_DIR, **kwargs):
+    """Birden fazla sembolün modelini (ör. gece çalışan toplu işte) kayıttan yükler, günceller veya eğitir.
+
+    Args:
+        histories (dict): Sembol -> tarihsel IV verisi
+        **kwargs: `get_or_train_model` seçenekleri (max_age, incremental, retune_interval, ...)
+
+    Returns:
+        pd.DataFrame: Sembol başına mod, süre (saniye), örnek sayısı ve hata bilgisi.
+    """
+    rows = {}
+    for ticker, history in histories.items():
+        started = time.perf_counter()
+        try:
+            model, _, _, info = get_or_train_model(ticker, history, window_size, registry_dir=registry_dir, **kwargs)
+            rows[ticker] = {"mode": info["mode"] if info else None, "seconds": time.perf_counter() - started,
+                            "n_samples": info["n_samples"] if info else 0,
+                            "error": None if model is not None else "yeterli veri yok"}
+        except Exception as e:
+            rows[ticker] = {"mode": None, "seconds": time.perf_counter() - started, "n_samples": 0, "error": str(e)}
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def clear_models(ticker=None, registry_dir=REGISTRY_DIR):
+    """Kayıtlı modelleri (verilirse yalnızca bir sembolünkileri) siler."""
+    target = registry_dir if ticker is None else os.path.join(registry_dir, safe_name(ticker))
+    shutil.rmtree(target, ignore_errors=True)
@@ -0,0 +1,166 @@
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import pandas as pd
+import yfinance as yf
+
+# Günlük fiyat geçmişinin sütunları (yfinance şeması); veri yoksa bu sütunlarla boş tablo döndürülür
+HISTORY_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class MarketDataProvider(ABC):
+    """Opsiyon zinciri ve günlük fiyat verisi sağlayan kaynaklar için ortak arayüz."""
+
+    name = "base"
+    # Disk önbelleğinin bu kaynak için kullanılıp kullanılmayacağı
+    cacheable = True
+
+    @abstractmethod
+    def get_expirations(self, ticker):
+        """Sembolün vade tarihlerini ('YYYY-MM-DD' dizeleri) döndürür."""
+
+    @abstractmethod
+    def get_recent_price(self, ticker):
+        """Sembolün son kapanış fiyatını döndürür."""
+
+    @abstractmethod
+    def get_option_chain(self, ticker, expiration):
+        """Belirtilen vade için (calls, puts) DataFrame çiftini döndürür."""
+
+    @abstractmethod
+    def get_history(self, ticker, start_date, end_date):
+        """[start_date, end_date) aralığındaki günlük OHLC verisini tek seviyeli sütunlarla döndürür."""
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Verileri yfinance üzerinden canlı olarak getirir."""
+
+    name = "yfinance"
+
+    def __init__(self):
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def _asset(self, ticker):
+        with self._lock:
+            if ticker not in self._assets:
+                self._assets[ticker] = yf.Ticker(ticker)
+            return self._assets[ticker]
+
+    def get_expirations(self, ticker):
+        return self._asset(ticker).options
+
+    def get_recent_price(self, ticker):
+        return self._asset(ticker).history(period="1d")["Close"].iloc[-1]
+
+    def get_option_chain(self, ticker, expiration):
+        chain = self._asset(ticker).option_chain(expiration)
+        return chain.calls, chain.puts
+
+    def get_history(self, ticker, start_date, end_date):
+        hist_data = yf.download(ticker, start=start_date, end=end_date)
+        if isinstance(hist_data.columns, pd.MultiIndex):
+            hist_data.columns = hist_data.columns.get_level_values(0)
+        return hist_data
+
+
+class ReplayProvider(MarketDataProvider):
+    """`record_ticker` ile kaydedilmiş zincirleri ve fiyat geçmişini yerel dosyalardan sunar.
+
+    Her istekten önce `latency` saniye (± `jitter`) beklenerek gerçek bir kaynağın gecikmesi taklit edilir;
+    `seed` verilirse gecikme dizisi tekrarlanabilir olur.
+    """
+
+    name = "replay"
+    cacheable = False
+
+    def __init__(self, directory, latency=0.0, jitter=0.0, seed=None):
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        if self.latency <= 0 and self.jitter <= 0:
+            return
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _meta(self, ticker):
+        path = os.path.join(self.directory, ticker.upper(), "meta.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"options": [], "recent_price": None}
+
+    def get_expirations(self, ticker):
+        self._sleep()
+        return tuple(self._meta(ticker)["options"])
+
+    def get_recent_price(self, ticker):
+        self._sleep()
+        return self._meta(ticker)["recent_price"]
+
+    def get_option_chain(self, ticker, expiration):
+        self._sleep()
+        path = os.path.join(self.directory, ticker.upper(), "chains", f"{expiration}.parquet")
+        data = pd.read_parquet(path)
+        calls = data[data["type"] == "call"].drop(columns="type")
+        puts = data[data["type"] == "put"].drop(columns="type")
+        return calls, puts
+
+    def get_history(self, ticker, start_date, end_date):
+        self._sleep()
+        path = os.path.join(self.directory, ticker.upper(), "history.parquet")
+        try:
+            hist_data = pd.read_parquet(path)
+        except FileNotFoundError:
+            return pd.DataFrame(columns=HISTORY_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+        return hist_data[(hist_data.index >= pd.Timestamp(start_date)) & (hist_data.index < pd.Timestamp(end_date))]
+
+
+def record_ticker(ticker, directory, provider=None, start_date="2020-01-01", end_date=None):
+    """Bir sembolün güncel opsiyon zincirlerini ve fiyat geçmişini `ReplayProvider` için diske kaydeder."""
+    provider = provider or YFinanceProvider()
+    end_date = end_date or pd.Timestamp.now().strftime("%Y-%m-%d")
+    ticker_dir = os.path.join(directory, ticker.upper())
+    os.makedirs(os.path.join(ticker_dir, "chains"), exist_ok=True)
+
+    exp_dates = provider.get_expirations(ticker)
+    recent_price = provider.get_recent_price(ticker) if exp_dates else None
+    with open(os.path.join(ticker_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"options": list(exp_dates),
+                   "recent_price": None if recent_price is None else float(recent_price)}, f)
+
+    for expiration in exp_dates:
+        calls, puts = provider.get_option_chain(ticker, expiration)
+        data = pd.concat([calls.assign(type="call"), puts.assign(type="put")])
+        data.to_parquet(os.path.join(ticker_dir, "chains", f"{expiration}.parquet"))
+
+    history = provider.get_history(ticker, start_date, end_date)
+    if history is not None and not history.empty:
+        history.to_parquet(os.path.join(ticker_dir, "history.parquet"))
+    return ticker_dir
+
+
+_default_provider = ReplayProvider(os.environ["IV_REPLAY_DIR"]) if os.environ.get("IV_REPLAY_DIR") \
+    else YFinanceProvider()
+
+
+def get_default_provider():
+    """`provider` verilmediğinde kullanılan veri kaynağını döndürür."""
+    return _default_provider
+
+
+def set_default_provider(provider):
+    """Varsayılan veri kaynağını değiştirir (ör. kıyaslama için `ReplayProvider`)."""
+    global _default_provider
+    _default_provider = provider
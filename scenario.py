@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from chain_context import ChainContext
+
+DEFAULT_SPOT_SHIFTS = np.linspace(-0.10, 0.10, 50)
+DEFAULT_VOL_SHIFTS = np.linspace(-5.0, 5.0, 20)
+DEFAULT_DAY_STEPS = np.arange(10)
+# Şokla sıfırın altına düşen volatilitelerin kırpıldığı alt sınır
+MIN_VOLATILITY = 1e-4
+
+
+@dataclass(frozen=True)
+class ScenarioResult:
+    """Senaryo ızgarası sonuçları; tüm yüzeyler (spot, vol, gün) boyutundadır.
+
+    `pnl` dolar cinsinden, `delta` ve `gamma` hisse adedi cinsinden, `vega` 1 volatilite puanı başına
+    dolar cinsinden pozisyon toplamlarıdır.
+    """
+
+    spot_shifts: np.ndarray
+    vol_shifts: np.ndarray
+    day_steps: np.ndarray
+    base_value: float
+    pnl: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+
+    def to_frame(self):
+        """Sonuçları her senaryo için bir satır içeren uzun formatta DataFrame olarak döndürür."""
+        index = pd.MultiIndex.from_product([self.spot_shifts, self.vol_shifts, self.day_steps],
+                                           names=["spot_shift", "vol_shift", "day_step"])
+        return pd.DataFrame({"pnl": self.pnl.ravel(), "delta": self.delta.ravel(),
+                             "gamma": self.gamma.ravel(), "vega": self.vega.ravel()}, index=index)
+
+
+def position_quantities(options_data, positions=None):
+    """Pozisyonları zincirin satır sırasına hizalanmış kontrat adetlerine çevirir.
+
+    `positions` None ise açık pozisyon (tüm opsiyon sahiplerinin toplam pozisyonu) kullanılır; bir dizi
+    verilirse satırlarla aynı uzunlukta olmalıdır; bir DataFrame verilirse 'expiration', 'strike', 'type'
+    ve 'quantity' sütunlarıyla zincire eşlenir (eşleşmeyen satırlar 0 adettir).
+    """
+    if positions is None:
+        return np.nan_to_num(options_data["openInterest"].to_numpy(dtype=np.float64))
+
+    if isinstance(positions, pd.DataFrame):
+        keys = ["expiration", "strike", "type"]
+        quantity = positions.assign(expiration=positions["expiration"].astype(str),
+                                    type=positions["type"].astype(str)).groupby(keys)["quantity"].sum()
+        chain_keys = pd.MultiIndex.from_arrays([options_data["expiration"].astype(str),
+                                                options_data["strike"], options_data["type"].astype(str)],
+                                               names=keys)
+        return quantity.reindex(chain_keys, fill_value=0).to_numpy(dtype=np.float64)
+
+    quantity = np.asarray(positions, dtype=np.float64)
+    if quantity.shape != (len(options_data),):
+        raise ValueError(f"positions uzunluğu ({quantity.size}) opsiyon sayısıyla ({len(options_data)}) eşleşmiyor.")
+    return quantity
+
+
+def _reprice(is_call, K, sigma, T, r, spot, vol_shifts, years_forward, weights, max_cells=2_000_000):
+    """Tüm (spot, vol, gün) senaryolarında pozisyon değeri, delta, gamma ve vegasını hesaplar.
+
+    Vol ve gün eksenleri tek bir senaryo ekseninde birleştirilir. Spota bağlı olmayan her şey (şoklanmış
+    volatilite, kalan süre, iskontolu kullanım fiyatı) senaryo × opsiyon matrisinde bir kez hesaplanır ve
+    spot ekseniyle birlikte yayınlanır; bir seferde en fazla `max_cells` spot × senaryo × opsiyon hücresi
+    kurulur. Put değerleri put-call paritesi ile call değerlerinden doğrusal düzeltmeyle elde edilir;
+    böylece hücreler üzerinde yalnızca call fiyatı hesaplanır. Vadesi geçen opsiyonlar içsel değerleriyle
+    eklenir.
+
+    Returns:
+        np.ndarray: (4, spot, vol, gün) boyutunda değer, delta, gamma ve vega yüzeyleri.
+    """
+    n_options = max(K.size, 1)
+    # Senaryo ekseni: vol şokları yavaş, günler hızlı değişir
+    shifts = np.repeat(vol_shifts, years_forward.size)
+    forwards = np.tile(years_forward, vol_shifts.size)
+    surfaces = np.zeros((4, spot.size, shifts.size))
+    S = spot[:, None]
+    log_spot = np.log(spot)[:, None, None]
+    log_strike = np.log(K)
+    is_put = ~is_call
+
+    # Vadesi geçenler: içsel değer ve kullanılmışsa ±1 delta
+    payoff = exercised = None
+    if (T <= years_forward.max(initial=0)).any():
+        payoff = np.where(is_call, np.maximum(S - K, 0), np.maximum(K - S, 0))
+        exercised = np.where(is_call, (S > K).astype(np.float64), -(S < K).astype(np.float64))
+
+    block = min(shifts.size, max(1, max_cells // n_options))
+    spot_block = max(1, max_cells // (block * n_options))
+    for start in range(0, shifts.size, block):
+        pairs = slice(start, start + block)
+        remaining = T - forwards[pairs, None]
+        alive = remaining > 0
+        if payoff is not None:
+            dead_weights = np.where(alive, 0.0, weights)
+            surfaces[0, :, pairs] += payoff @ dead_weights.T
+            surfaces[1, :, pairs] += exercised @ dead_weights.T
+        # Vadesi geçenlerin ağırlığı sıfırlanır; kalan süreleri yalnızca sonlu değerler üretmek için 1 yapılır
+        w = np.where(alive, weights, 0.0)
+        rem = np.where(alive, remaining, 1.0)
+        sqrt_t = np.sqrt(rem)
+        sig = np.maximum(sigma + shifts[pairs, None], MIN_VOLATILITY)
+        sigma_sqrt_t = sig * sqrt_t
+        inv_sigma_sqrt_t = 1 / sigma_sqrt_t
+        # d1 = log(S) / (σ√T) + sabit; spot dışındaki her şey bu bloğun senaryo × opsiyon matrisindedir
+        d1_offset = ((r + 0.5 * sig * sig) * rem - log_strike) * inv_sigma_sqrt_t
+        strike_weights = K * np.exp(-r * rem) * w
+        # Parite: P = C - S + K e^(-rT), put deltası = call deltası - 1
+        put_units = (w * is_put).sum(axis=1)
+        put_strike = (strike_weights * is_put).sum(axis=1)
+        gamma_weights = w * inv_sigma_sqrt_t
+        vega_weights = w * sqrt_t
+
+        for spot_start in range(0, spot.size, spot_block):
+            spots = slice(spot_start, spot_start + spot_block)
+            S_block = S[spots]
+            d1 = log_spot[spots] * inv_sigma_sqrt_t + d1_offset
+            cdf_d1 = ndtr(d1)
+            pdf_d1 = np.exp(-0.5 * d1 * d1) * (1 / np.sqrt(2 * np.pi))
+            d1 -= sigma_sqrt_t
+            cdf_d2 = ndtr(d1)
+            call_units = np.einsum("svn,vn->sv", cdf_d1, w)
+            surfaces[0, spots, pairs] += (S_block * (call_units - put_units)
+                                          - np.einsum("svn,vn->sv", cdf_d2, strike_weights) + put_strike)
+            surfaces[1, spots, pairs] += call_units - put_units
+            surfaces[2, spots, pairs] += np.einsum("svn,vn->sv", pdf_d1, gamma_weights) / S_block
+            surfaces[3, spots, pairs] += np.einsum("svn,vn->sv", pdf_d1, vega_weights) * S_block * 0.01
+
+    return surfaces.reshape(4, spot.size, vol_shifts.size, years_forward.size)
+
+
+def scenario_grid(options_data, recent_price, positions=None, spot_shifts=DEFAULT_SPOT_SHIFTS,
+                  vol_shifts=DEFAULT_VOL_SHIFTS, day_steps=DEFAULT_DAY_STEPS, risk_free_rate=0.01,
+                  contract_size=100, context=None, max_cells=2_000_000):
+    """Bir pozisyon setini spot × volatilite × zaman şokları ızgarasında Black-Scholes ile yeniden fiyatlar.
+
+    Args:
+        options_data (pd.DataFrame): `get_options_data` ile alınan opsiyon zinciri
+        recent_price (float): Güncel hisse fiyatı
+        positions: Kontrat adetleri (bkz. `position_quantities`); None ise açık pozisyon kullanılır
+        spot_shifts: Göreli spot şokları (ör. 0.05 = %5 yükseliş)
+        vol_shifts: Volatilite şokları, volatilite puanı cinsinden (ör. 5 = IV'de 5 puan artış)
+        day_steps: İleri alınacak takvim günleri; vadesi geçen opsiyonlar içsel değerle fiyatlanır
+        max_cells: Bir seferde hesaplanan en fazla senaryo × opsiyon hücresi (bellek sınırı)
+
+    Returns:
+        ScenarioResult: P&L ve pozisyon greklerinin (spot, vol, gün) yüzeyleri; veri yoksa None.
+    """
+    if options_data is None:
+        return None
+
+    context = ChainContext.ensure(options_data, context, recent_price=recent_price, risk_free_rate=risk_free_rate)
+    quantity = position_quantities(options_data, positions)
+    K = options_data["strike"].to_numpy(dtype=np.float64)
+    sigma = options_data["impliedVolatility"].to_numpy(dtype=np.float64)
+    T = context.time_to_expiry
+    held = (quantity != 0) & (T > 0) & (sigma > 0) & (K > 0) & np.isfinite(T + sigma + K)
+
+    is_call, K, sigma, T = context.is_call[held], K[held], sigma[held], T[held]
+    weights = quantity[held] * contract_size
+
+    spot_shifts = np.asarray(spot_shifts, dtype=np.float64)
+    vol_shifts = np.asarray(vol_shifts, dtype=np.float64)
+    day_steps = np.asarray(day_steps, dtype=np.float64)
+    spot = recent_price * (1 + spot_shifts)
+    years_forward = day_steps / 365.25
+
+    base_value = _reprice(is_call, K, sigma, T, risk_free_rate, np.array([recent_price], dtype=np.float64),
+                          np.zeros(1), np.zeros(1), weights)[0].item()
+
+    surfaces = _reprice(is_call, K, sigma, T, risk_free_rate, spot, vol_shifts / 100, years_forward, weights,
+                        max_cells)
+
+    value, delta, gamma, vega = surfaces
+    return ScenarioResult(spot_shifts, vol_shifts, day_steps, float(base_value), value - base_value,
+                          delta, gamma, vega)
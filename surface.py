@@ -0,0 +1,293 @@
+import threading
+
+import numpy as np
+
+from chain_context import ChainContext
+
+# Bir vadenin kalibre edilebilmesi için gereken en az nokta sayısı
+MIN_POINTS = 5
+# Geçersiz (sıfır altı) toplam varyansların IV'ye çevrilirken kırpıldığı alt sınır
+MIN_VARIANCE = 1e-8
+# Parametre sırası: a, b, rho, m, sigma
+LOWER_BOUNDS = np.array([-1.0, 1e-6, -0.999, -2.0, 1e-4])
+UPPER_BOUNDS = np.array([4.0, 10.0, 0.999, 2.0, 5.0])
+# Bu RMSE'nin (IV, ondalık) üzerindeki dilimler güvenilmez sayılır ve sonraki kalibrasyona başlangıç olmaz
+MAX_RMSE = 0.05
+
+_calibrations = {}
+_calibrations_lock = threading.Lock()
+
+
+def svi_total_variance(k, a, b, rho, m, sigma):
+    """Ham SVI toplam varyansı: w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2))."""
+    d = k - m
+    return a + b * (rho * d + np.sqrt(d * d + sigma * sigma))
+
+
+class SVISurface:
+    """Vade başına kalibre edilmiş SVI dilimlerinden oluşan volatilite yüzeyi.
+
+    Dilimler arasında, sabit log-forward-moneyness üzerinde toplam varyans vadeye göre doğrusal
+    enterpolasyonla hesaplanır; ilk vadeden önce ve son vadeden sonra volatilite sabit tutulur.
+    """
+
+    def __init__(self, expirations, T, params, spot, risk_free_rate, rmse, strike_range, iterations=None,
+                 dropped=None):
+        self.expirations = expirations
+        self.T = T
+        self.params = params
+        self.spot = spot
+        self.risk_free_rate = risk_free_rate
+        self.rmse = rmse
+        self.strike_range = strike_range
+        self.iterations = iterations
+        # Güvenilmez bulunup yüzeyden çıkarılan vadeler: {vade: kalibrasyon RMSE'si}
+        self.dropped = dict(dropped or {})
+
+    def reliable(self, max_rmse=MAX_RMSE):
+        """Yalnızca RMSE'si `max_rmse` altındaki dilimlerden oluşan bir yüzey döndürür.
+
+        Çıkarılan vadeler yeni yüzeyin `dropped` sözlüğüne eklenir; hiçbir dilim kalmazsa None döner.
+        """
+        keep = self.rmse <= max_rmse
+        if keep.all():
+            return self
+        if not keep.any():
+            return None
+        dropped = {**self.dropped, **{expiration: float(rmse) for expiration, rmse, kept
+                                      in zip(self.expirations, self.rmse, keep) if not kept}}
+        return SVISurface([expiration for expiration, kept in zip(self.expirations, keep) if kept], self.T[keep],
+                          self.params[keep], self.spot, self.risk_free_rate, self.rmse[keep], self.strike_range,
+                          None if self.iterations is None else self.iterations[keep], dropped)
+
+    def log_moneyness(self, strike, expiry):
+        return np.log(strike / (self.spot * np.exp(self.risk_free_rate * expiry)))
+
+    def total_variance(self, strike, expiry):
+        """Kullanım fiyatı ve vadeye kalan süre (yıl) dizileri için toplam varyans; girdiler yayınlanır."""
+        strike, expiry = np.broadcast_arrays(np.asarray(strike, dtype=np.float64),
+                                             np.asarray(expiry, dtype=np.float64))
+        k = self.log_moneyness(strike, expiry)
+        slices = svi_total_variance(k[..., None], *self.params.T)
+
+        upper = np.clip(np.searchsorted(self.T, expiry), 1, max(len(self.T) - 1, 1))
+        lower = upper - 1
+        if len(self.T) == 1:
+            return slices[..., 0] * expiry / self.T[0]
+
+        w_lower = np.take_along_axis(slices, lower[..., None], axis=-1)[..., 0]
+        w_upper = np.take_along_axis(slices, upper[..., None], axis=-1)[..., 0]
+        T_lower, T_upper = self.T[lower], self.T[upper]
+        weight = (expiry - T_lower) / (T_upper - T_lower)
+        w = w_lower + weight * (w_upper - w_lower)
+        w = np.where(expiry < self.T[0], slices[..., 0] * expiry / self.T[0], w)
+        return np.where(expiry > self.T[-1], slices[..., -1] * expiry / self.T[-1], w)
+
+    def iv(self, strike, expiry):
+        """Kullanım fiyatı ve vadeye kalan süre (yıl) için implied volatilite (ondalık)."""
+        expiry = np.asarray(expiry, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(np.maximum(self.total_variance(strike, expiry), 0) / expiry)
+
+
+def _initial_guess(k, iv, T):
+    """Dilimin toplam varyans düzeyi, eğimi ve eğriliğinden (ikinci derece uyum) SVI başlangıç noktası.
+
+    Tepe noktası m = 0 alınarak w(k) ≈ a + b*sigma + b*rho*k + b/(2*sigma)*k^2 açılımı dilimdeki
+    varyans düzeyine, eğime ve eğriliğe eşlenir; böylece başlangıç noktası vadenin ölçeğinde olur.
+    """
+    w = iv * iv * T
+    level = np.median(w)
+    sigma = max(np.ptp(k) / 4, 1e-2)
+    if np.unique(k).size >= 3:
+        curvature, slope, level = np.polyfit(k, w, 2)
+    else:
+        curvature, slope = 0.0, 0.0
+    b = max(2 * sigma * curvature, abs(slope) / 0.9, 1e-3 * max(level, w.min()) / sigma, LOWER_BOUNDS[1])
+    rho = float(np.clip(slope / b, -0.9, 0.9))
+    a = max(level - b * sigma, 0.5 * w.min() - b * sigma * np.sqrt(1 - rho * rho))
+    return _project(np.array([a, b, rho, 0.0, sigma]))
+
+
+def _project(x):
+    """Parametreleri sınırlara kırpar; dilimin en küçük varyansı a + b*sigma*sqrt(1 - rho^2) en az
+    MIN_VARIANCE olacak şekilde a'yı yükseltir.
+    """
+    x = np.clip(x, LOWER_BOUNDS, UPPER_BOUNDS)
+    a, b, rho, _, sigma = np.moveaxis(x, -1, 0)
+    x[..., 0] = np.maximum(a, MIN_VARIANCE - b * sigma * np.sqrt(1 - rho * rho))
+    return x
+
+
+def _calibrate(k, T, iv, slice_idx, x0, max_iter=100, iv_tol=1e-6, step_rtol=0.1, gtol=1e-6):
+    """Tüm dilimleri birlikte, toplu (vektörize) Levenberg-Marquardt ile kalibre eder.
+
+    Noktalar dilime göre sıralı olmalıdır. Her iterasyonda tüm dilimlerin 5x5 normal denklemleri tek
+    seferde kurulup çözülür; her dilimin sönüm katsayısı ayrı ayarlanır ve yakınsayan dilimler
+    sabitlenir. Artıklar IV cinsindendir: sqrt(w / T) - iv. Her adımdan sonra parametreler, dilimin
+    en küçük toplam varyansı pozitif kalacak şekilde izdüşürülür; böylece varyans tabana inip
+    Jacobian sıfırlanmaz.
+
+    Bir dilim; RMSE'si `iv_tol` altına indiğinde, bir adım modeldeki IV'leri en fazla
+    max(`iv_tol`, `step_rtol` * RMSE) kadar değiştirdiğinde (IV cinsinden, artıkların büyüklüğüne
+    ölçeklenmiş adım ölçütü) veya artıkların her parametre yönüyle açısının kosinüsü `gtol` altına
+    indiğinde (ölçekten bağımsız gradyan ölçütü) yakınsamış sayılır.
+
+    Returns:
+        tuple: (params, rmse, iterations) - (dilim, 5) parametreler, dilim başına RMSE ve dilim başına
+        iterasyon sayısı.
+    """
+    n_slices = len(x0)
+    starts = np.flatnonzero(np.r_[True, slice_idx[1:] != slice_idx[:-1]])
+    counts = np.diff(np.r_[starts, len(k)])
+
+    def evaluate(x):
+        a, b, rho, m, sigma = x[slice_idx].T
+        d = k - m
+        root = np.sqrt(d * d + sigma * sigma)
+        w = a + b * (rho * d + root)
+        residual = np.sqrt(np.maximum(w, MIN_VARIANCE) / T) - iv
+        return residual, np.add.reduceat(residual * residual, starts), (a, b, rho, sigma, d, root, w)
+
+    x = _project(np.array(x0, dtype=np.float64))
+    residual, cost, parts = evaluate(x)
+    damping = np.full(n_slices, 1e-3)
+    active = np.ones(n_slices, dtype=bool)
+    iterations = np.zeros(n_slices, dtype=int)
+    eye = np.eye(5)
+
+    for _ in range(max_iter):
+        active &= cost > iv_tol * iv_tol * counts
+        if not active.any():
+            break
+        iterations += active
+        a, b, rho, sigma, d, root, w = parts
+        scale = 0.5 / np.sqrt(np.maximum(w, MIN_VARIANCE) * T)
+        jac = np.column_stack([np.ones_like(d), rho * d + root, b * d, -b * (rho + d / root),
+                               b * sigma / root]) * scale[:, None]
+        jtj = np.add.reduceat(jac[:, :, None] * jac[:, None, :], starts)
+        jtr = np.add.reduceat(jac * residual[:, None], starts)
+
+        # Sınırda olup gradyanı sınır dışına iten parametreler bu adımda sabit tutulur
+        binding = (((x <= LOWER_BOUNDS) & (jtr > 0)) | ((x >= UPPER_BOUNDS) & (jtr < 0)))
+        free = ~binding
+        jtj = jtj * free[:, :, None] * free[:, None, :] + eye * binding[:, :, None]
+        jtr = jtr * free
+
+        column_norm = np.sqrt(np.einsum("sii->si", jtj) * free)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cosine = np.nan_to_num(np.abs(jtr) / (column_norm * np.sqrt(cost)[:, None]))
+
+        lhs = jtj + damping[:, None, None] * (jtj * eye + 1e-12 * eye)
+        step = -np.linalg.solve(lhs, jtr[:, :, None])[:, :, 0]
+        step[~active] = 0
+        # Adım, henüz sınırda olmayan parametrelerin sınıra kalan mesafesinin en fazla yarısını kullanacak
+        # şekilde kısaltılır; aksi halde ör. sigma tek adımda alt sınıra yapışıp Jacobian'ı sıfırlayabilir
+        room = np.where(step < 0, x - LOWER_BOUNDS, UPPER_BOUNDS - x)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            limit = np.where((room > 0) & (step != 0), 0.5 * room / np.abs(step), np.inf)
+        step *= np.minimum(1.0, limit.min(axis=1))[:, None]
+        candidate = _project(x + step)
+        _, new_cost, _ = evaluate(candidate)
+
+        # Adımın modeldeki IV'leri ne kadar değiştirdiği (doğrusal yaklaşımla), dilim başına en büyük değer
+        iv_change = np.maximum.reduceat(np.abs(np.einsum("ij,ij->i", jac, (candidate - x)[slice_idx])), starts)
+        improved = active & (new_cost < cost)
+        rmse = np.sqrt(cost / counts)
+        converged = active & ((cosine.max(axis=1) <= gtol)
+                              | (improved & (iv_change <= np.maximum(iv_tol, step_rtol * rmse))))
+        x[improved] = candidate[improved]
+        damping = np.where(improved, damping / 3, damping * 4)
+        active &= ~converged & (damping < 1e10)
+        residual, cost, parts = evaluate(x)
+
+    return x, np.sqrt(cost / counts), iterations
+
+
+def fit_svi_surface(options_data, recent_price, ticker=None, risk_free_rate=0.01, context=None, warm_start=True):
+    """Her vade için bir SVI dilimi kalibre eder ve bir `SVISurface` döndürür.
+
+    Her kullanım fiyatında forward'a göre out-of-the-money olan opsiyon (altında put, üstünde call)
+    kullanılır. `ticker` verilirse RMSE'si `MAX_RMSE` altındaki dilimlerin parametreleri bellekte saklanır
+    ve aynı sembolün sonraki anlık görüntüsünde başlangıç noktası olarak kullanılır; böylece yeniden
+    kalibrasyon birkaç iterasyonda tamamlanır. Sıcak başlangıçla güvenilmez kalan veya önceki RMSE'sine
+    göre belirgin biçimde kötüleşen dilimler soğuk başlangıçla yeniden denenir.
+
+    Returns:
+        SVISurface: Kalibre edilmiş yüzey; yeterli veri yoksa None.
+    """
+    if options_data is None:
+        return None
+
+    context = ChainContext.ensure(options_data, context, recent_price=recent_price, risk_free_rate=risk_free_rate)
+    k = context.log_moneyness
+    T = context.time_to_expiry
+    iv = options_data["impliedVolatility"].to_numpy(dtype=np.float64)
+    out_of_the_money = np.where(context.is_call, k >= 0, k < 0)
+    usable = out_of_the_money & (T > 0) & np.isfinite(iv) & (iv > 1e-3) & np.isfinite(k)
+
+    codes = context.expiration_codes
+    counts = np.bincount(codes[usable], minlength=len(context.expirations))
+    fitted_codes = np.flatnonzero(counts >= MIN_POINTS)
+    if fitted_codes.size == 0:
+        return None
+    usable &= np.isin(codes, fitted_codes)
+    slice_of_code = np.full(len(context.expirations), -1)
+    slice_of_code[fitted_codes] = np.arange(len(fitted_codes))
+    slice_idx = slice_of_code[codes[usable]]
+    order = np.argsort(slice_idx, kind="stable")
+    slice_idx = slice_idx[order]
+    k, T, iv = k[usable][order], T[usable][order], iv[usable][order]
+    expirations = [str(exp) for exp in context.expirations[fitted_codes]]
+
+    with _calibrations_lock:
+        previous = dict(_calibrations.get(ticker, {})) if warm_start and ticker is not None else {}
+    bounds = np.r_[np.flatnonzero(np.r_[True, slice_idx[1:] != slice_idx[:-1]]), len(slice_idx)]
+
+    def cold_start(i):
+        return _initial_guess(k[bounds[i]:bounds[i + 1]], iv[bounds[i]:bounds[i + 1]], T[bounds[i]:bounds[i + 1]])
+
+    warm = np.array([expiration in previous for expiration in expirations])
+    x0 = np.array([previous[expiration][0] if expiration in previous else cold_start(i)
+                   for i, expiration in enumerate(expirations)])
+    params, rmse, iterations = _calibrate(k, T, iv, slice_idx, x0)
+
+    # Sıcak başlangıçlı bir dilim güvenilmez kaldıysa veya önceki kalibrasyonuna göre belirgin biçimde
+    # kötüleştiyse (zincir değişmiş olabilir) soğuk başlangıçla yeniden kalibre edilir; iyi olan tutulur
+    previous_rmse = np.array([previous[expiration][1] if expiration in previous else np.inf
+                              for expiration in expirations])
+    retry = np.flatnonzero(warm & ((rmse > MAX_RMSE) | (rmse > 2 * previous_rmse + 1e-4)))
+    if retry.size:
+        in_retry = np.isin(slice_idx, retry)
+        cold_params, cold_rmse, cold_iterations = _calibrate(
+            k[in_retry], T[in_retry], iv[in_retry], np.searchsorted(retry, slice_idx[in_retry]),
+            np.array([cold_start(i) for i in retry]))
+        better = cold_rmse < rmse[retry]
+        params[retry[better]], rmse[retry[better]] = cold_params[better], cold_rmse[better]
+        iterations[retry] += cold_iterations
+
+    if ticker is not None:
+        with _calibrations_lock:
+            _calibrations[ticker] = {expiration: (params[i], rmse[i]) for i, expiration in enumerate(expirations)
+                                     if rmse[i] <= MAX_RMSE}
+
+    slice_T = np.bincount(slice_idx, weights=T) / np.bincount(slice_idx)
+    by_expiry = np.argsort(slice_T)
+    strikes = options_data["strike"].to_numpy(dtype=np.float64)[usable]
+    return SVISurface([expirations[i] for i in by_expiry], slice_T[by_expiry], params[by_expiry], recent_price,
+                      risk_free_rate, rmse[by_expiry], (strikes.min(), strikes.max()), iterations[by_expiry])
+
+
+def get_cached_calibration(ticker):
+    """Bir sembol için en son saklanan {vade: (a, b, rho, m, sigma)} parametrelerini döndürür."""
+    with _calibrations_lock:
+        return {expiration: params for expiration, (params, _) in _calibrations.get(ticker, {}).items()}
+
+
+def clear_calibrations(ticker=None):
+    """Saklanan kalibrasyonları (verilirse yalnızca bir sembolünkileri) siler."""
+    with _calibrations_lock:
+        if ticker is None:
+            _calibrations.clear()
+        else:
+            _calibrations.pop(ticker, None)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from py_vollib.black_scholes.greeks import analytical
+
+from analysis import (black_scholes_price, calculate_greeks, calculate_greeks_vectorized,
+                      implied_volatility_vectorized)
+
+
+def test_vectorized_greeks_match_py_vollib():
+    rng = np.random.default_rng(0)
+    n = 200
+    is_call = rng.random(n) < 0.5
+    S = rng.uniform(50, 150, n)
+    K = rng.uniform(40, 160, n)
+    T = rng.uniform(0.01, 2.0, n)
+    sigma = rng.uniform(0.05, 1.0, n)
+    r = 0.03
+
+    vectorized = calculate_greeks_vectorized(is_call, S, K, T, r, sigma, higher_order=True)
+    for i in range(n):
+        expected = calculate_greeks('call' if is_call[i] else 'put', S[i], K[i], T[i], r, sigma[i])
+        expected['rho'] = analytical.rho('c' if is_call[i] else 'p', S[i], K[i], T[i], r, sigma[i])
+        for greek, value in expected.items():
+            assert vectorized[greek][i] == pytest.approx(value, rel=1e-9, abs=1e-12), greek
+
+
+def test_vectorized_greeks_are_nan_for_invalid_inputs():
+    greeks = calculate_greeks_vectorized([True, False], 100.0, [100.0, 100.0], [0.0, 0.5], 0.01, [0.3, 0.0])
+    assert all(np.isnan(values).all() for values in greeks.values())
+
+
+def _round_trip(is_call, S, K, T, r, sigma):
+    price = black_scholes_price(is_call, S, K, T, r, sigma)
+    return implied_volatility_vectorized(is_call, price, S, K, T, r)
+
+
+def test_implied_volatility_round_trips_puts():
+    rng = np.random.default_rng(1)
+    K = rng.uniform(60, 160, 500)
+    T = rng.uniform(0.02, 2.0, 500)
+    sigma = rng.uniform(0.05, 1.5, 500)
+    # Volatility is only identifiable while the option has time value above float precision
+    time_value = black_scholes_price(K > 100, 100.0, K, T, 0.03, sigma)
+    keep = time_value > 1e-4
+    solved = _round_trip(np.zeros(keep.sum(), dtype=bool), 100.0, K[keep], T[keep], 0.03, sigma[keep])
+    np.testing.assert_allclose(solved, sigma[keep], atol=1e-6)
+
+
+def test_implied_volatility_round_trips_deep_in_the_money():
+    # Deep in-the-money calls (low strikes) and puts (high strikes): the price is mostly intrinsic value
+    K = np.array([40.0, 50.0, 60.0, 70.0, 140.0, 160.0, 180.0, 200.0])
+    is_call = K < 100
+    T = np.array([0.25, 0.5, 1.0, 2.0, 0.25, 0.5, 1.0, 2.0])
+    sigma = np.array([0.6, 0.5, 0.35, 0.2, 0.6, 0.5, 0.35, 0.2])
+    solved = _round_trip(is_call, 100.0, K, T, 0.05, sigma)
+    np.testing.assert_allclose(solved, sigma, atol=1e-6)
+
+
+def test_implied_volatility_rejects_prices_below_intrinsic():
+    solved = implied_volatility_vectorized([True, False], [9.0, 9.0], 100.0, [90.0, 110.0], 0.5, 0.0)
+    assert np.isnan(solved).all()
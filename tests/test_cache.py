@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+
+import cache
+
+CHAIN = pd.DataFrame({"strike": [90.0, 100.0, 110.0], "impliedVolatility": [0.3, 0.25, 0.28]})
+
+
+def _cache_bytes(cache_dir):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(os.path.join(cache_dir, "chains")) for name in names)
+
+
+def test_snapshot_writes_do_not_rescan_the_cache_each_time(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path)
+    scans = []
+    walk = os.walk
+    monkeypatch.setattr(cache.os, "walk", lambda *args, **kwargs: scans.append(args) or walk(*args, **kwargs))
+    monkeypatch.setattr(cache, "RESCAN_WRITES", 100)
+
+    for i in range(300):
+        cache.write_chain_snapshot(f"T{i % 30}", f"2030-01-{i % 10 + 1:02d}", CHAIN, cache_dir=cache_dir)
+
+    # One initial scan plus one every RESCAN_WRITES writes, instead of one per write
+    assert len(scans) <= 4
+    cache.clear_cache(cache_dir)
+
+
+def test_running_total_still_evicts_over_the_limit(tmp_path):
+    cache_dir = str(tmp_path)
+    cache.write_chain_snapshot("SIZE", "2030-01-01", CHAIN, cache_dir=cache_dir, max_bytes=None)
+    snapshot_bytes = _cache_bytes(cache_dir)
+    limit = snapshot_bytes * 10
+
+    for i in range(50):
+        cache.write_chain_snapshot(f"T{i}", "2030-01-01", CHAIN, cache_dir=cache_dir, max_bytes=limit)
+        assert _cache_bytes(cache_dir) <= limit
+
+    # Rewriting an existing key replaces its snapshot, so the total does not grow
+    for _ in range(20):
+        cache.write_chain_snapshot("T49", "2030-01-01", CHAIN, cache_dir=cache_dir, max_bytes=limit)
+    assert cache.read_chain_snapshot("T49", "2030-01-01", cache_dir=cache_dir) is not None
+    assert _cache_bytes(cache_dir) <= limit
+    cache.clear_cache(cache_dir)
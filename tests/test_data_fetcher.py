@@ -0,0 +1,274 @@
+import functools
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cache
+import data_fetcher
+import providers
+
+EXPIRATIONS = ("2030-01-18", "2030-02-15", "2030-03-15", "2030-04-19", "2030-05-17", "2030-06-21")
+
+
+class FakeTicker:
+    """Network-free stand-in for yf.Ticker that sleeps `latency` seconds on every option_chain call."""
+
+    latency = 0.0
+    calls = []
+    lock = threading.Lock()
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.options = EXPIRATIONS
+
+    def history(self, period):
+        return pd.DataFrame({"Close": [100.0]})
+
+    def option_chain(self, expiration):
+        with self.lock:
+            self.calls.append(expiration)
+        time.sleep(self.latency)
+        chain = pd.DataFrame({"strike": [95.0, 100.0, 105.0], "lastPrice": [6.0, 3.0, 1.0],
+                              "bid": [5.9, 2.9, 0.9], "ask": [6.1, 3.1, 1.1], "volume": [10, 20, 30],
+                              "openInterest": [100, 200, 300], "impliedVolatility": [0.3, 0.25, 0.28]})
+        return type("Chain", (), {"calls": chain, "puts": chain.copy()})()
+
+
+@pytest.fixture
+def fake_ticker(monkeypatch):
+    monkeypatch.setattr(providers.yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(FakeTicker, "calls", [])
+    return FakeTicker
+
+
+def test_get_options_data_fetches_each_expiration_once_in_parallel(fake_ticker, monkeypatch):
+    monkeypatch.setattr(fake_ticker, "latency", 0.3)
+    started = time.perf_counter()
+    options_data, recent_price = data_fetcher.get_options_data(
+        "FAKE", max_workers=len(EXPIRATIONS), use_cache=False, provider=providers.YFinanceProvider())
+    elapsed = time.perf_counter() - started
+
+    assert sorted(fake_ticker.calls) == sorted(EXPIRATIONS)
+    assert recent_price == 100.0
+    assert len(options_data) == len(EXPIRATIONS) * 6
+    assert list(options_data["expiration"].astype(str).unique()) == list(EXPIRATIONS)
+    # Serial fetching would take len(EXPIRATIONS) * latency = 1.8 s
+    assert elapsed < 1.0
+
+
+def test_iter_options_data_timeout_is_a_single_deadline(fake_ticker, monkeypatch):
+    # With one worker the expirations finish at 0.4 s, 0.8 s, 1.2 s, ...; only the first beats a 0.6 s
+    # deadline. Waiting `timeout` per expiration in turn would accept all of them.
+    monkeypatch.setattr(fake_ticker, "latency", 0.4)
+    started = time.perf_counter()
+    fetched = [date for date, _, _ in data_fetcher.iter_options_data(
+        "FAKE", max_workers=1, timeout=0.6, use_cache=False, provider=providers.YFinanceProvider())]
+    elapsed = time.perf_counter() - started
+
+    assert fetched == [EXPIRATIONS[0]]
+    assert elapsed < 1.0
+
+
+def test_single_flight_runs_a_burst_of_identical_calls_once():
+    flight = data_fetcher.SingleFlight()
+    executions = []
+    barrier = threading.Barrier(16)
+    results = []
+
+    def fetch():
+        executions.append(1)
+        time.sleep(0.2)
+        return "chain"
+
+    def worker():
+        barrier.wait()
+        results.append(flight.do(("FAKE", "2030-01-18"), fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert results == ["chain"] * 16
+    assert flight.stats == {"calls": 16, "executed": 1, "coalesced": 15}
+
+
+def test_single_flight_shares_errors_and_forgets_finished_keys():
+    flight = data_fetcher.SingleFlight()
+
+    def fail():
+        raise ValueError("upstream")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.stats["executed"] == 2
+
+
+def test_concurrent_sessions_share_chain_downloads(fake_ticker, monkeypatch):
+    monkeypatch.setattr(fake_ticker, "latency", 0.3)
+    provider = providers.YFinanceProvider()
+    barrier = threading.Barrier(8)
+    sizes = []
+
+    def session():
+        barrier.wait()
+        options_data, _ = data_fetcher.get_options_data("FAKE", use_cache=False, provider=provider)
+        sizes.append(len(options_data))
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sizes == [len(EXPIRATIONS) * 6] * 8
+    assert sorted(fake_ticker.calls) == sorted(EXPIRATIONS)
+
+
+class FakeProvider(providers.MarketDataProvider):
+    """In-memory provider that records every call and raises for the tickers or (ticker, expiration) in `failing`."""
+
+    name = "fake"
+
+    def __init__(self, failing=(), expirations=EXPIRATIONS[:3]):
+        self.failing = set(failing)
+        self.expirations = expirations
+        self.calls = []
+        self.lock = threading.Lock()
+        dates = pd.bdate_range("2023-12-01", "2024-06-28", name="Date")
+        close = 100 + np.arange(len(dates), dtype=float)
+        self.history = pd.DataFrame({"Open": close, "High": close * 1.02, "Low": close * 0.99, "Close": close,
+                                     "Volume": 1000.0}, index=dates)
+
+    def _record(self, *call):
+        with self.lock:
+            self.calls.append((time.monotonic(), *call))
+        if call[1] in self.failing or tuple(call[1:3]) in self.failing:
+            raise RuntimeError(f"{call[1]} unavailable")
+
+    def get_expirations(self, ticker):
+        self._record("expirations", ticker)
+        return self.expirations
+
+    def get_recent_price(self, ticker):
+        self._record("price", ticker)
+        return 100.0
+
+    def get_option_chain(self, ticker, expiration):
+        self._record("chain", ticker, expiration)
+        chain = pd.DataFrame({"strike": [95.0, 100.0, 105.0], "lastPrice": [6.0, 3.0, 1.0],
+                              "bid": [5.9, 2.9, 0.9], "ask": [6.1, 3.1, 1.1], "volume": [10, 20, 30],
+                              "openInterest": [100, 200, 300], "impliedVolatility": [0.3, 0.25, 0.28]})
+        return chain, chain.copy()
+
+    def get_history(self, ticker, start_date, end_date):
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        self._record("history", ticker, start, end)
+        return self.history[(self.history.index >= start) & (self.history.index < end)]
+
+
+def test_batch_paces_every_provider_call_through_the_token_bucket():
+    provider = FakeProvider()
+    started = time.monotonic()
+    _, _, timings = data_fetcher.get_options_data_batch(
+        ["AAA", "BBB"], max_workers=8, rate_limit=20, burst=1, use_cache=False, provider=provider)
+
+    # Per ticker: expirations + recent price + one chain per expiration
+    assert len(provider.calls) == 2 * (2 + 3)
+    assert timings["requests"].to_dict() == {"AAA": 5, "BBB": 5}
+    # With a single-token bucket at 20/s, ten calls need at least nine 50 ms refills
+    call_times = sorted(t for t, *_ in provider.calls)
+    assert call_times[-1] - started >= 0.4
+    assert all(b - a >= 0.04 for a, b in zip(call_times, call_times[1:]))
+
+
+def test_batch_isolates_failing_tickers_and_expirations():
+    provider = FakeProvider(failing={"BAD", ("CCC", EXPIRATIONS[1])})
+    results, recent_prices, timings = data_fetcher.get_options_data_batch(
+        ["AAA", "BAD", "CCC"], retries=1, backoff=0.0, rate_limit=1000, as_frame=False, use_cache=False,
+        provider=provider)
+
+    assert sorted(results) == ["AAA", "CCC"]
+    assert list(results["AAA"]["expiration"].astype(str).unique()) == list(EXPIRATIONS[:3])
+    assert list(results["CCC"]["expiration"].astype(str).unique()) == [EXPIRATIONS[0], EXPIRATIONS[2]]
+    assert sorted(recent_prices) == ["AAA", "CCC"]
+    assert "BAD unavailable" in timings.loc["BAD", "error"]
+    assert timings.loc["CCC", "error"].startswith(EXPIRATIONS[1])
+    assert pd.isna(timings.loc["AAA", "error"])
+    # The failed expiration is retried once, so CCC makes one extra provider call
+    assert timings["requests"].to_dict() == {"AAA": 5, "BAD": 1, "CCC": 6}
+
+
+def test_batch_reports_progress_and_per_ticker_timings():
+    provider = FakeProvider()
+    progress = []
+    results, _, timings = data_fetcher.get_options_data_batch(
+        ["AAA", "BBB", "AAA"], rate_limit=1000, use_cache=False, provider=provider,
+        progress_callback=lambda done, total, ticker: progress.append((done, total, ticker)))
+
+    # One step per meta lookup, then the total grows by one step per expiration
+    assert [done for done, _, _ in progress] == list(range(1, 2 + 6 + 1))
+    assert [total for _, total, _ in progress[:2]] == [2, 2]
+    assert {total for _, total, _ in progress[2:]} == {8}
+    assert sorted(ticker for _, _, ticker in progress) == ["AAA"] * 4 + ["BBB"] * 4
+
+    assert sorted(timings.index) == ["AAA", "BBB"]
+    assert list(timings["request_seconds"]) == sorted(timings["request_seconds"], reverse=True)
+    assert (timings["wall_seconds"] > 0).all()
+    assert timings["rows"].to_dict() == results.groupby("ticker", observed=True).size().to_dict()
+
+
+@pytest.fixture
+def history_store(tmp_path, monkeypatch):
+    for name in ("read_history", "write_history"):
+        monkeypatch.setattr(cache, name, functools.partial(getattr(cache, name), cache_dir=str(tmp_path)))
+    return tmp_path
+
+
+def _history_calls(provider):
+    return [call[3:] for call in provider.calls if call[1] == "history"]
+
+
+def test_historical_iv_fetches_only_missing_head_and_tail(history_store):
+    provider = FakeProvider()
+    first = data_fetcher.get_historical_iv("AAA", "2024-03-01", "2024-04-01", provider=provider)
+    assert _history_calls(provider) == [(pd.Timestamp("2024-03-01"), pd.Timestamp("2024-04-01"))]
+
+    provider.calls.clear()
+    merged = data_fetcher.get_historical_iv("AAA", "2024-01-01", "2024-05-01", cache_ttl=0, provider=provider)
+    # The head ends at the first stored day; the tail re-fetches the last stored day
+    assert _history_calls(provider) == [(pd.Timestamp("2024-01-01"), first.index[0]),
+                                        (first.index[-1], pd.Timestamp("2024-05-01"))]
+
+    expected = provider.history[(provider.history.index >= "2024-01-01") & (provider.history.index < "2024-05-01")]
+    pd.testing.assert_frame_equal(merged.drop(columns="IV"), expected, check_freq=False)
+    assert merged.index.is_unique and merged.index.is_monotonic_increasing
+    expected_iv = (expected["High"] - expected["Low"]) / expected["Low"] * 100
+    np.testing.assert_allclose(merged["IV"], expected_iv)
+
+    stored, _, covered_start = cache.read_history("AAA", cache_dir=str(history_store))
+    assert covered_start == pd.Timestamp("2024-01-01")
+    assert len(stored) == len(expected)
+
+
+def test_historical_iv_serves_a_fresh_covered_range_from_the_store(history_store):
+    provider = FakeProvider()
+    # 2024-03-02 is a Saturday, so the stored data starts on the following Monday
+    data_fetcher.get_historical_iv("AAA", "2024-03-02", "2024-04-01", provider=provider)
+    provider.calls.clear()
+
+    again = data_fetcher.get_historical_iv("AAA", "2024-03-02", "2024-03-20", provider=provider)
+    assert provider.calls == []
+    assert again.index[0] == pd.Timestamp("2024-03-04")
+    assert again.index[-1] == pd.Timestamp("2024-03-19")
+
+    refreshed = data_fetcher.get_historical_iv("AAA", "2024-03-02", "2024-03-20", force_refresh=True,
+                                               provider=provider)
+    assert _history_calls(provider) == [(pd.Timestamp("2024-03-02"), pd.Timestamp("2024-03-20"))]
+    pd.testing.assert_frame_equal(refreshed, again, check_freq=False)
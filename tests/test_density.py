@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from density import risk_neutral_density
+from surface import MAX_RMSE, SVISurface
+
+SPOT = 100.0
+
+
+def _flat_surface(rmse, vol=0.3, T=(30 / 365.25, 90 / 365.25, 180 / 365.25)):
+    T = np.asarray(T)
+    # b ~ 0 leaves a flat smile with total variance a = vol^2 * T
+    params = np.column_stack([vol * vol * T, np.full(len(T), 1e-6), np.zeros(len(T)), np.zeros(len(T)),
+                              np.full(len(T), 0.1)])
+    expirations = [f"2030-0{i + 1}-15" for i in range(len(T))]
+    return SVISurface(expirations, T, params, SPOT, 0.01, np.asarray(rmse, dtype=np.float64), (50.0, 150.0))
+
+
+def test_flat_surface_density_is_lognormal():
+    rnd = risk_neutral_density(None, SPOT, surface=_flat_surface([1e-3, 1e-3, 1e-3]))
+    summary = rnd.summary
+    np.testing.assert_allclose(summary["mass"], 1.0, atol=1e-3)
+    np.testing.assert_allclose(summary["mean"], summary["forward"], rtol=1e-3)
+    expected_std = summary["forward"] * np.sqrt(np.exp(0.09 * rnd.T) - 1)
+    np.testing.assert_allclose(summary["std"], expected_std, rtol=1e-2)
+    assert rnd.dropped == {}
+
+
+def test_unreliable_slices_are_dropped_and_reported():
+    surface = _flat_surface([1e-3, 2 * MAX_RMSE, 1e-3])
+    rnd = risk_neutral_density(None, SPOT, surface=surface)
+    assert rnd.expirations == [surface.expirations[0], surface.expirations[2]]
+    assert list(rnd.summary.index) == rnd.expirations
+    assert rnd.density.shape[0] == 2 and not np.isnan(rnd.density).any()
+    assert rnd.dropped == {surface.expirations[1]: pytest.approx(2 * MAX_RMSE)}
+
+
+def test_no_reliable_slice_gives_no_density():
+    assert risk_neutral_density(None, SPOT, surface=_flat_surface([1.0, 1.0, 1.0])) is None
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+import ml_models
+
+
+def _history(n, seed=0, with_zero=True):
+    rng = np.random.default_rng(seed)
+    iv = 0.25 * np.exp(np.cumsum(rng.normal(0, 0.03, n)))
+    if with_zero:
+        iv[n // 3] = 0.0
+    return pd.DataFrame({"IV": iv}, index=pd.bdate_range("2025-01-01", periods=n))
+
+
+def _reference_dataset(df, window_size):
+    # Vektörleştirme öncesindeki satır satır döngü
+    df = ml_models.add_technical_features(df.sort_index().ffill().bfill())
+    features, targets, dates = [], [], []
+    for i in range(len(df) - window_size):
+        window_features = df['IV'].iloc[i:i + window_size].values
+        extra_features = df.iloc[i + window_size - 1][ml_models.get_feature_columns()].values
+        features.append(np.concatenate([window_features, extra_features]))
+        prev_iv = max(df['IV'].iloc[i + window_size - 1], 1e-6)
+        curr_iv = max(df['IV'].iloc[i + window_size], 1e-6)
+        targets.append(np.log(curr_iv) - np.log(prev_iv))
+        dates.append(df.index[i + window_size])
+    return np.array(features, dtype=np.float64), np.array(targets), dates
+
+
+def test_prepare_time_series_data_matches_loop_reference():
+    df = _history(120)
+    for window_size in (5, 20, 30):
+        X, y, dates = ml_models.prepare_time_series_data(df, window_size=window_size)
+        X_ref, y_ref, dates_ref = _reference_dataset(df, window_size)
+        np.testing.assert_array_equal(X, X_ref)
+        np.testing.assert_array_equal(y, y_ref)
+        assert dates == dates_ref
+
+
+def test_prepare_time_series_data_rejects_short_history():
+    assert ml_models.prepare_time_series_data(_history(21)) == (None, None, None)
+
+
+class _LinearModel:
+    def __init__(self, n_features, seed=1):
+        self.coef = np.random.default_rng(seed).normal(0, 0.1, n_features)
+
+    def predict(self, X):
+        # Uzun ufuklarda patlamaması için log(IV) adımı ±%2 ile sınırlanır
+        return 0.02 * np.tanh(X @ self.coef)
+
+
+def _reference_forecast(model, scaler, history, days_to_predict, window_size):
+    # Halka tamponlu sürüm öncesindeki, her adımda birleşik tabloyu yeniden okuyan tahmin döngüsü
+    df = ml_models.add_technical_features(history.sort_index())
+    combined = list(df['IV'])
+    current_features = np.asarray(combined[-window_size:], dtype=np.float64)
+    current_features = np.concatenate([np.full(window_size - len(current_features), current_features[0]),
+                                       current_features])
+    last = df.iloc[-1]
+    last_iv = max(last['IV'], 1e-6)
+    _, future_dates = ml_models.create_empty_prediction_df(df.index[-1], days_to_predict)
+    predictions = []
+    ema5, ema10 = last['EMA5'], last['EMA10']
+    for i in range(days_to_predict):
+        dates = ml_models.get_cyclic_date_features(future_dates[i])
+        if i == 0:
+            extra = [*[last[c] for c in ml_models.get_feature_columns()[:9]], *dates,
+                     *[last[c] for c in ml_models.get_feature_columns()[13:]]]
+        else:
+            series = pd.Series(combined)
+            volatility = series.iloc[-10:].std() if len(series) >= 10 else last['Volatility']
+            roc5 = (predictions[-1] - predictions[-5]) / predictions[-5] * 100 \
+                if len(predictions) >= 5 and predictions[-5] != 0 else 0
+            ema5 = ema5 * 0.8 + predictions[-1] * 0.2
+            ema10 = ema10 * 0.9 + predictions[-1] * 0.1
+            iv_diff1 = predictions[-1] - (predictions[-2] if len(predictions) > 1 else current_features[-1])
+            pool = predictions[-5:] if len(predictions) >= 5 else predictions + list(current_features)
+            extra = [series.iloc[-5:].mean(), series.iloc[-10:].mean(), series.iloc[-20:].mean(), volatility,
+                     roc5, 0, ema5, ema10, ema5 - ema10, *dates, iv_diff1, 0, max(pool), min(pool), 0]
+        features = np.concatenate([current_features, extra]).reshape(1, -1)
+        next_iv = max(np.exp(np.log(last_iv) + model.predict(scaler.transform(features))[0]), 0)
+        last_iv = next_iv
+        predictions.append(next_iv)
+        combined.append(next_iv)
+        current_features = np.roll(current_features, -1)
+        current_features[-1] = next_iv
+    return np.array(predictions)
+
+
+def _fitted_scaler(window_size):
+    X, _, _ = ml_models.prepare_time_series_data(_history(200, seed=3, with_zero=False), window_size=window_size)
+    return StandardScaler().fit(X)
+
+
+def test_predict_future_iv_matches_loop_reference():
+    window_size = 20
+    scaler = _fitted_scaler(window_size)
+    model = _LinearModel(scaler.n_features_in_)
+    history = _history(80, seed=2, with_zero=False)
+    for days in (5, 30, 250):
+        forecast = ml_models.predict_future_iv(model, scaler, history, days_to_predict=days, window_size=window_size)
+        reference = _reference_forecast(model, scaler, history, days, window_size)
+        np.testing.assert_allclose(forecast['Predicted_IV'].to_numpy(), reference, rtol=1e-9)
+
+
+def test_predict_future_iv_pads_history_shorter_than_window():
+    window_size = 30
+    scaler = _fitted_scaler(window_size)
+    model = _LinearModel(scaler.n_features_in_)
+    history = _history(24, seed=4, with_zero=False)
+    forecast = ml_models.predict_future_iv(model, scaler, history, days_to_predict=30, window_size=window_size)
+    reference = _reference_forecast(model, scaler, history, 30, window_size)
+    assert np.isfinite(reference).all()
+    np.testing.assert_allclose(forecast['Predicted_IV'].to_numpy(), reference, rtol=1e-9)
+
+
+def test_rolling_state_handles_history_shorter_than_buffer():
+    rng = np.random.default_rng(5)
+    for n in (1, 3, 8, 15, 20, 40):
+        series = list(rng.uniform(0.1, 0.5, n))
+        state = ml_models._RollingIVState(np.array(series))
+        for value in rng.uniform(0.1, 0.5, 30):
+            state.push(value)
+            series.append(value)
+            tail = pd.Series(series)
+            for window in (5, 10, 20):
+                np.testing.assert_allclose(state.mean(window), tail.iloc[-window:].mean(), rtol=1e-12)
+            if state.count >= 10:
+                np.testing.assert_allclose(state.std10(), tail.iloc[-10:].std(), rtol=1e-9)
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+import data_fetcher
+import providers
+
+
+def test_market_data_provider_requires_every_method():
+    class ChainsOnly(providers.MarketDataProvider):
+        def get_option_chain(self, ticker, expiration):
+            return pd.DataFrame(), pd.DataFrame()
+
+    with pytest.raises(TypeError):
+        ChainsOnly()
+
+
+def test_replay_provider_without_recorded_history_gives_empty_iv(tmp_path):
+    provider = providers.ReplayProvider(str(tmp_path))
+    history = provider.get_history("MISSING", "2024-01-01", "2024-06-01")
+    assert history.empty
+    assert list(history.columns) == providers.HISTORY_COLUMNS
+
+    historical_iv = data_fetcher.get_historical_iv("MISSING", "2024-01-01", "2024-06-01", provider=provider)
+    assert historical_iv.empty
+    assert "IV" in historical_iv.columns
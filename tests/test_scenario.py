@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+import scenario
+from analysis import black_scholes_price, calculate_greeks_vectorized
+from chain_context import ChainContext
+
+NOW = pd.Timestamp("2026-01-05")
+SPOT = 100.0
+RATE = 0.01
+
+
+def _chain(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    # The 3- and 6-day expiries expire inside the default 10-day horizon
+    days = rng.choice([3, 6, 20, 45, 90, 180], n)
+    return pd.DataFrame({
+        "strike": rng.uniform(70, 130, n).round(1),
+        "type": rng.choice(["call", "put"], n),
+        "impliedVolatility": rng.uniform(0.05, 0.8, n),
+        "openInterest": rng.integers(0, 500, n).astype(float),
+        "expiration": [(NOW + pd.Timedelta(days=int(d))).strftime("%Y-%m-%d") for d in days],
+    })
+
+
+def _grid(options_data, **kwargs):
+    context = ChainContext(options_data, SPOT, RATE, now=NOW)
+    return scenario.scenario_grid(options_data, SPOT, risk_free_rate=RATE, context=context, **kwargs), context
+
+
+def _direct(options_data, context, spot_shift, vol_shift, day_step):
+    is_call = context.is_call
+    K = options_data["strike"].to_numpy(dtype=np.float64)
+    weights = options_data["openInterest"].to_numpy(dtype=np.float64) * 100
+    S = SPOT * (1 + spot_shift)
+    remaining = context.time_to_expiry - day_step / 365.25
+    sigma = np.maximum(options_data["impliedVolatility"].to_numpy() + vol_shift / 100, scenario.MIN_VOLATILITY)
+    alive = remaining > 0
+    value = black_scholes_price(is_call[alive], S, K[alive], remaining[alive], RATE, sigma[alive]) @ weights[alive]
+    greeks = calculate_greeks_vectorized(is_call[alive], S, K[alive], remaining[alive], RATE, sigma[alive])
+    intrinsic = np.where(is_call, np.maximum(S - K, 0), np.maximum(K - S, 0))[~alive]
+    exercised = np.where(is_call, S > K, -(S < K).astype(np.float64))[~alive]
+    return (value + intrinsic @ weights[~alive], greeks["delta"] @ weights[alive] + exercised @ weights[~alive],
+            greeks["gamma"] @ weights[alive], greeks["vega"] @ weights[alive])
+
+
+def test_scenario_grid_matches_direct_black_scholes_repricing():
+    options_data = _chain()
+    result, context = _grid(options_data)
+    base_value = black_scholes_price(context.is_call, SPOT, options_data["strike"].to_numpy(dtype=np.float64),
+                                     context.time_to_expiry, RATE, options_data["impliedVolatility"].to_numpy())
+    assert np.isclose(result.base_value, base_value @ (options_data["openInterest"].to_numpy() * 100))
+
+    for i, j, k in [(0, 0, 0), (49, 19, 9), (10, 3, 4), (25, 10, 7), (40, 0, 9), (5, 19, 2)]:
+        value, delta, gamma, vega = _direct(options_data, context, result.spot_shifts[i], result.vol_shifts[j],
+                                            result.day_steps[k])
+        np.testing.assert_allclose(result.pnl[i, j, k], value - result.base_value, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(result.delta[i, j, k], delta, rtol=1e-9)
+        np.testing.assert_allclose(result.gamma[i, j, k], gamma, rtol=1e-9)
+        np.testing.assert_allclose(result.vega[i, j, k], vega, rtol=1e-9)
+
+
+def test_scenario_grid_chunking_does_not_change_results():
+    options_data = _chain(n=60, seed=1)
+    result, _ = _grid(options_data)
+    # Smaller than one scenario row, so both the scenario and the spot axes are split into single cells
+    chunked, _ = _grid(options_data, max_cells=7)
+    for surface in ("pnl", "delta", "gamma", "vega"):
+        np.testing.assert_allclose(getattr(chunked, surface), getattr(result, surface), rtol=1e-12, atol=1e-6)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import surface
+from chain_context import ChainContext
+
+NOW = pd.Timestamp("2026-01-05")
+SPOT = 100.0
+RATE = 0.01
+
+
+def _chain(days, strikes, iv_of):
+    frames = []
+    for day in days:
+        T = day / 365.25
+        k = np.log(strikes / (SPOT * np.exp(RATE * T)))
+        for option_type in ("call", "put"):
+            frames.append(pd.DataFrame({"strike": strikes, "type": option_type, "impliedVolatility": iv_of(k, T),
+                                        "expiration": (NOW + pd.Timedelta(days=day)).strftime("%Y-%m-%d")}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _fit(options_data, ticker=None):
+    context = ChainContext(options_data, SPOT, RATE, now=NOW)
+    return surface.fit_svi_surface(options_data, SPOT, ticker, RATE, context=context)
+
+
+def _svi_iv(k, T):
+    w = surface.svi_total_variance(k, 0.04 * T, 0.1 * np.sqrt(T), -0.4, 0.0, 0.1)
+    return np.sqrt(w / T)
+
+
+def _quadratic_iv(k, T):
+    return 0.25 - 0.3 * k + 1.5 * k * k
+
+
+@pytest.fixture(autouse=True)
+def _clear_calibrations():
+    surface.clear_calibrations()
+    yield
+    surface.clear_calibrations()
+
+
+def test_short_dated_slice_does_not_collapse():
+    # A 6-day slice has total variance ~1e-3; a start point not scaled to it used to collapse the slice to
+    # zero variance (IV 0 at the money)
+    days = [6, 13, 27, 55, 111, 222, 444]
+    fitted = _fit(_chain(days, np.linspace(50, 150, 120), _svi_iv))
+    assert fitted.rmse.max() < 1e-4
+    front_T = fitted.T[0]
+    strikes = np.array([90.0, 100.0, 110.0])
+    expected = _svi_iv(np.log(strikes / (SPOT * np.exp(RATE * front_T))), front_T)
+    np.testing.assert_allclose(fitted.iv(strikes, front_T), expected, atol=1e-4)
+
+
+def test_narrow_strike_window_front_slice_fits():
+    fitted = _fit(_chain([9, 16, 30, 60, 120], np.arange(90.0, 110.5), _quadratic_iv))
+    assert fitted.rmse.max() < 1e-3
+    assert fitted.iv(SPOT, fitted.T[0]) == pytest.approx(0.25, abs=2e-3)
+
+
+def test_warm_refit_of_unchanged_chain_is_much_cheaper():
+    options_data = _chain([9, 16, 30, 60, 120, 240], np.arange(90.0, 110.5), _quadratic_iv)
+    cold = _fit(options_data, "TEST")
+    warm = _fit(options_data, "TEST")
+    assert warm.rmse.max() <= cold.rmse.max() * 1.01
+    assert warm.iterations.sum() * 4 <= cold.iterations.sum()
+
+
+def test_unreliable_slices_are_not_cached_and_bad_warm_starts_recover():
+    options_data = _chain([6, 13, 27, 55], np.linspace(60, 140, 60), _svi_iv)
+    expirations = sorted(options_data["expiration"].unique())
+    # A cached, collapsed calibration (b ~ 0, a < 0) must not pin the next fit to the broken slice
+    collapsed = np.array([-3e-4, 1e-6, -0.35, 3e-4, 0.13])
+    surface._calibrations["TEST"] = {expiration: (collapsed, 1e-4) for expiration in expirations}
+    fitted = _fit(options_data, "TEST")
+    assert fitted.rmse.max() < 1e-4
+    assert set(surface.get_cached_calibration("TEST")) == set(expirations)
+
+    # A smile SVI cannot represent leaves every slice above MAX_RMSE; none of them may seed the next fit
+    unfittable = _chain([6, 13, 27, 55], np.linspace(60, 140, 60), lambda k, T: 0.3 + 0.2 * np.sin(40 * k))
+    fitted = _fit(unfittable, "UNFITTABLE")
+    assert (fitted.rmse > surface.MAX_RMSE).all()
+    assert surface.get_cached_calibration("UNFITTABLE") == {}
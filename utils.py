@@ -1,3 +1,5 @@
+import pandas as pd
+
 def calculate_highest_iv_calls(calls_data):
     """Call opsiyonları için en yüksek implied volatiliteyi hesaplar."""
     if calls_data is None or len(calls_data) == 0:
@@ -10,6 +12,18 @@ def calculate_lowest_iv_puts(puts_data):
         return 0
     return puts_data['implied_volatility'].min()
 
+def memory_usage_report(data):
+    """Bir DataFrame'in sütun bazında bellek kullanımını (derin ölçüm) bayt olarak raporlar."""
+    if data is None:
+        return None
+    usage = data.memory_usage(deep=True)
+    report = pd.DataFrame({
+        "dtype": [str(data.index.dtype)] + [str(dtype) for dtype in data.dtypes],
+        "bytes": usage.values,
+    }, index=usage.index)
+    report.loc["TOPLAM"] = ["", usage.sum()]
+    return report
+
 def filter_options_data(options_data, condition):
     """Belirtilen koşula göre opsiyon verilerini filtreler."""
     if options_data is None:
@@ -1,41 +1,48 @@
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from chain_context import ChainContext
+from metrics import compute_chain_metrics
 
-def plot_volatility_smile(options_data, recent_price, ticker):
+
+def _add_expiration_traces(fig, context, column):
+    """Her vade için call ve put noktalarını, bağlamın hazır vade dilimlerinden çizdirir."""
+    color_map_2d = px.colors.qualitative.Prism
+    for position, (exp, color) in enumerate(zip(context.expirations, color_map_2d)):
+        fig.add_trace(go.Scatter(x=context.values("strike", "call", position),
+                                 y=context.values(column, "call", position), mode='markers',
+                                 marker=dict(color=color), name=exp), row=1, col=1)
+        fig.add_trace(go.Scatter(x=context.values("strike", "put", position),
+                                 y=context.values(column, "put", position), mode='markers',
+                                 marker=dict(color=color), name=exp, showlegend=False), row=1, col=2)
+
+
+def plot_volatility_smile(options_data, recent_price, ticker, context=None, metrics=None):
     """Volatilite gülümsemesini çağırır ve put opsiyonları için çizdirir."""
     if options_data is None:
         return None, None, None, None, None
         
-    calls_data = options_data[options_data["type"] == "call"]
-    puts_data = options_data[options_data["type"] == "put"]
-
-    expirations = options_data['expiration'].unique()
-    color_map_2d = px.colors.qualitative.Prism
+    context = ChainContext.ensure(options_data, context)
+    if metrics is None:
+        metrics = compute_chain_metrics(options_data, context)
 
     fig = make_subplots(rows=1, cols=2, subplot_titles=["Call Opsiyonları", "Put Opsiyonları"], shared_yaxes=True)
 
-    for exp, color in zip(expirations, color_map_2d):
-        exp_calls = calls_data[calls_data["expiration"] == exp]
-        exp_puts = puts_data[puts_data["expiration"] == exp]
-
-        fig.add_trace(go.Scatter(x=exp_calls["strike"], y=exp_calls["implied_volatility"], mode='markers',
-                                 marker=dict(color=color), name=exp), row=1, col=1)
-        fig.add_trace(go.Scatter(x=exp_puts["strike"], y=exp_puts["implied_volatility"], mode='markers',
-                                 marker=dict(color=color), name=exp, showlegend=False), row=1, col=2)
+    _add_expiration_traces(fig, context, "implied_volatility")
 
-    avg_iv_by_strike_calls = calls_data.groupby("strike")["implied_volatility"].mean()
-    avg_iv_by_strike_puts = puts_data.groupby("strike")["implied_volatility"].mean()
+    avg_iv_by_strike_calls = metrics.calls.iv_by_strike
+    avg_iv_by_strike_puts = metrics.puts.iv_by_strike
 
     fig.add_trace(go.Scatter(x=avg_iv_by_strike_calls.index, y=avg_iv_by_strike_calls.values, mode='lines',
                              line=dict(color='black', dash='dash'), name='Ortalama IV (Call)'), row=1, col=1)
     fig.add_trace(go.Scatter(x=avg_iv_by_strike_puts.index, y=avg_iv_by_strike_puts.values, mode='lines',
                              line=dict(color='black', dash='dash'), name='Ortalama IV (Put)', showlegend=False), row=1, col=2)
 
-    overall_avg_iv_calls = calls_data["implied_volatility"].mean()
-    overall_avg_iv_puts = puts_data["implied_volatility"].mean()
+    overall_avg_iv_calls = metrics.calls.mean_iv
+    overall_avg_iv_puts = metrics.puts.mean_iv
 
     fig.add_hline(y=overall_avg_iv_calls, line=dict(color='gray', dash='dash'),
                   annotation_text=f"Genel Ort. IV (Call): {overall_avg_iv_calls:.2f}%",
@@ -51,30 +58,23 @@ def plot_volatility_smile(options_data, recent_price, ticker):
 
     return fig, overall_avg_iv_calls, overall_avg_iv_puts, avg_iv_by_strike_calls, avg_iv_by_strike_puts
 
-def plot_open_interest(options_data, recent_price, ticker):
+def plot_open_interest(options_data, recent_price, ticker, context=None, metrics=None):
     """Açık pozisyonları çağırır ve put opsiyonları için çizdirir."""
     if options_data is None:
         return None, None, None, None
         
-    calls_data = options_data[options_data["type"] == "call"]
-    puts_data = options_data[options_data["type"] == "put"]
-
-    expirations = options_data['expiration'].unique()
-    color_map_2d = px.colors.qualitative.Prism
+    context = ChainContext.ensure(options_data, context)
+    calls_data = context.calls
+    puts_data = context.puts
+    if metrics is None:
+        metrics = compute_chain_metrics(options_data, context)
 
     fig = make_subplots(rows=1, cols=2, subplot_titles=["Call Açık Pozisyon", "Put Açık Pozisyon"], shared_yaxes=True)
 
-    for exp, color in zip(expirations, color_map_2d):
-        exp_calls = calls_data[calls_data["expiration"] == exp]
-        exp_puts = puts_data[puts_data["expiration"] == exp]
-
-        fig.add_trace(go.Scatter(x=exp_calls["strike"], y=exp_calls["openInterest"], mode='markers',
-                                 marker=dict(color=color), name=exp), row=1, col=1)
-        fig.add_trace(go.Scatter(x=exp_puts["strike"], y=exp_puts["openInterest"], mode='markers',
-                                 marker=dict(color=color), name=exp, showlegend=False), row=1, col=2)
+    _add_expiration_traces(fig, context, "openInterest")
 
-    overall_avg_oi_calls = calls_data["openInterest"].mean()
-    overall_avg_oi_puts = puts_data["openInterest"].mean()
+    overall_avg_oi_calls = metrics.calls.mean_open_interest
+    overall_avg_oi_puts = metrics.puts.mean_open_interest
 
     fig.update_layout(title=f"{ticker} Kullanım Fiyatına Göre Açık Pozisyon - Güncel Fiyat: {recent_price:.2f}", 
                      showlegend=True, legend_title_text='Vade Tarihi')
@@ -83,30 +83,23 @@ def plot_open_interest(options_data, recent_price, ticker):
 
     return fig, overall_avg_oi_calls, overall_avg_oi_puts, calls_data, puts_data
 
-def plot_volume(options_data, recent_price, ticker):
+def plot_volume(options_data, recent_price, ticker, context=None, metrics=None):
     """Hacimleri çağırır ve put opsiyonları için çizdirir."""
     if options_data is None:
         return None, None, None, None
         
-    calls_data = options_data[options_data["type"] == "call"]
-    puts_data = options_data[options_data["type"] == "put"]
-
-    expirations = options_data['expiration'].unique()
-    color_map_2d = px.colors.qualitative.Prism
+    context = ChainContext.ensure(options_data, context)
+    calls_data = context.calls
+    puts_data = context.puts
+    if metrics is None:
+        metrics = compute_chain_metrics(options_data, context)
 
     fig = make_subplots(rows=1, cols=2, subplot_titles=["Call İşlem Hacmi", "Put İşlem Hacmi"], shared_yaxes=True)
 
-    for exp, color in zip(expirations, color_map_2d):
-        exp_calls = calls_data[calls_data["expiration"] == exp]
-        exp_puts = puts_data[puts_data["expiration"] == exp]
+    _add_expiration_traces(fig, context, "volume")
 
-        fig.add_trace(go.Scatter(x=exp_calls["strike"], y=exp_calls["volume"], mode='markers',
-                                 marker=dict(color=color), name=exp), row=1, col=1)
-        fig.add_trace(go.Scatter(x=exp_puts["strike"], y=exp_puts["volume"], mode='markers',
-                                 marker=dict(color=color), name=exp, showlegend=False), row=1, col=2)
-
-    overall_avg_vol_calls = calls_data["volume"].mean()
-    overall_avg_vol_puts = puts_data["volume"].mean()
+    overall_avg_vol_calls = metrics.calls.mean_volume
+    overall_avg_vol_puts = metrics.puts.mean_volume
 
     fig.update_layout(title=f"{ticker} Kullanım Fiyatına Göre İşlem Hacmi - Güncel Fiyat: {recent_price:.2f}", 
                      showlegend=True, legend_title_text='Vade Tarihi')
@@ -115,14 +108,14 @@ def plot_volume(options_data, recent_price, ticker):
 
     return fig, overall_avg_vol_calls, overall_avg_vol_puts, calls_data, puts_data
 
-def plot_3d_puts_implied_volatility(options_data, ticker):
+def plot_3d_puts_implied_volatility(options_data, ticker, context=None):
     """3D yüzeyi çağırır ve put opsiyonları için çizdirir."""
     if options_data is None:
         return None
         
-    puts_data = options_data[options_data["type"] == "put"]
-    expirations = options_data['expiration'].unique()
-    color_map_3d = {exp: color for exp, color in zip(expirations, px.colors.qualitative.Prism)}
+    context = ChainContext.ensure(options_data, context)
+    puts_data = context.puts
+    color_map_3d = {exp: color for exp, color in zip(context.expirations, px.colors.qualitative.Prism)}
 
     fig = px.scatter_3d(puts_data, x='strike', y='expiration', z='implied_volatility',
                          color='expiration', color_discrete_map=color_map_3d,
@@ -133,14 +126,14 @@ def plot_3d_puts_implied_volatility(options_data, ticker):
 
     return fig, puts_data
 
-def plot_3d_calls_implied_volatility(options_data, ticker):
+def plot_3d_calls_implied_volatility(options_data, ticker, context=None):
     """3D yüzeyi çağırır ve call opsiyonları için çizdirir."""
     if options_data is None:
         return None
         
-    calls_data = options_data[options_data["type"] == "call"]
-    expirations = options_data['expiration'].unique()
-    color_map_3d = {exp: color for exp, color in zip(expirations, px.colors.qualitative.Prism)}
+    context = ChainContext.ensure(options_data, context)
+    calls_data = context.calls
+    color_map_3d = {exp: color for exp, color in zip(context.expirations, px.colors.qualitative.Prism)}
 
     fig = px.scatter_3d(calls_data, x='strike', y='expiration', z='implied_volatility',
                          color='expiration', color_discrete_map=color_map_3d,
@@ -151,6 +144,45 @@ def plot_3d_calls_implied_volatility(options_data, ticker):
 
     return fig, calls_data
 
+def plot_iv_surface(surface, ticker, n_strikes=60, n_expiries=40):
+    """Kalibre edilmiş SVI yüzeyini kullanım fiyatı × vade ızgarası üzerinde çizdirir."""
+    if surface is None:
+        return None
+
+    strikes = np.linspace(surface.strike_range[0], surface.strike_range[1], n_strikes)
+    expiries = np.linspace(surface.T[0], surface.T[-1], n_expiries)
+    iv_grid = surface.iv(strikes[None, :], expiries[:, None]) * 100
+
+    fig = go.Figure(go.Surface(x=strikes, y=expiries * 365.25, z=iv_grid, colorscale='Viridis',
+                               colorbar=dict(title='IV (%)')))
+    fig.update_layout(
+        title=f"{ticker} SVI Volatilite Yüzeyi - Güncel Fiyat: {surface.spot:.2f}",
+        scene=dict(xaxis_title='Kullanım Fiyatı', yaxis_title='Vadeye Kalan Gün',
+                   zaxis_title='İmplied Volatilite (%)')
+    )
+
+    return fig
+
+def plot_risk_neutral_density(rnd, recent_price, ticker, max_expirations=6):
+    """Vade başına risk-nötr fiyat yoğunluklarını (en yakın `max_expirations` vade) çizdirir."""
+    if rnd is None:
+        return None
+
+    fig = go.Figure()
+    for i, expiration in enumerate(rnd.expirations[:max_expirations]):
+        fig.add_trace(go.Scatter(x=rnd.strikes[i], y=rnd.density[i], mode='lines', name=str(expiration)))
+
+    fig.add_vline(x=recent_price, line=dict(color='green', dash='dash'),
+                  annotation_text=f"Güncel Fiyat: {recent_price:.2f}")
+    fig.update_layout(
+        title=f"{ticker} Risk-Nötr Fiyat Yoğunluğu (Breeden-Litzenberger)",
+        xaxis_title="Vade Sonu Fiyatı",
+        yaxis_title="Olasılık Yoğunluğu",
+        legend_title="Vade"
+    )
+
+    return fig
+
 def plot_historical_iv(ticker, historical_iv):
     """Tarihsel implied volatility grafiğini çizdirir.
     
@@ -214,6 +246,37 @@ def plot_greeks(calls_data, puts_data, recent_price, ticker):
 
     return fig
 
+def plot_gamma_exposure(gex_by_strike, gex_profile, flip_level, recent_price, ticker):
+    """Kullanım fiyatına göre gamma maruziyetini ve spot fiyata göre toplam GEX profilini çizdirir."""
+    if gex_by_strike is None or gex_profile is None:
+        return None
+
+    fig = make_subplots(rows=1, cols=2, subplot_titles=["Kullanım Fiyatına Göre GEX", "Spot Fiyata Göre Toplam GEX"])
+
+    fig.add_trace(go.Bar(x=gex_by_strike.index, y=gex_by_strike["call_gex"], marker=dict(color='blue'),
+                         name="Call GEX"), row=1, col=1)
+    fig.add_trace(go.Bar(x=gex_by_strike.index, y=gex_by_strike["put_gex"], marker=dict(color='red'),
+                         name="Put GEX"), row=1, col=1)
+    fig.add_trace(go.Scatter(x=gex_by_strike.index, y=gex_by_strike["net_gex"], mode='lines',
+                             line=dict(color='black'), name="Net GEX"), row=1, col=1)
+
+    fig.add_trace(go.Scatter(x=gex_profile.index, y=gex_profile["total_gex"], mode='lines',
+                             line=dict(color='purple'), name="Toplam GEX"), row=1, col=2)
+    fig.add_hline(y=0, line=dict(color='gray', dash='dot'), row=1, col=2)
+    fig.add_vline(x=recent_price, line=dict(color='green', dash='dash'),
+                  annotation_text=f"Güncel Fiyat: {recent_price:.2f}", row=1, col=2)
+    if flip_level is not None:
+        fig.add_vline(x=flip_level, line=dict(color='orange', dash='dash'),
+                      annotation_text=f"Gamma Dönüşü: {flip_level:.2f}", row=1, col=2)
+
+    fig.update_layout(title=f"{ticker} Gamma Maruziyeti (GEX, %1 fiyat hareketi başına $)", barmode='relative',
+                      showlegend=True)
+    fig.update_xaxes(title_text="Kullanım Fiyatı", row=1, col=1)
+    fig.update_xaxes(title_text="Spot Fiyat", row=1, col=2)
+    fig.update_yaxes(title_text="Gamma Maruziyeti ($)")
+
+    return fig
+
 def plot_future_iv_predictions(ticker, historical_iv, predictions_df):
     """İmplied volatility tahmini grafiğini çağırır."""
     if historical_iv is None or predictions_df is None: